@@ -0,0 +1,108 @@
+"""JSON API（sushi_app.api）の負荷試験
+
+起動済みの API に、リクエストの一覧を同時に送り、1秒あたりの処理件数と応答時間を測る。
+
+- --replay には1行1リクエストの JSONL（{"method": "POST", "path": "/api/orders", "body": {...}}）を渡す。
+  省略した場合は、登録済みのセットから今日・明日の計画・発注・セット一覧のリクエストを作る。
+- リクエストの一覧を --requests 件になるまで繰り返して送る。
+
+    python -m sushi_app.api --port 8080 &
+    python benchmarks/api_load.py --url http://127.0.0.1:8080 --requests 5000 --concurrency 64
+    python benchmarks/api_load.py --replay api_requests.jsonl --output api_load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from typing import List
+
+import aiohttp
+
+
+def load_replay(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def default_corpus(session: aiohttp.ClientSession, url: str, seed: int = 0) -> List[dict]:
+    """登録済みのセットから、画面の操作に近いリクエストを作る"""
+    async with session.get(f"{url}/api/sets") as response:
+        names = list(await response.json())
+    rng = random.Random(seed)
+    corpus = [{"method": "GET", "path": "/api/sets"}, {"method": "GET", "path": "/api/inventory"}]
+    for _ in range(50):
+        plan = {name: rng.randint(0, 20) for name in rng.sample(names, min(5, len(names)))}
+        corpus += [
+            {"method": "POST", "path": "/api/plans/today", "body": {"plan": plan}},
+            {"method": "POST", "path": "/api/plans/tomorrow", "body": {"plan": plan}},
+            {"method": "POST", "path": "/api/orders", "body": {"plan": plan}},
+        ]
+    return corpus
+
+
+async def run_load(url: str, corpus: List[dict], total: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    requests = itertools.islice(itertools.cycle(corpus), total)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def worker():
+            nonlocal errors
+            for item in requests:
+                start = time.perf_counter()
+                async with session.request(item["method"], url + item["path"], json=item.get("body")) as response:
+                    await response.read()
+                    if response.status >= 400:
+                        errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+async def main_async(args) -> dict:
+    if args.replay:
+        corpus = load_replay(args.replay)
+    else:
+        async with aiohttp.ClientSession() as session:
+            corpus = await default_corpus(session, args.url)
+    return await run_load(args.url, corpus, args.requests, args.concurrency)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="api_load.py", description="JSON API の負荷試験")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--replay", help="送るリクエストの一覧（JSONL）")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="結果の JSON の出力先")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(main_async(args))
+    for key, value in result.items():
+        print(f"  {key:<20} {value}", file=sys.stderr)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
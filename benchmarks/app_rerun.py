@@ -0,0 +1,256 @@
+"""画面の再実行時間のベンチマーク（streamlit.testing.v1.AppTest で app.py を動かす）
+
+セット数 10 / 100 / 1,000 / 10,000 の合成データを一時データベースに作り、
+起動（キャッシュなし）と各ボタンの操作にかかる時間を測って JSON に書き出す。
+
+- 時間は各操作を --repeat 回行った中央値（秒）。
+- メモリは別に1回、tracemalloc を有効にして操作ごとのピーク（KiB）を測る
+  （tracemalloc は遅くなるため、時間の計測とは分けている）。
+
+    python benchmarks/app_rerun.py --sizes 10 100 1000 --output bench.json
+    python benchmarks/app_rerun.py compare old.json new.json --fail-above 1.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import streamlit as st  # noqa: E402
+from streamlit import config  # noqa: E402
+from streamlit.logger import set_log_level  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from sushi_app.defaults import STATUS_OPTIONS  # noqa: E402
+from sushi_app.sections import SECTIONS  # noqa: E402
+from sushi_app.storage import Storage  # noqa: E402
+
+APP_PATH = str(ROOT / "app.py")
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+INPUT_SETS = 5   # 製造数を入力するセットの数
+
+
+# ----------------------------------------
+# 合成データ
+# ----------------------------------------
+def ingredient_count(n_sets: int) -> int:
+    """セット数に応じたネタの種類（10 セットで 6、10,000 セットで 200）"""
+    return max(6, min(200, round(2 * n_sets ** 0.5)))
+
+
+def make_catalog(db_path: str, n_sets: int, seed: int = 0) -> None:
+    """ネタ一覧とセットを合成してデータベースに保存する"""
+    rng = random.Random(seed)
+    ingredients = [f"ネタ{j:03d}" for j in range(ingredient_count(n_sets))]
+    sets_data = {}
+    for i in range(n_sets):
+        recipe = {ing: rng.randint(1, 4) for ing in rng.sample(ingredients, rng.randint(3, min(8, len(ingredients))))}
+        sets_data[f"セット{i:05d}"] = {
+            "レシピ": recipe,
+            "販売価格": rng.randrange(500, 3000, 10),
+            "ステータス": rng.choice(STATUS_OPTIONS),
+        }
+    storage = Storage(db_path)
+    storage.save_ingredients([(ing, rng.choice([5, 10, 20, 30]), "枚") for ing in ingredients])
+    storage.save_sets(sets_data)
+    storage.close()
+
+
+# ----------------------------------------
+# 操作
+# ----------------------------------------
+def _check(at: AppTest, step: str) -> None:
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].message}")
+
+
+def _open_section(at: AppTest, module: str) -> None:
+    label = next(label for label, name in SECTIONS.items() if name == module)
+    at.radio(key="active_section").set_value(label)
+
+
+def _fill_plan(at: AppTest, prefix: str, n_sets: int) -> None:
+    for i in range(min(INPUT_SETS, n_sets)):
+        at.number_input(key=f"{prefix}_セット{i:05d}").set_value(i + 1)
+
+
+def _button(at: AppTest, label: str):
+    return next(b for b in at.button if b.label == label)
+
+
+def _customize(at: AppTest) -> None:
+    at.radio(key="edit_mode").set_value("1セットずつ編集")
+    at.run()
+    next(r for r in at.radio if r.label == "操作を選択").set_value("既存セット編集")
+    at.run()
+    _button(at, "セット情報を保存").click()
+
+
+# (操作名, 準備, 操作)。操作のあとの再実行だけを計測する
+STEPS = [
+    ("calc_today", lambda at, n: _fill_plan(at, "today", n), lambda at: at.button(key="calc_today").click()),
+    ("open_tomorrow", None, lambda at: _open_section(at, "tomorrow")),
+    ("calc_tomorrow", lambda at, n: _fill_plan(at, "tomorrow", n), lambda at: at.button(key="calc_tomorrow").click()),
+    ("open_inventory", None, lambda at: _open_section(at, "inventory")),
+    ("save_inventory", None, lambda at: at.button(key="save_inventory").click()),
+    ("open_order", None, lambda at: _open_section(at, "order")),
+    ("calc_order", None, lambda at: at.button(key="calc_order").click()),
+    ("open_report", None, lambda at: _open_section(at, "report")),
+    ("open_customize", None, lambda at: _open_section(at, "customize")),
+    ("save_customize", None, _customize),
+]
+
+
+def run_session(n_sets: int, timeout: float, measure) -> dict:
+    """起動から全操作までを1回行い、{操作名: 測定値} を返す
+
+    measure(fn) は fn を実行して測定値を返す関数。
+    """
+    # 起動を「キャッシュなし」にそろえる
+    st.cache_resource.clear()
+    st.cache_data.clear()
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    values = {"cold_start": measure(at.run)}
+    _check(at, "cold_start")
+    for step, prepare, action in STEPS:
+        if prepare is not None:
+            prepare(at, n_sets)
+        # 準備で入れた値は計測する操作と同じ再実行で反映される
+        action(at)
+        values[step] = measure(at.run)
+        _check(at, step)
+    return values
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _peak_kib(fn) -> float:
+    tracemalloc.reset_peak()
+    fn()
+    return tracemalloc.get_traced_memory()[1] / 1024
+
+
+def bench_size(n_sets: int, repeat: int, timeout: float, memory: bool) -> list:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        os.environ["SUSHI_DB_PATH"] = db_path
+        make_catalog(db_path, n_sets)
+        runs = [run_session(n_sets, timeout, _timed) for _ in range(repeat)]
+        peaks = {}
+        if memory:
+            tracemalloc.start()
+            try:
+                peaks = run_session(n_sets, timeout, _peak_kib)
+            finally:
+                tracemalloc.stop()
+        st.cache_resource.clear()
+    results = []
+    for step in runs[0]:
+        seconds = [run[step] for run in runs]
+        results.append({
+            "sets": n_sets,
+            "ingredients": ingredient_count(n_sets),
+            "step": step,
+            "seconds": statistics.median(seconds),
+            "runs": seconds,
+            "peak_kib": round(peaks[step], 1) if step in peaks else None,
+        })
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+# ----------------------------------------
+# 比較
+# ----------------------------------------
+def compare(old_path: str, new_path: str, fail_above: float = None) -> int:
+    """2つの結果を (セット数, 操作) ごとに比べ、新旧の時間の比を表示する"""
+    def load(path):
+        with open(path, encoding="utf-8") as f:
+            return {(r["sets"], r["step"]): r for r in json.load(f)["results"]}
+
+    old, new = load(old_path), load(new_path)
+    slower = 0
+    print(f"{'sets':>6} {'step':<16} {'old[s]':>9} {'new[s]':>9} {'ratio':>7}")
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key]["seconds"] / old[key]["seconds"] if old[key]["seconds"] else float("inf")
+        mark = ""
+        if fail_above is not None and ratio > fail_above:
+            slower += 1
+            mark = "  <-"
+        print(f"{key[0]:>6} {key[1]:<16} {old[key]['seconds']:>9.3f} {new[key]['seconds']:>9.3f} {ratio:>7.2f}{mark}")
+    return 1 if slower else 0
+
+
+# ----------------------------------------
+# コマンドライン
+# ----------------------------------------
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        parser = argparse.ArgumentParser(prog="app_rerun.py compare", description="ベンチマーク結果の比較")
+        parser.add_argument("old")
+        parser.add_argument("new")
+        parser.add_argument("--fail-above", type=float, help="この比より遅くなった操作があれば終了コード 1")
+        args = parser.parse_args(argv[1:])
+        return compare(args.old, args.new, args.fail_above)
+
+    parser = argparse.ArgumentParser(prog="app_rerun.py", description="画面の再実行時間のベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="セット数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600, help="1回の再実行の制限時間（秒）")
+    parser.add_argument("--no-memory", action="store_true", help="メモリのピークを測らない")
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args(argv)
+
+    # 実行時の注意・非推奨の表示で結果が読みにくくならないようにする
+    config.set_option("logger.level", "error")
+    set_log_level("error")
+    results = []
+    for n_sets in args.sizes:
+        print(f"セット数 {n_sets} ...", file=sys.stderr)
+        size_results = bench_size(n_sets, args.repeat, args.timeout, not args.no_memory)
+        for r in size_results:
+            peak = "" if r["peak_kib"] is None else f"  peak {r['peak_kib']:,.0f} KiB"
+            print(f"  {r['step']:<16} {r['seconds']:8.3f} s{peak}", file=sys.stderr)
+        results.extend(size_results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": _git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "streamlit": st.__version__,
+            "repeat": args.repeat,
+            # プロセス全体の最大常駐メモリ（Linux は KiB）
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "results": results,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"結果を {args.output} に書き出しました", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
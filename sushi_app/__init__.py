@@ -0,0 +1,6 @@
+"""寿司製造管理システムの計算ロジック（Streamlit 画面から独立した部分）
+
+画面は sushi_app.sections にあり、それ以外のモジュールは streamlit を import しない。
+計算のモジュール（planning・ordering など）は numpy だけを使い、pandas・reportlab などは
+使う関数の中でだけ import する（バッチ・API から計算部分だけを軽く読み込めるようにする）。
+"""
@@ -0,0 +1,422 @@
+"""計算・データの JSON API（aiohttp、画面を使わない利用向け）
+
+POS・仕入先のシステムから、タブ①②④と同じ計算と、セット・在庫の読み書きを行う。
+
+    python -m sushi_app.api --port 8080
+
+    GET    /health
+    GET    /api/versions
+    GET    /api/ingredients
+    GET    /api/sets                     セット一覧
+    GET    /api/sets/{name}
+    PUT    /api/sets/{name}              {"販売価格": 1480, "ステータス": "通常", "レシピ": {"マグロ": 2}}
+    DELETE /api/sets/{name}
+    GET    /api/inventory
+    PUT    /api/inventory                {"マグロ": 20, ...}（指定したネタだけ更新）
+    POST   /api/plans/today              {"plan": {"極上セット": 10}, "save": false}
+    POST   /api/plans/tomorrow           {"plan": {...}, "save": false}
+    POST   /api/orders                   {"required": {...}} または {"plan": {...}}、任意で "inventory"
+
+- データベース・計算はブロッキングのため、スレッドプールで実行してイベントループを止めない。
+  データベースは Storage を1つ共有し（読み込みは版ごとのキャッシュ、大きな読み込みは接続プール）、
+  書き込みは Storage のトランザクションで直列化される。
+- 計算は Storage.snapshot で版と一緒に読んだデータだけを使う（計算中に書き込みがあっても混ざらない）。
+- 計算結果の応答（JSON のバイト列）は、依存するデータの版とリクエスト内容ごとに保持する。
+  セット情報だけに依存するもの（セット一覧・今日の計画）はセットとネタ一覧の版、
+  在庫・仕入先条件にも依存するもの（明日の計画・発注）はデータ全体の版をキーにする。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+import numpy as np
+from aiohttp import web
+
+from sushi_app import metrics
+from sushi_app.catalog import IngredientCatalog, catalog_from_rows, load_catalog
+from sushi_app.defaults import STATUS_OPTIONS
+from sushi_app.ordering import default_offers, group_offers, solve_orders
+from sushi_app.planning import RecipeMatrix, compile_sets, compute_plan, summary_rows, usage_dict
+from sushi_app.storage import DataSnapshot, Storage, open_storage
+
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 8
+CACHE_SIZE = 1024
+DATE_FORMAT = "%Y年%m月%d日"   # 画面のレポート日付と同じ表記
+
+
+class ApiError(Exception):
+    """リクエストの誤り（status の HTTP ステータスで返す）"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ----------------------------------------
+# 応答のキャッシュ
+# ----------------------------------------
+class ResponseCache:
+    """(経路, 版, リクエスト内容) -> JSON のバイト列（古いものから捨てる）"""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._items: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        with self._lock:
+            self._items[key] = body
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+def dump_json(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"JSON にできない値です: {type(value).__name__}")
+
+
+# ----------------------------------------
+# 計算（スレッドプールで実行）
+# ----------------------------------------
+class ApiContext:
+    """API が共有する Storage・ネタカタログ・キャッシュ・スレッドプール"""
+
+    def __init__(self, storage: Storage, workers: int = DEFAULT_WORKERS):
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sushi-api")
+        self.cache = ResponseCache()
+        self._catalog: Tuple[int, Optional[IngredientCatalog]] = (-1, None)
+
+    async def run(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def catalog(self, data: DataSnapshot) -> IngredientCatalog:
+        """ネタカタログ（ネタ一覧が変わったときだけ作り直す）"""
+        version, catalog = self._catalog
+        if catalog is None or version != data.ingredients_version:
+            catalog = catalog_from_rows(data.ingredients) if data.ingredients else load_catalog(self.storage)
+            self._catalog = (data.ingredients_version, catalog)
+        return catalog
+
+    def snapshot(self):
+        """最新の版のデータを読み、(データ, セットカタログ, ネタカタログ, レシピ行列) を返す"""
+        data = self.storage.snapshot()
+        set_catalog = data.set_catalog
+        catalog = self.catalog(data)
+        matrix = set_catalog.derived(("recipe_matrix", catalog.names),
+                                     lambda: compile_sets(set_catalog.sets, catalog))
+        return data, set_catalog, catalog, matrix
+
+    def cached(self, route: str, depends: str, body_key: Hashable, compute: Callable) -> bytes:
+        """依存するデータの版が同じ間は、同じリクエストの応答を使い回す
+
+        depends は "sets"（セット・ネタ一覧）または "data"（在庫・仕入先を含むデータ全体）。
+        """
+        snapshot = self.snapshot()
+        data, set_catalog, _, _ = snapshot
+        version = (set_catalog.version, data.ingredients_version) if depends == "sets" else data.version
+        key = (route, version, body_key)
+        body = self.cache.get(key)
+        if body is None:
+            metrics.REGISTRY.inc("sushi_api_cache_misses_total", {"route": route})
+            body = dump_json(compute(*snapshot))
+            self.cache.put(key, body)
+        else:
+            metrics.REGISTRY.inc("sushi_api_cache_hits_total", {"route": route})
+        return body
+
+
+def parse_counts(data, names, label: str) -> Dict[str, int]:
+    """{名前: 0以上の整数} を検証する（names にない名前は誤り）"""
+    if not isinstance(data, Mapping):
+        raise ApiError(f"{label} はオブジェクトで指定してください")
+    counts = {}
+    for name, value in data.items():
+        if name not in names:
+            raise ApiError(f"{label} に登録されていない名前があります: {name}")
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ApiError(f"{label} の {name} は0以上の整数で指定してください")
+        counts[name] = value
+    return counts
+
+
+def plan_response(matrix: RecipeMatrix, plan: Mapping[str, int], count_label: str, money_label: str):
+    result = compute_plan(matrix, plan)
+    return result, summary_rows(matrix, result, count_label, money_label), usage_dict(matrix, result.usage)
+
+
+def _order_response(catalog, required, inventory, offers) -> dict:
+    order_plan = solve_orders(catalog, required, inventory, offers)
+    return {
+        "rows": order_plan.rows(group_offers(offers)),
+        "lines": order_plan.lines,
+        "total_cost": round(order_plan.total_cost),
+    }
+
+
+# ----------------------------------------
+# ハンドラ
+# ----------------------------------------
+CONTEXT = web.AppKey("context", ApiContext)
+
+
+async def read_json(request: web.Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:   # JSONDecodeError と、UTF-8 として読めない本文の UnicodeDecodeError
+        raise ApiError("JSON として読めません") from None
+    if not isinstance(data, dict):
+        raise ApiError("JSON オブジェクトで送ってください")
+    return data
+
+
+def json_response(body: bytes, status: int = 200) -> web.Response:
+    return web.Response(body=body, status=status, content_type="application/json", charset="utf-8")
+
+
+def body_key(data: Mapping) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True)
+
+
+async def health(request: web.Request) -> web.Response:
+    return json_response(b'{"status": "ok"}')
+
+
+async def get_versions(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+
+    def compute():
+        data = ctx.storage.snapshot()
+        return {"data_version": data.version, "sets_version": data.set_catalog.version,
+                "ingredients_version": data.ingredients_version}
+
+    return json_response(dump_json(await ctx.run(compute)))
+
+
+async def get_ingredients(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    body = await ctx.run(ctx.cached, "ingredients", "sets", None, lambda _v, _s, catalog, _m: [
+        {"name": name, "lot": lot, "unit": unit} for name, lot, unit in catalog.rows()
+    ])
+    return json_response(body)
+
+
+async def get_sets(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    body = await ctx.run(ctx.cached, "sets", "sets", None, lambda _v, set_catalog, _c, _m: set_catalog.to_dict())
+    return json_response(body)
+
+
+async def get_set(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    name = request.match_info["name"]
+
+    def compute(_v, set_catalog, _c, _m):
+        if name not in set_catalog:
+            raise ApiError(f"セット『{name}』はありません", status=404)
+        return {"name": name, **set_catalog.to_dict()[name]}
+
+    return json_response(await ctx.run(ctx.cached, "set", "sets", name, compute))
+
+
+def parse_set(data: Mapping, catalog: IngredientCatalog) -> dict:
+    """PUT /api/sets/{name} の本文を検証してセット情報にする（販売価格は必須）"""
+    if "販売価格" not in data:
+        raise ApiError("販売価格 を指定してください")
+    price = data["販売価格"]
+    if isinstance(price, bool) or not isinstance(price, int) or price < 0:
+        raise ApiError("販売価格 は0以上の整数で指定してください")
+    status = data.get("ステータス", "通常")
+    if status not in STATUS_OPTIONS:
+        raise ApiError(f"ステータス は {' / '.join(STATUS_OPTIONS)} のいずれかで指定してください")
+    recipe = parse_counts(data.get("レシピ", {}), catalog, "レシピ")
+    return {"レシピ": {ing: cnt for ing, cnt in recipe.items() if cnt}, "販売価格": price, "ステータス": status}
+
+
+async def put_set(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    name = request.match_info["name"].strip()
+    if not name:
+        raise ApiError("セット名が空です")
+    data = await read_json(request)
+
+    def save():
+        _, set_catalog, catalog, _ = ctx.snapshot()
+        version = ctx.storage.apply_set_changes({name: parse_set(data, catalog)}, [])
+        return {"name": name, "version": version, "created": name not in set_catalog}
+
+    result = await ctx.run(save)
+    return json_response(dump_json(result), status=201 if result["created"] else 200)
+
+
+async def delete_set(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    name = request.match_info["name"]
+
+    def delete():
+        _, set_catalog, _, _ = ctx.snapshot()
+        if name not in set_catalog:
+            raise ApiError(f"セット『{name}』はありません", status=404)
+        return {"name": name, "version": ctx.storage.apply_set_changes({}, [name])}
+
+    return json_response(dump_json(await ctx.run(delete)))
+
+
+async def get_inventory(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    body = await ctx.run(ctx.cached, "inventory", "data", None, lambda data, _s, catalog, _m: {
+        ing: 0 for ing in catalog
+    } | data.inventory)
+    return json_response(body)
+
+
+async def put_inventory(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    data = await read_json(request)
+
+    def save():
+        _, _, catalog, _ = ctx.snapshot()
+        inventory = parse_counts(data, catalog, "在庫")
+        return {"updated": len(inventory), "version": ctx.storage.save_inventory(inventory)}
+
+    return json_response(dump_json(await ctx.run(save)))
+
+
+async def post_today_plan(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    data = await read_json(request)
+
+    def compute(_v, set_catalog, _c, matrix):
+        plan = parse_counts(data.get("plan", {}), set_catalog, "plan")
+        result, summary, usage = plan_response(matrix, plan, "製造数", "製造金額")
+        return {"summary": summary, "total_money": int(result.total), "usage": usage}
+
+    if not data.get("save"):
+        return json_response(await ctx.run(ctx.cached, "plans/today", "sets", body_key(data), compute))
+
+    def save():
+        snapshot = ctx.snapshot()
+        set_catalog = snapshot[1]
+        payload = {"date": datetime.now().strftime(DATE_FORMAT), **compute(*snapshot)}
+        plan = parse_counts(data.get("plan", {}), set_catalog, "plan")
+        statuses = {name: s["ステータス"] for name, s in set_catalog.sets.items()}
+        # レポートと製造実績は1つの版で保存する（片方だけ保存された状態を残さない）
+        with ctx.storage.transaction():
+            ctx.storage.save_report("today", payload["date"], payload)
+            ctx.storage.save_production(datetime.now().date().isoformat(), plan, statuses)
+        return payload
+
+    return json_response(dump_json(await ctx.run(save)))
+
+
+async def post_tomorrow_plan(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    data = await read_json(request)
+
+    def compute(snapshot_data, set_catalog, _c, matrix):
+        plan = parse_counts(data.get("plan", {}), set_catalog, "plan")
+        result, summary, required = plan_response(matrix, plan, "製造目標数", "目標製造金額")
+        inventory = snapshot_data.inventory
+        shortage = {ing: qty - inventory.get(ing, 0) for ing, qty in required.items()
+                    if qty > inventory.get(ing, 0)}
+        return {"summary": summary, "total": int(result.total), "required": required, "shortage": shortage}
+
+    body = await ctx.run(ctx.cached, "plans/tomorrow", "data", body_key(data), compute)
+    if data.get("save"):
+        payload = json.loads(body)
+        await ctx.run(ctx.storage.save_report, "tomorrow", datetime.now().strftime(DATE_FORMAT),
+                      {key: payload[key] for key in ("summary", "total", "required")})
+    return json_response(body)
+
+
+async def post_orders(request: web.Request) -> web.Response:
+    ctx = request.app[CONTEXT]
+    data = await read_json(request)
+
+    def compute(snapshot_data, set_catalog, catalog, matrix):
+        if "required" in data:
+            required = parse_counts(data["required"], catalog, "required")
+        else:
+            plan = parse_counts(data.get("plan", {}), set_catalog, "plan")
+            required = usage_dict(matrix, compute_plan(matrix, plan).usage)
+        if "inventory" in data:
+            inventory = parse_counts(data["inventory"], catalog, "inventory")
+        else:
+            inventory = snapshot_data.inventory
+        offers = snapshot_data.offers or default_offers(catalog.order_lot)
+        return _order_response(catalog, required, inventory, offers)
+
+    return json_response(await ctx.run(ctx.cached, "orders", "data", body_key(data), compute))
+
+
+@web.middleware
+async def handle_errors(request: web.Request, handler) -> web.StreamResponse:
+    """誤りを JSON で返し、経路ごとの件数と処理時間を記録する"""
+    route = request.match_info.route.resource.canonical if request.match_info.route.resource else "unknown"
+    with metrics.timer("api", f"{request.method} {route}"):
+        try:
+            return await handler(request)
+        except ApiError as e:
+            return json_response(dump_json({"error": str(e)}), status=e.status)
+
+
+def create_app(storage: Optional[Storage] = None, workers: int = DEFAULT_WORKERS) -> web.Application:
+    if storage is None:
+        storage = open_storage()
+    app = web.Application(middlewares=[handle_errors])
+    app[CONTEXT] = ApiContext(storage, workers)
+    app.router.add_get("/health", health)
+    app.router.add_get("/api/versions", get_versions)
+    app.router.add_get("/api/ingredients", get_ingredients)
+    app.router.add_get("/api/sets", get_sets)
+    app.router.add_get("/api/sets/{name}", get_set)
+    app.router.add_put("/api/sets/{name}", put_set)
+    app.router.add_delete("/api/sets/{name}", delete_set)
+    app.router.add_get("/api/inventory", get_inventory)
+    app.router.add_put("/api/inventory", put_inventory)
+    app.router.add_post("/api/plans/today", post_today_plan)
+    app.router.add_post("/api/plans/tomorrow", post_tomorrow_plan)
+    app.router.add_post("/api/orders", post_orders)
+
+    async def shutdown(app: web.Application) -> None:
+        app[CONTEXT].executor.shutdown(wait=False)
+
+    app.on_cleanup.append(shutdown)
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sushi_app.api", description="計算・データの JSON API")
+    parser.add_argument("--db", help="データベースのパス（既定は SUSHI_DB_PATH または sushi.db）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("SUSHI_API_PORT", DEFAULT_PORT)))
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="計算・データベース用のスレッド数")
+    args = parser.parse_args(argv)
+
+    storage = open_storage(args.db)
+    web.run_app(create_app(storage, args.workers), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+"""多店舗の一括計算（画面を使わない実行）
+
+店舗ごとの製造計画と在庫を読み込み、タブ①〜④と同じ計算
+（今日の製造集計・明日の必要ネタ数・在庫との差・最安の発注）を
+店舗のかたまりごとにプロセスプールへ振り分けて行い、発注一覧を書き出す。
+
+- 計画は「店舗,日付,セット名,製造数」、在庫は「店舗,ネタ,在庫枚数」（形式は dataio と同じ）。
+  日付が --today の行を今日の計画、--tomorrow の行を明日の計画として扱う
+  （日付の表記は dataio.normalize_date でそろえてから比べる）。
+- セット情報・ネタ一覧・仕入先条件はデータベースから読み、各プロセスで1回だけ行列にする。
+- 同じかたまりの店舗はまとめて（店舗 × セットの2次元配列で）計算する。
+
+    python -m sushi_app.batch --plans plans.csv --inventory inventory.csv --orders orders.csv
+    python -m sushi_app.batch --from-db --orders orders.jsonl --summary summary.csv
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sushi_app.catalog import IngredientCatalog, catalog_from_rows, load_catalog
+from sushi_app.dataio import (DATE_FORMAT, DEFAULT_CHUNKSIZE, ImportResult, Source, detect_format, iter_chunks,
+                              iter_inventory_rows, iter_plan_rows, normalize_date, write_records)
+from sushi_app.ordering import SupplierOffer, default_offers, group_offers, solve_orders
+from sushi_app.planning import RecipeMatrix, compile_sets, compute_plan, usage_dict
+
+DEFAULT_STORES_PER_TASK = 50
+
+ORDER_COLUMNS = ["店舗", "日付", "ネタ", "仕入先", "ロット数", "発注数量", "単価", "発注金額"]
+SUMMARY_COLUMNS = ["店舗", "今日の製造金額", "明日の製造金額", "発注金額", "発注ネタ数"]
+
+
+# ----------------------------------------
+# 入力
+# ----------------------------------------
+@dataclass
+class StoreInput:
+    """1店舗分の計算材料"""
+    store: str
+    today: Dict[str, int] = field(default_factory=dict)      # 今日の製造数
+    tomorrow: Dict[str, int] = field(default_factory=dict)   # 明日の製造数
+    inventory: Dict[str, int] = field(default_factory=dict)  # 在庫枚数
+
+
+def collect_stores(plan_rows: Iterable[Tuple[str, str, str, int]],
+                   inventory_rows: Iterable[Tuple[str, str, int]],
+                   today: str, tomorrow: str, result: Optional[ImportResult] = None) -> List[StoreInput]:
+    """計画・在庫の行を店舗ごとにまとめる（対象日以外の計画は読み飛ばす）
+
+    日付は表記をそろえてから比べる。読み取れない日付の行は result の誤りとし、
+    result.applied には対象日の計画として使った行だけを数える。
+    """
+    today, tomorrow = normalize_date(today), normalize_date(tomorrow)
+    days: Dict[str, Optional[str]] = {}   # 行の日付の表記 -> そろえた日付（読み取れなければ None）
+    bad_days: Dict[str, int] = {}
+    stores: Dict[str, StoreInput] = {}
+    for store, day, name, count in plan_rows:
+        if day not in days:
+            try:
+                days[day] = normalize_date(day)
+            except ValueError:
+                days[day] = None
+        normalized = days[day]
+        if normalized is None:
+            bad_days[day] = bad_days.get(day, 0) + 1
+            continue
+        if normalized == today:
+            stores.setdefault(store, StoreInput(store)).today[name] = count
+        elif normalized == tomorrow:
+            stores.setdefault(store, StoreInput(store)).tomorrow[name] = count
+        else:
+            continue
+        if result is not None:
+            result.applied += 1
+    if result is not None:
+        for day, count in bad_days.items():
+            result.add_error(f"日付『{day}』を読み取れない計画 {count} 行は読み飛ばしました")
+    for store, ing, qty in inventory_rows:
+        stores.setdefault(store, StoreInput(store)).inventory[ing] = qty
+    return list(stores.values())
+
+
+def read_store_files(plans: Source, inventory: Optional[Source], set_names: Iterable[str],
+                     catalog: IngredientCatalog, today: str, tomorrow: str, result: ImportResult,
+                     fmt: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE) -> List[StoreInput]:
+    """計画・在庫ファイルを検証しながら読み込む"""
+    def plan_rows():
+        for rows in iter_plan_rows(plans, set_names, result, fmt, chunksize):
+            yield from rows
+
+    def inventory_rows():
+        if inventory is None:
+            return
+        missing_store = 0
+        for rows in iter_inventory_rows(inventory, catalog, result, fmt, chunksize):
+            for row in rows:
+                if not row[0]:
+                    missing_store += 1
+                    continue
+                result.applied += 1
+                yield row
+        if missing_store:
+            result.add_error(f"店舗の指定がない在庫 {missing_store} 行は読み飛ばしました")
+
+    return collect_stores(plan_rows(), inventory_rows(), today, tomorrow, result)
+
+
+def read_store_tables(storage, today: str, tomorrow: str,
+                      result: Optional[ImportResult] = None) -> List[StoreInput]:
+    """取り込み済みの store_plans / store_inventory から読み込む（日付は取り込み時にそろえてある）"""
+    today, tomorrow = normalize_date(today), normalize_date(tomorrow)
+
+    def plan_rows():
+        yield from storage.iter_store_plans(today)
+        yield from storage.iter_store_plans(tomorrow)
+
+    return collect_stores(plan_rows(), storage.iter_store_inventory(), today, tomorrow, result)
+
+
+# ----------------------------------------
+# 計算（プロセスプールの各プロセスで実行）
+# ----------------------------------------
+@dataclass
+class StoreResult:
+    """1店舗分の計算結果"""
+    store: str
+    today_total: int
+    tomorrow_total: int
+    usage: Dict[str, int]      # 今日の使用ネタ数
+    required: Dict[str, int]   # 明日の必要ネタ数
+    order_rows: List[dict]     # タブ④と同じ1ネタ1行の表
+    lines: List[dict]          # 仕入先ごとの発注明細
+    total_cost: float
+
+
+_context: Optional[Tuple[RecipeMatrix, IngredientCatalog, List[SupplierOffer]]] = None
+
+
+def _init_worker(sets_data: Mapping[str, dict], catalog_rows: Sequence[Tuple[str, int, str]],
+                 offers: Sequence[SupplierOffer]) -> None:
+    """プロセスごとに1回、セット情報をレシピ行列にしておく"""
+    global _context
+    catalog = catalog_from_rows(catalog_rows)
+    _context = (compile_sets(sets_data, catalog), catalog, list(offers))
+
+
+def _plan_matrix(matrix: RecipeMatrix, plans: Sequence[Mapping[str, int]]) -> np.ndarray:
+    """[{セット名: 製造数}] を (店舗数, セット数) の配列にする"""
+    set_index = matrix.set_index
+    array = np.zeros((len(plans), len(matrix.set_names)), dtype=np.int64)
+    for k, plan in enumerate(plans):
+        for name, count in plan.items():
+            i = set_index.get(name)
+            if i is not None:
+                array[k, i] = count
+    return array
+
+
+def plan_stores(stores: Sequence[StoreInput]) -> List[StoreResult]:
+    """店舗のかたまりを計算する（計画はまとめて、発注は店舗ごと）"""
+    matrix, catalog, offers = _context
+    today = compute_plan(matrix, _plan_matrix(matrix, [s.today for s in stores]))
+    tomorrow = compute_plan(matrix, _plan_matrix(matrix, [s.tomorrow for s in stores]))
+    offers_by_ing = group_offers(offers)
+    results = []
+    for k, store in enumerate(stores):
+        required = usage_dict(matrix, tomorrow.usage[k])
+        order_plan = solve_orders(catalog, required, store.inventory, offers)
+        results.append(StoreResult(
+            store=store.store,
+            today_total=int(today.total[k]),
+            tomorrow_total=int(tomorrow.total[k]),
+            usage=usage_dict(matrix, today.usage[k]),
+            required=required,
+            order_rows=order_plan.rows(offers_by_ing),
+            lines=order_plan.lines,
+            total_cost=order_plan.total_cost,
+        ))
+    return results
+
+
+def run_batch(stores: Sequence[StoreInput], sets_data: Mapping[str, dict], catalog: IngredientCatalog,
+              offers: Sequence[SupplierOffer], workers: Optional[int] = None,
+              stores_per_task: int = DEFAULT_STORES_PER_TASK) -> Iterator[StoreResult]:
+    """全店舗を計算し、入力の店舗順に結果を返す
+
+    workers が 1 の場合はプロセスを起動せずにこのプロセスで計算する。
+    """
+    initargs = (dict(sets_data), catalog.rows(), list(offers))
+    chunks = iter_chunks(stores, stores_per_task)
+    if workers == 1:
+        _init_worker(*initargs)
+        for chunk in chunks:
+            yield from plan_stores(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as executor:
+        for results in executor.map(plan_stores, chunks):
+            yield from results
+
+
+# ----------------------------------------
+# 書き出し
+# ----------------------------------------
+def order_records(results: Iterable[StoreResult], order_date: str,
+                  summaries: Optional[List[dict]] = None) -> Iterator[dict]:
+    """発注明細を1行ずつ返す（summaries を渡すと店舗ごとの集計も溜める）"""
+    for result in results:
+        for line in result.lines:
+            yield {
+                "店舗": result.store,
+                "日付": order_date,
+                "ネタ": line["ingredient"],
+                "仕入先": line["supplier"],
+                "ロット数": line["lots"],
+                "発注数量": line["quantity"],
+                "単価": line["unit_price"],
+                "発注金額": line["cost"],
+            }
+        if summaries is not None:
+            summaries.append({
+                "店舗": result.store,
+                "今日の製造金額": result.today_total,
+                "明日の製造金額": result.tomorrow_total,
+                "発注金額": round(result.total_cost),
+                "発注ネタ数": len({line["ingredient"] for line in result.lines}),
+            })
+
+
+# ----------------------------------------
+# コマンドライン
+# ----------------------------------------
+def _date_arg(text: str) -> str:
+    try:
+        return normalize_date(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def main(argv=None) -> int:
+    from sushi_app.storage import open_storage
+
+    now = datetime.now()
+    parser = argparse.ArgumentParser(prog="python -m sushi_app.batch", description="多店舗の製造計画・発注の一括計算")
+    parser.add_argument("--db", help="データベースのパス（既定は SUSHI_DB_PATH または sushi.db）")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--plans", help="店舗別の製造計画ファイル（CSV / JSONL）")
+    source.add_argument("--from-db", action="store_true", help="取り込み済みの店舗別計画・在庫を使う")
+    parser.add_argument("--inventory", help="店舗別の在庫ファイル（CSV / JSONL）")
+    parser.add_argument("--today", default=now.strftime(DATE_FORMAT), type=_date_arg,
+                        help="今日の計画の日付（既定は今日。2024-01-05 などの表記も可）")
+    parser.add_argument("--tomorrow", default=(now + timedelta(days=1)).strftime(DATE_FORMAT), type=_date_arg,
+                        help="明日の計画（発注の対象）の日付（既定は明日）")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="入力ファイルの形式（既定は拡張子から判定）")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="プロセス数（1 ならプロセスを使わない）")
+    parser.add_argument("--stores-per-task", type=int, default=DEFAULT_STORES_PER_TASK)
+    parser.add_argument("--orders", required=True, help="発注一覧の出力先（CSV / JSONL）")
+    parser.add_argument("--summary", help="店舗ごとの集計の出力先（CSV / JSONL）")
+    args = parser.parse_args(argv)
+
+    # 画面・API と同じく、セットが未登録なら初期のセットを登録してから計算する
+    storage = open_storage(args.db)
+    catalog = load_catalog(storage)
+    # 各プロセスへ渡すため、共有カタログの読み取り専用の版を通常の dict に戻す
+    sets_data = storage.load_set_catalog().to_dict()
+    offers = storage.load_offers() or default_offers(catalog.order_lot)
+
+    result = ImportResult()
+    if args.from_db:
+        stores = read_store_tables(storage, args.today, args.tomorrow, result)
+    else:
+        stores = read_store_files(args.plans, args.inventory, sets_data, catalog, args.today, args.tomorrow,
+                                  result, args.format, args.chunksize)
+    storage.close()
+    for error in result.errors:
+        print(error, file=sys.stderr)
+
+    summaries = [] if args.summary else None
+    results = run_batch(stores, sets_data, catalog, offers, args.workers, args.stores_per_task)
+    count = write_records(args.orders, order_records(results, args.tomorrow, summaries),
+                          ORDER_COLUMNS, detect_format(args.orders))
+    if args.summary:
+        write_records(args.summary, summaries, SUMMARY_COLUMNS, detect_format(args.summary))
+    print(f"店舗: {len(stores)} / 発注明細: {count} 行 / 入力エラー: {result.error_count} 件")
+    return 1 if result.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""ネタ（食材）カタログ
+
+ネタ名・発注ロット・単位をファイル（ingredients.csv）またはデータベースから読み込み、
+各ネタに 0 から始まる連続した整数 ID を振る。
+レシピ行列やベクトルの列番号はこの ID と一致する。
+"""
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+DEFAULT_CATALOG_PATH = Path(__file__).resolve().parent.parent / "ingredients.csv"
+DEFAULT_UNIT = "枚"
+
+
+@dataclass(frozen=True, eq=False)
+class IngredientCatalog:
+    """ネタの一覧（並び順 = 整数 ID）"""
+    names: Tuple[str, ...]
+    lots: np.ndarray            # (ネタ数,) 発注ロット
+    units: Tuple[str, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "_index", {name: i for i, name in enumerate(self.names)})
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name) -> bool:
+        return name in self._index
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """ネタ名 -> 整数 ID"""
+        return self._index
+
+    def id(self, name: str) -> int:
+        return self._index[name]
+
+    @property
+    def order_lot(self) -> Dict[str, int]:
+        return {name: int(lot) for name, lot in zip(self.names, self.lots)}
+
+    def rows(self) -> List[Tuple[str, int, str]]:
+        return [(name, int(lot), unit) for name, lot, unit in zip(self.names, self.lots, self.units)]
+
+    def vector(self, values: Mapping[str, int], dtype=np.int64) -> np.ndarray:
+        """{ネタ名: 値} を ID 順のベクトルにする（カタログにないネタは無視）"""
+        vec = np.zeros(len(self.names), dtype=dtype)
+        for name, value in values.items():
+            j = self._index.get(name)
+            if j is not None:
+                vec[j] = value
+        return vec
+
+
+def catalog_from_rows(rows: Sequence[Tuple[str, int, str]]) -> IngredientCatalog:
+    names = tuple(name for name, _, _ in rows)
+    if len(set(names)) != len(names):
+        raise ValueError("ネタ名が重複しています")
+    lots = np.array([max(1, int(lot)) for _, lot, _ in rows], dtype=np.int64)
+    units = tuple(unit or DEFAULT_UNIT for _, _, unit in rows)
+    return IngredientCatalog(names, lots, units)
+
+
+def read_catalog_csv(path: Union[str, Path] = DEFAULT_CATALOG_PATH) -> IngredientCatalog:
+    """「ネタ,発注ロット,単位」の CSV（BOM 付き UTF-8 可）を読み込む"""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rows = [
+            (row["ネタ"].strip(), int(row.get("発注ロット") or 1), (row.get("単位") or DEFAULT_UNIT).strip())
+            for row in csv.DictReader(f)
+            if row.get("ネタ", "").strip()
+        ]
+    return catalog_from_rows(rows)
+
+
+def load_catalog(storage, seed_path: Union[str, Path] = DEFAULT_CATALOG_PATH) -> IngredientCatalog:
+    """データベースのネタ一覧を読む。空ならファイルから登録する"""
+    rows = storage.load_ingredients()
+    if rows:
+        return catalog_from_rows(rows)
+    catalog = read_catalog_csv(seed_path)
+    storage.save_ingredients(catalog.rows())
+    return catalog
+
+
+def ingredient_names(ingredients: Union[IngredientCatalog, Sequence[str]]) -> List[str]:
+    return list(ingredients.names) if isinstance(ingredients, IngredientCatalog) else list(ingredients)
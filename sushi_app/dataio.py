@@ -0,0 +1,381 @@
+"""在庫・製造計画の取り込みと、レポート・発注の書き出し
+
+ファイルは一定の件数ずつ読み書きし、ファイル全体をメモリに載せない。
+CSV は pandas の chunksize、JSONL は1行ずつのジェネレータで読む。
+
+取り込める形式（CSV は BOM 付き UTF-8 可）:
+
+- 在庫 CSV:    [店舗,]ネタ,在庫枚数
+- 在庫 JSONL:  {"店舗": ..., "ネタ": ..., "在庫枚数": ...}
+               または {"店舗": ..., "在庫": {"マグロ": 3, ...}}
+- 計画 CSV:    店舗,日付,セット名,製造数
+- 計画 JSONL:  {"店舗": ..., "日付": ..., "セット名": ..., "製造数": ...}
+               または {"店舗": ..., "日付": ..., "計画": {"極上セット": 10, ...}}
+
+計画の日付は「2024年01月05日」「2024-01-05」「2024/1/5」「20240105」のどれでもよく、
+画面のレポート日付と同じ「2024年01月05日」の表記にそろえて保存する。
+
+店舗の指定がない在庫はこの端末の在庫（タブ③）として保存する。
+
+    python -m sushi_app.dataio import-inventory inventory.csv
+    python -m sushi_app.dataio export-orders orders.csv
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from sushi_app.catalog import IngredientCatalog, load_catalog
+
+Source = Union[str, Path, IO]
+
+DEFAULT_CHUNKSIZE = 5000
+MAX_ERRORS = 100
+DATE_FORMAT = "%Y年%m月%d日"   # 画面のレポート日付と同じ表記
+DATE_INPUT_FORMATS = (DATE_FORMAT, "%Y-%m-%d", "%Y/%m/%d", "%Y%m%d")
+
+
+# ----------------------------------------
+# 取り込み結果
+# ----------------------------------------
+@dataclass
+class ImportResult:
+    """取り込み件数とエラー（エラーは先頭 MAX_ERRORS 件だけ保持する）"""
+    applied: int = 0
+    error_count: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    def add_error(self, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+
+# ----------------------------------------
+# 読み込み（ジェネレータ）
+# ----------------------------------------
+def detect_format(source: Source, fmt: Optional[str] = None) -> str:
+    if fmt:
+        return fmt
+    name = str(source) if isinstance(source, (str, Path)) else getattr(source, "name", "")
+    return "jsonl" if str(name).lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def iter_csv_chunks(source: Source, chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[List[Tuple[int, dict]]]:
+    """CSV を chunksize 行ずつ [(行番号, 行)] にして返す（行番号はヘッダを1行目とする）"""
+    import pandas as pd   # 読み込みに時間がかかるため、CSV を読むときだけ import する
+
+    line = 2
+    with pd.read_csv(source, encoding="utf-8-sig", chunksize=chunksize, dtype=str,
+                     keep_default_na=False) as reader:
+        for chunk in reader:
+            records = chunk.to_dict("records")
+            yield [(line + i, record) for i, record in enumerate(records)]
+            line += len(records)
+
+
+def iter_jsonl(source: Source) -> Iterator[Tuple[int, object]]:
+    """JSONL を1行ずつ (行番号, 値) にして返す。JSON として読めない行は値が None"""
+    with _open_text(source, "r") as f:
+        for line, text in enumerate(f, start=1):
+            text = text.strip()
+            if not text:
+                continue
+            try:
+                yield line, json.loads(text)
+            except json.JSONDecodeError:
+                yield line, None
+
+
+def iter_chunks(records: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_record_chunks(source: Source, fmt: Optional[str], chunksize: int,
+                       flatten: Callable[[dict], Iterable[dict]]) -> Iterator[List[Tuple[int, dict]]]:
+    """CSV / JSONL を同じ形の [(行番号, レコード)] のかたまりで返す
+
+    JSONL の入れ子形式（{"在庫": {...}} など）は flatten で1件ずつに展開する。
+    """
+    if detect_format(source, fmt) == "csv":
+        yield from iter_csv_chunks(source, chunksize)
+        return
+
+    def flat_records():
+        for line, value in iter_jsonl(source):
+            if not isinstance(value, dict):
+                yield line, None
+                continue
+            for record in flatten(value):
+                yield line, record
+
+    yield from iter_chunks(flat_records(), chunksize)
+
+
+@contextmanager
+def _open_text(target: Source, mode: str, encoding: str = "utf-8"):
+    """パスならファイルを開き、ファイルオブジェクトならテキストとして扱う"""
+    if isinstance(target, (str, Path)):
+        with open(target, mode, encoding=encoding, newline="") as f:
+            yield f
+    elif isinstance(target, io.TextIOBase):
+        yield target
+    else:
+        # バイナリ（アップロードされたファイルなど）
+        wrapper = io.TextIOWrapper(target, encoding=encoding, newline="")
+        try:
+            yield wrapper
+        finally:
+            wrapper.detach()
+
+
+def _to_count(value) -> int:
+    """0 以上の整数に変換する（変換できなければ ValueError）"""
+    if isinstance(value, str):
+        value = value.strip()
+    number = float(value)
+    # inf は int() で OverflowError になるため、先に有限の数か確かめる
+    if not math.isfinite(number) or number < 0 or number != int(number):
+        raise ValueError(value)
+    return int(number)
+
+
+def normalize_date(value) -> str:
+    """日付の文字列を DATE_FORMAT の表記にそろえる（読み取れなければ ValueError）"""
+    text = str(value).strip()
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    raise ValueError(f"日付『{text}』を読み取れません")
+
+
+def _text(record: Mapping, key: str) -> str:
+    value = record.get(key)
+    return "" if value is None else str(value).strip()
+
+
+# ----------------------------------------
+# 在庫の取り込み
+# ----------------------------------------
+def _flatten_inventory(value: dict) -> Iterable[dict]:
+    if isinstance(value.get("在庫"), dict):
+        return ({"店舗": value.get("店舗"), "ネタ": ing, "在庫枚数": qty} for ing, qty in value["在庫"].items())
+    return (value,)
+
+
+def iter_inventory_rows(source: Source, catalog: IngredientCatalog, result: ImportResult,
+                        fmt: Optional[str] = None,
+                        chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[List[Tuple[str, str, int]]]:
+    """在庫ファイルを検証し、[(店舗, ネタ, 在庫枚数)] のかたまりで返す（店舗なしは空文字）"""
+    for chunk in iter_record_chunks(source, fmt, chunksize, _flatten_inventory):
+        rows = []
+        for line, record in chunk:
+            if record is None:
+                result.add_error(f"{line} 行目: JSON として読み込めません")
+                continue
+            ing = _text(record, "ネタ")
+            if ing not in catalog:
+                result.add_error(f"{line} 行目: ネタ一覧にないネタです『{ing}』")
+                continue
+            try:
+                qty = _to_count(record.get("在庫枚数"))
+            except (TypeError, ValueError):
+                result.add_error(f"{line} 行目: 在庫枚数は0以上の整数で入力してください")
+                continue
+            rows.append((_text(record, "店舗"), ing, qty))
+        yield rows
+
+
+def import_inventory(storage, source: Source, catalog: Optional[IngredientCatalog] = None,
+                     fmt: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE) -> ImportResult:
+    """在庫ファイルを検証しながら少しずつ取り込む（かたまりごとに1トランザクション）"""
+    catalog = catalog or load_catalog(storage)
+    result = ImportResult()
+    local_inventory: Dict[str, int] = {}
+    for chunk in iter_inventory_rows(source, catalog, result, fmt, chunksize):
+        rows = []
+        for store, ing, qty in chunk:
+            if store:
+                rows.append((store, ing, qty))
+            else:
+                # この端末の在庫はネタの数までしか増えない
+                local_inventory[ing] = qty
+        if rows:
+            storage.upsert_store_inventory(rows)
+            result.applied += len(rows)
+    if local_inventory:
+        storage.save_inventory({ing: 0 for ing in catalog} | storage.load_inventory() | local_inventory)
+        result.applied += len(local_inventory)
+    return result
+
+
+# ----------------------------------------
+# 製造計画の取り込み
+# ----------------------------------------
+def _flatten_plan(value: dict) -> Iterable[dict]:
+    if isinstance(value.get("計画"), dict):
+        return ({"店舗": value.get("店舗"), "日付": value.get("日付"), "セット名": name, "製造数": count}
+                for name, count in value["計画"].items())
+    return (value,)
+
+
+def iter_plan_rows(source: Source, set_names: Iterable[str], result: ImportResult,
+                   fmt: Optional[str] = None,
+                   chunksize: int = DEFAULT_CHUNKSIZE) -> Iterator[List[Tuple[str, str, str, int]]]:
+    """製造計画ファイルを検証し、[(店舗, 日付, セット名, 製造数)] のかたまりで返す"""
+    known_sets = set(set_names)
+    for chunk in iter_record_chunks(source, fmt, chunksize, _flatten_plan):
+        rows = []
+        for line, record in chunk:
+            if record is None:
+                result.add_error(f"{line} 行目: JSON として読み込めません")
+                continue
+            store, day, name = _text(record, "店舗"), _text(record, "日付"), _text(record, "セット名")
+            if not store or not day:
+                result.add_error(f"{line} 行目: 店舗と日付は必須です")
+                continue
+            if name not in known_sets:
+                result.add_error(f"{line} 行目: 登録されていないセットです『{name}』")
+                continue
+            try:
+                day = normalize_date(day)
+            except ValueError as e:
+                result.add_error(f"{line} 行目: {e}")
+                continue
+            try:
+                count = _to_count(record.get("製造数"))
+            except (TypeError, ValueError):
+                result.add_error(f"{line} 行目: 製造数は0以上の整数で入力してください")
+                continue
+            rows.append((store, day, name, count))
+        yield rows
+
+
+def import_plans(storage, source: Source, set_names: Optional[Iterable[str]] = None,
+                 fmt: Optional[str] = None, chunksize: int = DEFAULT_CHUNKSIZE) -> ImportResult:
+    """店舗別の製造計画ファイルを検証しながら少しずつ取り込む"""
+    result = ImportResult()
+    set_names = set_names if set_names is not None else storage.load_sets()
+    for rows in iter_plan_rows(source, set_names, result, fmt, chunksize):
+        if rows:
+            storage.upsert_store_plans(rows)
+            result.applied += len(rows)
+    return result
+
+
+# ----------------------------------------
+# 書き出し
+# ----------------------------------------
+def write_records(dest: Source, records: Iterable[dict], columns: List[str], fmt: str = "csv") -> int:
+    """レコードを1件ずつ書き出す（CSV は BOM 付き UTF-8）。書き出した件数を返す"""
+    count = 0
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with _open_text(dest, "w", encoding=encoding) as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+        else:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+    return count
+
+
+def export_store_inventory(storage, dest: Source, fmt: str = "csv") -> int:
+    records = ({"店舗": store, "ネタ": ing, "在庫枚数": qty}
+               for store, ing, qty in storage.iter_store_inventory())
+    return write_records(dest, records, ["店舗", "ネタ", "在庫枚数"], fmt)
+
+
+def export_store_plans(storage, dest: Source, fmt: str = "csv", plan_date: Optional[str] = None) -> int:
+    records = ({"店舗": store, "日付": day, "セット名": name, "製造数": count}
+               for store, day, name, count in storage.iter_store_plans(plan_date))
+    return write_records(dest, records, ["店舗", "日付", "セット名", "製造数"], fmt)
+
+
+def export_reports(storage, dest: Source, kind: Optional[str] = None) -> int:
+    """保存済みレポートを JSONL で書き出す"""
+    records = ({"種別": k, "日付": day, "作成日時": created_at, "内容": payload}
+               for k, day, created_at, payload in storage.iter_reports(kind))
+    return write_records(dest, records, [], "jsonl")
+
+
+def export_orders(storage, dest: Source, fmt: str = "csv") -> int:
+    """発注計算の明細（仕入先別）を書き出す"""
+    def records():
+        for _, day, created_at, payload in storage.iter_reports("order"):
+            for line in payload.get("lines", []):
+                yield {
+                    "日付": day,
+                    "作成日時": created_at,
+                    "ネタ": line["ingredient"],
+                    "仕入先": line["supplier"],
+                    "発注数量": line["quantity"],
+                    "単価": line["unit_price"],
+                    "発注金額": line["cost"],
+                }
+
+    return write_records(dest, records(), ["日付", "作成日時", "ネタ", "仕入先", "発注数量", "単価", "発注金額"], fmt)
+
+
+# ----------------------------------------
+# コマンドライン
+# ----------------------------------------
+def main(argv=None) -> int:
+    from sushi_app.storage import open_storage
+
+    parser = argparse.ArgumentParser(prog="python -m sushi_app.dataio", description="在庫・計画の取り込みと書き出し")
+    parser.add_argument("--db", help="データベースのパス（既定は SUSHI_DB_PATH または sushi.db）")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="ファイル形式（既定は拡張子から判定）")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("import-inventory", "import-plans", "export-inventory", "export-plans",
+                 "export-reports", "export-orders"):
+        sub.add_parser(name).add_argument("path")
+    args = parser.parse_args(argv)
+
+    # 画面・API と同じく、セットが未登録なら初期のセットを登録してから取り込む
+    storage = open_storage(args.db)
+    if args.command.startswith("import-"):
+        importer = import_inventory if args.command == "import-inventory" else import_plans
+        result = importer(storage, args.path, fmt=args.format, chunksize=args.chunksize)
+        print(f"取り込み: {result.applied} 件 / エラー: {result.error_count} 件")
+        for error in result.errors:
+            print(error, file=sys.stderr)
+        return 1 if result.error_count else 0
+
+    fmt = detect_format(args.path, args.format)
+    if args.command == "export-inventory":
+        count = export_store_inventory(storage, args.path, fmt)
+    elif args.command == "export-plans":
+        count = export_store_plans(storage, args.path, fmt)
+    elif args.command == "export-reports":
+        count = export_reports(storage, args.path)
+    else:
+        count = export_orders(storage, args.path, fmt)
+    print(f"書き出し: {count} 件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""初期データ・固定情報"""
+
+# ----------------------------------------
+# 初期セット情報（データベースが空の場合に登録）
+# ----------------------------------------
+DEFAULT_SETS = {
+    "極上セット": {
+        "レシピ": {"マグロ": 3, "サーモン": 2, "イカ": 1, "玉子": 1, "エビ": 2, "ホタテ": 1},
+        "販売価格": 1480,
+        "ステータス": "通常"
+    },
+    "季節の彩りセット": {
+        "レシピ": {"マグロ": 2, "サーモン": 2, "イカ": 2, "玉子": 1, "エビ": 1, "ホタテ": 1},
+        "販売価格": 1280,
+        "ステータス": "通常"
+    }
+}
+
+# ネタ・発注ロットの一覧は ingredients.csv（初回にデータベースへ登録）
+
+STATUS_OPTIONS = ["通常", "広告品", "特売", "イベント"]
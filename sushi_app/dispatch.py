@@ -0,0 +1,188 @@
+"""発注の送信（仕入先ごとに分けて非同期に送る）
+
+- タブ④の発注明細を仕入先ごとにまとめ、冪等キー付きでアウトボックス（order_outbox）に登録する。
+  冪等キーは発注日・仕入先・版から決まる。発注を計算し直して登録すると、明細が変わった未送信・失敗の分は
+  取り消して版を上げた新しいキーで登録し直し、新しい発注にない仕入先の分は取り消す。送信済みの分はそのまま
+  （二重に発注しない）。同じキーで内容だけ変えると、仕入先が受け付け済みのとき古い注文の応答が返るため。
+- アウトボックスの未送信分は、接続を使い回す aiohttp のセッションで複数の仕入先へ同時に送る。
+  リクエストには Idempotency-Key ヘッダを付け、仕入先は同じキーの注文を1回だけ受け付ける。
+  送信後・記録前に止まっても、次回は同じキーで送り直すだけなので二重発注にならない。
+- 接続の失敗・タイムアウト・429・5xx は間隔を伸ばしながら送り直し、それ以外の 4xx は失敗とする。
+  試行回数は1回ごとに記録し、合計が max_attempts に達したものも失敗とする。
+
+    python -m sushi_app.mock_supplier --port 8090 &
+    python -m sushi_app.dispatch --enqueue-latest
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Mapping, Optional
+from urllib.parse import quote
+
+import aiohttp
+
+DEFAULT_URL_TEMPLATE = "http://127.0.0.1:8090/suppliers/{supplier}/orders"
+DEFAULT_CONCURRENCY = 8
+DEFAULT_MAX_ATTEMPTS = 5
+MAX_DELAY = 30.0
+
+
+# ----------------------------------------
+# アウトボックスへの登録
+# ----------------------------------------
+def split_by_supplier(lines: Iterable[Mapping]) -> Dict[str, List[dict]]:
+    """発注明細（OrderPlan.lines）を仕入先ごとに分ける"""
+    orders: Dict[str, List[dict]] = {}
+    for line in lines:
+        orders.setdefault(line["supplier"], []).append({
+            "ingredient": line["ingredient"],
+            "lots": int(line["lots"]),
+            "quantity": int(line["quantity"]),
+            "unit_price": float(line["unit_price"]),
+        })
+    return orders
+
+
+def idempotency_key(order_date: str, supplier: str, revision: int = 1) -> str:
+    """発注日・仕入先・版ごとの冪等キー（明細が変わると版が上がり、別のキーになる）"""
+    content = json.dumps([order_date, supplier, revision], ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def enqueue_order(storage, order_date: str, lines: Iterable[Mapping]) -> int:
+    """発注を仕入先ごとにアウトボックスへ登録し、登録・置き換えた件数を返す（送信済みの仕入先は数えない）"""
+    orders = {}
+    for supplier, supplier_lines in split_by_supplier(lines).items():
+        orders[supplier] = {
+            "order_date": order_date,
+            "supplier": supplier,
+            "lines": supplier_lines,
+            "total": round(sum(line["quantity"] * line["unit_price"] for line in supplier_lines)),
+        }
+    return storage.enqueue_outbox(order_date, orders, idempotency_key)
+
+
+# ----------------------------------------
+# 送信
+# ----------------------------------------
+@dataclass
+class DispatchResult:
+    sent: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def supplier_url(template: str, supplier: str, endpoints: Optional[Mapping[str, str]] = None) -> str:
+    if endpoints and supplier in endpoints:
+        return endpoints[supplier]
+    return template.format(supplier=quote(supplier, safe=""))
+
+
+def _delay(attempt: int, base_delay: float, retry_after: Optional[str]) -> float:
+    if retry_after:
+        try:
+            return min(MAX_DELAY, float(retry_after))
+        except ValueError:
+            pass
+    return min(MAX_DELAY, base_delay * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+
+
+async def _send(session: aiohttp.ClientSession, storage, url: str, key: str, payload: dict, attempts: int,
+                max_attempts: int, base_delay: float) -> str:
+    """1件の発注を送り、最終的な状態（sent / failed）を返す"""
+    error = ""
+    while attempts < max_attempts:
+        attempts += 1
+        retry_after = None
+        try:
+            async with session.post(url, json=payload, headers={"Idempotency-Key": key}) as response:
+                text = await response.text()
+                if response.status < 300:
+                    await asyncio.to_thread(storage.update_outbox, key, "sent", attempts, "", text)
+                    return "sent"
+                error = f"HTTP {response.status}: {text[:200]}"
+                if response.status != 429 and response.status < 500:
+                    await asyncio.to_thread(storage.update_outbox, key, "failed", attempts, error)
+                    return "failed"
+                retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+        # 試行回数は毎回記録する（途中で止まっても回数を引き継ぐ）
+        status = "pending" if attempts < max_attempts else "failed"
+        await asyncio.to_thread(storage.update_outbox, key, status, attempts, error)
+        if status == "failed":
+            return "failed"
+        await asyncio.sleep(_delay(attempts, base_delay, retry_after))
+    return "failed"
+
+
+async def dispatch_pending(storage, url_template: str = DEFAULT_URL_TEMPLATE,
+                           endpoints: Optional[Mapping[str, str]] = None,
+                           concurrency: int = DEFAULT_CONCURRENCY,
+                           max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                           base_delay: float = 0.5, timeout: float = 10.0) -> DispatchResult:
+    """アウトボックスの未送信の発注をすべて送る"""
+    rows = await asyncio.to_thread(storage.pending_outbox)
+    result = DispatchResult()
+    if not rows:
+        return result
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        statuses = await asyncio.gather(*(
+            _send(session, storage, supplier_url(url_template, supplier, endpoints), key, payload, attempts,
+                  max_attempts, base_delay)
+            for key, supplier, payload, attempts in rows
+        ))
+    for (key, supplier, _, _), status in zip(rows, statuses):
+        if status == "sent":
+            result.sent += 1
+        else:
+            result.failed += 1
+            result.errors.append(f"{supplier}: 送信できませんでした（{key[:8]}）")
+    return result
+
+
+def dispatch(storage, **kwargs) -> DispatchResult:
+    """dispatch_pending を同期的に実行する（画面・コマンドライン用）"""
+    return asyncio.run(dispatch_pending(storage, **kwargs))
+
+
+# ----------------------------------------
+# コマンドライン
+# ----------------------------------------
+def main(argv=None) -> int:
+    from sushi_app.storage import Storage
+
+    parser = argparse.ArgumentParser(prog="python -m sushi_app.dispatch", description="発注の送信")
+    parser.add_argument("--db", help="データベースのパス（既定は SUSHI_DB_PATH または sushi.db）")
+    parser.add_argument("--url", default=os.environ.get("SUSHI_SUPPLIER_URL", DEFAULT_URL_TEMPLATE),
+                        help="送信先（{supplier} が仕入先名に置き換わる）")
+    parser.add_argument("--enqueue-latest", action="store_true", help="最後に計算した発注をアウトボックスに登録する")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    args = parser.parse_args(argv)
+
+    storage = Storage(args.db)
+    if args.enqueue_latest:
+        report = storage.load_report("order")
+        if report is None:
+            print("計算済みの発注がありません", file=sys.stderr)
+            return 1
+        (order_date,), = storage.iter_query("SELECT report_date FROM reports WHERE kind = 'order' "
+                                            "ORDER BY id DESC LIMIT 1")
+        print(f"登録: {enqueue_order(storage, order_date, report['lines'])} 件", file=sys.stderr)
+    result = dispatch(storage, url_template=args.url, concurrency=args.concurrency, max_attempts=args.max_attempts)
+    for error in result.errors:
+        print(error, file=sys.stderr)
+    print(f"送信: {result.sent} 件 / 失敗: {result.failed} 件")
+    storage.close()
+    return 1 if result.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""製造数の需要予測
+
+日々の製造実績（タブ①で計算した製造数）から、セットごとに翌日の製造数を予測する。
+
+セットごとの線形回帰（リッジ回帰）:
+
+    製造数 ≈ 定数 + 曜日の効果（月曜との差） + ステータスの効果（通常との差）
+
+- 説明変数はすべて「曜日 × ステータス」の組（7 × ステータス数 通り）で決まるため、
+  実績は組ごとの重みの合計・製造数の重み付き合計（セット × 組の2次元配列）に集約して持つ。
+  全セットの正規方程式はこの集約から einsum でまとめて作り、まとめて解く。
+- 古い実績ほど軽くする（半減期 half_life_days 日）。1日分の実績を追加するときは、
+  集約全体に減衰を掛けてからその日の分を足すだけでよい（全期間を読み直さない）。
+- 同じ日の実績を保存し直した場合は、前に足した分を引いてから足し直す。
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from sushi_app.defaults import STATUS_OPTIONS
+
+N_DOW = 7
+N_STATUS = len(STATUS_OPTIONS)
+N_PATTERNS = N_DOW * N_STATUS
+STATUS_CODE = {status: k for k, status in enumerate(STATUS_OPTIONS)}
+
+
+def _design_matrix() -> np.ndarray:
+    """組（曜日 × ステータス）ごとの説明変数 (組の数, 変数の数)
+
+    変数は [定数, 火〜日の6つ, 通常以外のステータス] のダミー変数。
+    """
+    x = np.zeros((N_PATTERNS, 1 + (N_DOW - 1) + (N_STATUS - 1)))
+    for dow in range(N_DOW):
+        for code in range(N_STATUS):
+            row = x[dow * N_STATUS + code]
+            row[0] = 1.0
+            if dow > 0:
+                row[dow] = 1.0
+            if code > 0:
+                row[N_DOW - 1 + code] = 1.0
+    return x
+
+
+DESIGN = _design_matrix()
+
+
+def pattern_of(day: date, status: str) -> int:
+    return day.weekday() * N_STATUS + STATUS_CODE.get(status, 0)
+
+
+class DemandForecaster:
+    """全セットの回帰モデル（実績の集約を持ち、1日ずつ追加できる）"""
+
+    def __init__(self, half_life_days: float = 90.0, ridge: float = 1.0, min_weight: float = 1.0):
+        self.half_life_days = half_life_days
+        self.decay = 0.5 ** (1.0 / half_life_days)
+        self.ridge = ridge
+        self.min_weight = min_weight        # 重みの合計がこれ未満のセットは予測しない
+        self.set_names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self.weight = np.zeros((0, N_PATTERNS))          # 組ごとの重みの合計
+        self.weighted_sum = np.zeros((0, N_PATTERNS))    # 組ごとの 重み × 製造数 の合計
+        self.as_of: Optional[date] = None                # 重みの基準日（最新の実績の日）
+        self._days: Dict[date, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._coef: Optional[np.ndarray] = None
+
+    # ----------------------------------------
+    # 実績の追加
+    # ----------------------------------------
+    def _set_ids(self, names: Sequence[str]) -> np.ndarray:
+        new = [name for name in dict.fromkeys(names) if name not in self._index]
+        if new:
+            for name in new:
+                self._index[name] = len(self.set_names)
+                self.set_names.append(name)
+            pad = np.zeros((len(new), N_PATTERNS))
+            self.weight = np.vstack([self.weight, pad])
+            self.weighted_sum = np.vstack([self.weighted_sum, pad])
+        return np.array([self._index[name] for name in names], dtype=np.int64)
+
+    def _advance(self, day: date) -> None:
+        """基準日を day まで進め、それまでの実績を減衰させる"""
+        if self.as_of is None:
+            self.as_of = day
+        elif day > self.as_of:
+            factor = self.decay ** (day - self.as_of).days
+            self.weight *= factor
+            self.weighted_sum *= factor
+            self.as_of = day
+
+    def _apply(self, ids: np.ndarray, patterns: np.ndarray, counts: np.ndarray, weights: np.ndarray) -> None:
+        np.add.at(self.weight, (ids, patterns), weights)
+        np.add.at(self.weighted_sum, (ids, patterns), weights * counts)
+        self._coef = None
+
+    def add_day(self, day: date, counts: Mapping[str, int], statuses: Mapping[str, str]) -> None:
+        """1日分の実績を追加する（同じ日があれば置き換える）"""
+        self._remove_day(day)
+        names = list(counts)
+        ids = self._set_ids(names)
+        patterns = np.array([pattern_of(day, statuses.get(name, "通常")) for name in names], dtype=np.int64)
+        y = np.array([counts[name] for name in names], dtype=np.float64)
+        self._advance(day)
+        self._apply(ids, patterns, y, np.full(len(ids), self.decay ** (self.as_of - day).days))
+        self._days[day] = (ids, patterns, y)
+
+    def _remove_day(self, day: date) -> None:
+        previous = self._days.pop(day, None)
+        if previous is not None:
+            ids, patterns, y = previous
+            self._apply(ids, patterns, y, np.full(len(ids), -self.decay ** (self.as_of - day).days))
+
+    def fit(self, rows: Iterable[Tuple[str, str, int, str]]) -> None:
+        """実績 [(日付 YYYY-MM-DD, セット名, 製造数, ステータス)] からまとめて作り直す"""
+        self.__init__(self.half_life_days, self.ridge, self.min_weight)
+        self.update(rows)
+
+    def update(self, rows: Iterable[Tuple[str, str, int, str]]) -> None:
+        """実績を追加する。日付ごとに add_day と同じ結果になる（日付の行はその日の全セット分）"""
+        rows = list(rows)
+        if not rows:
+            return
+        days = np.array([date.fromisoformat(r[0]).toordinal() for r in rows], dtype=np.int64)
+        names = [r[1] for r in rows]
+        y = np.array([r[2] for r in rows], dtype=np.float64)
+        dows = (days + 6) % 7   # date.weekday() と同じ（0001-01-01 は月曜）
+        codes = np.array([STATUS_CODE.get(r[3], 0) for r in rows], dtype=np.int64)
+        patterns = dows * N_STATUS + codes
+
+        for ordinal in np.unique(days):
+            self._remove_day(date.fromordinal(int(ordinal)))
+        ids = self._set_ids(names)
+        self._advance(date.fromordinal(int(days.max())))
+        ages = self.as_of.toordinal() - days
+        self._apply(ids, patterns, y, self.decay ** ages)
+
+        # 置き換えに備えて日ごとの実績を控えておく
+        order = np.argsort(days, kind="stable")
+        unique_days, starts = np.unique(days[order], return_index=True)
+        for ordinal, part in zip(unique_days, np.split(order, starts[1:])):
+            self._days[date.fromordinal(int(ordinal))] = (ids[part], patterns[part], y[part])
+
+    # ----------------------------------------
+    # 予測
+    # ----------------------------------------
+    def coefficients(self) -> np.ndarray:
+        """全セットの回帰係数 (セット数, 変数の数) を1度に解く"""
+        if self._coef is None:
+            k = DESIGN.shape[1]
+            xtx = np.einsum("sp,pi,pj->sij", self.weight, DESIGN, DESIGN)
+            xty = np.einsum("sp,pi->si", self.weighted_sum, DESIGN)
+            penalty = np.full(k, self.ridge)
+            penalty[0] = 1e-6   # 定数項はほとんど縮めない
+            xtx[:, np.arange(k), np.arange(k)] += penalty
+            self._coef = np.linalg.solve(xtx, xty[..., None])[..., 0]
+        return self._coef
+
+    def predict(self, day: date, statuses: Mapping[str, str]) -> Dict[str, int]:
+        """day の製造数の予測 {セット名: 製造数}（実績が足りないセットは含めない）"""
+        names = [name for name in statuses if name in self._index]
+        if not names:
+            return {}
+        ids = np.array([self._index[name] for name in names], dtype=np.int64)
+        patterns = np.array([pattern_of(day, statuses[name]) for name in names], dtype=np.int64)
+        coef = self.coefficients()[ids]
+        values = np.einsum("si,si->s", coef, DESIGN[patterns])
+        enough = self.weight[ids].sum(axis=1) >= self.min_weight
+        return {
+            name: int(round(max(0.0, value)))
+            for name, value, ok in zip(names, values, enough) if ok
+        }
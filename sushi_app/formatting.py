@@ -0,0 +1,27 @@
+"""表示用の書式（金額の ¥ 表記など）
+
+計算結果・保存するレポートの行は数値のまま持ち、画面・ファイルに出すときだけ書式を付ける。
+以前に保存したレポートの文字列（"¥1,200" など）はそのまま表示する。
+"""
+from typing import Iterable, List, Mapping
+
+# 金額として ¥ 表記にする列
+YEN_COLUMNS = frozenset({
+    "販売価格", "販売単価", "製造金額", "目標製造金額", "発注金額", "入荷分の発注金額",
+    "売上", "売上−発注金額",
+})
+
+
+def yen(value) -> str:
+    if isinstance(value, str):
+        return value
+    return f"¥{round(value):,}"
+
+
+def format_value(column: str, value):
+    return yen(value) if column in YEN_COLUMNS and value is not None else value
+
+
+def format_rows(rows: Iterable[Mapping]) -> List[dict]:
+    """表示用に書式を付けた行のコピーを返す"""
+    return [{column: format_value(column, value) for column, value in row.items()} for row in rows]
@@ -0,0 +1,200 @@
+"""複数日（7〜14日）の在庫の持ち越し・消費期限・入荷の計算
+
+日ごとの製造計画から、期間中の在庫の動きと日ごとの発注予定を求める。
+
+- ネタ使用数は全日分をまとめて（日 × セットの2次元配列で）計算する。
+- 在庫は「あと何日使えるか」ごとの枚数（ネタ × 残り日数の2次元配列）で持ち、
+  古いものから使う（先入れ先出し）。1日の処理は全ネタまとめて配列演算で行う:
+  入荷を加える → 使用数を古い順に差し引く → 期限切れを廃棄して1日進める。
+- 入荷は入荷曜日だけ。各入荷日には、次の入荷日の前日まで（消費期限の範囲内）に
+  不足する枚数を、その時点の在庫を先に進めて求め、タブ④と同じ最安の発注を行う。
+  新しいロットは最後に使われるため、古い在庫の使い方は変わらず、不足分だけを埋める。
+- 計算開始時点の在庫は、その日に入荷したもの（消費期限いっぱい使える）として扱う。
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from sushi_app.catalog import IngredientCatalog, ingredient_names
+from sushi_app.ordering import OrderPlan, SupplierOffer, solve_orders
+from sushi_app.planning import RecipeMatrix, compute_plan
+
+DEFAULT_SHELF_LIFE = 3        # 消費期限（入荷日を含めて使える日数）
+DEFAULT_HORIZON_DAYS = 7
+MAX_HORIZON_DAYS = 14
+WEEKDAY_LABELS = ["月", "火", "水", "木", "金", "土", "日"]
+
+
+@dataclass
+class HorizonSettings:
+    """期間・消費期限・入荷の条件"""
+    days: int = DEFAULT_HORIZON_DAYS
+    shelf_life: Mapping[str, int] = field(default_factory=dict)   # ネタ -> 日数（未指定は既定値）
+    delivery_weekdays: Sequence[int] = tuple(range(7))            # 入荷する曜日（0 = 月曜）
+    lead_time: int = 1                                            # 発注から入荷までの日数
+
+    def shelf_life_vector(self, ingredients: Sequence[str]) -> np.ndarray:
+        return np.array([max(1, int(self.shelf_life.get(ing, DEFAULT_SHELF_LIFE))) for ing in ingredients],
+                        dtype=np.int64)
+
+
+@dataclass
+class Delivery:
+    """1回分の発注（発注日に注文し、入荷日に届く）"""
+    order_date: date
+    delivery_date: date
+    plan: OrderPlan
+
+
+@dataclass
+class HorizonResult:
+    """期間中の日ごとの計算結果（配列はすべて (日数, ネタ数)）"""
+    dates: List[date]
+    ingredients: List[str]
+    usage: np.ndarray       # 使用枚数
+    arrivals: np.ndarray    # 入荷枚数
+    shortage: np.ndarray    # 在庫・入荷で足りなかった枚数
+    waste: np.ndarray       # 期限切れで廃棄した枚数
+    closing: np.ndarray     # 1日の終わりの在庫（廃棄後）
+    deliveries: List[Delivery]
+    revenue: np.ndarray     # (日数,) 製造金額
+
+    @property
+    def order_cost(self) -> float:
+        return sum(d.plan.total_cost for d in self.deliveries)
+
+    def schedule_rows(self) -> List[dict]:
+        """日ごとの発注予定（仕入先ごとの明細）"""
+        rows = []
+        for d in self.deliveries:
+            for line in d.plan.lines:
+                rows.append({
+                    "発注日": format_day(d.order_date),
+                    "入荷日": format_day(d.delivery_date),
+                    "ネタ": line["ingredient"],
+                    "仕入先": line["supplier"],
+                    "ロット数": line["lots"],
+                    "発注数量": line["quantity"],
+                    "発注金額": round(line["cost"]),
+                })
+        return rows
+
+    def daily_rows(self) -> List[dict]:
+        """日ごとの集計（全ネタの合計）"""
+        cost_by_day: Dict[date, float] = {}
+        for d in self.deliveries:
+            cost_by_day[d.delivery_date] = cost_by_day.get(d.delivery_date, 0.0) + d.plan.total_cost
+        return [
+            {
+                "日付": format_day(day),
+                "製造金額": int(self.revenue[t]),
+                "使用枚数": int(self.usage[t].sum()),
+                "入荷枚数": int(self.arrivals[t].sum()),
+                "不足枚数": int(self.shortage[t].sum()),
+                "廃棄枚数": int(self.waste[t].sum()),
+                "翌日への在庫": int(self.closing[t].sum()),
+                "入荷分の発注金額": round(cost_by_day.get(day, 0.0)),
+            }
+            for t, day in enumerate(self.dates)
+        ]
+
+
+def format_day(day: date) -> str:
+    return f"{day.month}/{day.day}({WEEKDAY_LABELS[day.weekday()]})"
+
+
+# ----------------------------------------
+# 1日分の在庫の動き（全ネタまとめて）
+# ----------------------------------------
+def consume_fifo(stock: np.ndarray, demand: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """残り日数の短い在庫から demand を差し引き、(残りの在庫, 不足枚数) を返す
+
+    stock は (ネタ数, 残り日数)、demand は (ネタ数,)。
+    """
+    cum = np.cumsum(stock, axis=1)
+    left = np.maximum(cum - demand[:, None], 0)
+    remaining = np.diff(left, axis=1, prepend=0)
+    return remaining, np.maximum(demand - cum[:, -1], 0)
+
+
+def age_stock(stock: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """1日進める。残り日数 0 の在庫は廃棄し、(翌日の在庫, 廃棄枚数) を返す"""
+    aged = np.zeros_like(stock)
+    aged[:, :-1] = stock[:, 1:]
+    return aged, stock[:, 0].copy()
+
+
+def _window_shortage(stock: np.ndarray, demand: np.ndarray, life: np.ndarray) -> np.ndarray:
+    """入荷日から demand の日数分を入荷なしで進めたときの不足枚数の合計
+
+    新しいロットで埋められるのは消費期限の範囲内の日だけなので、それ以降の日は数えない。
+    """
+    total = np.zeros(stock.shape[0], dtype=np.int64)
+    for k in range(demand.shape[0]):
+        stock, short = consume_fifo(stock, demand[k])
+        total += np.where(k < life, short, 0)
+        stock, _ = age_stock(stock)
+    return total
+
+
+# ----------------------------------------
+# 期間全体の計算
+# ----------------------------------------
+def delivery_days(dates: Sequence[date], settings: HorizonSettings, today: date) -> List[int]:
+    """入荷できる日（入荷曜日で、発注日が今日以降のもの）の位置"""
+    weekdays = set(settings.delivery_weekdays)
+    return [
+        t for t, day in enumerate(dates)
+        if day.weekday() in weekdays and day - timedelta(days=settings.lead_time) >= today
+    ]
+
+
+def simulate_horizon(matrix: RecipeMatrix,
+                     ingredients: Union[IngredientCatalog, Sequence[str]],
+                     plans: np.ndarray,
+                     inventory: Mapping[str, int],
+                     offers: Sequence[SupplierOffer],
+                     start: date,
+                     settings: Optional[HorizonSettings] = None,
+                     today: Optional[date] = None) -> HorizonResult:
+    """日ごとの製造計画 plans (日数, セット数) から在庫の動きと発注予定を計算する
+
+    matrix の列は ingredients と同じ並びであること（get_recipe_matrix の行列）。
+    """
+    settings = settings or HorizonSettings(days=plans.shape[0])
+    names = ingredient_names(ingredients)
+    n_days = plans.shape[0]
+    dates = [start + timedelta(days=t) for t in range(n_days)]
+    today = today or start - timedelta(days=1)
+
+    plan_result = compute_plan(matrix, plans)
+    usage = plan_result.usage
+    life = settings.shelf_life_vector(names)
+    n_ing = len(names)
+    stock = np.zeros((n_ing, int(life.max(initial=1))), dtype=np.int64)
+    stock[np.arange(n_ing), life - 1] = [int(inventory.get(ing, 0)) for ing in names]
+
+    arrivals = np.zeros((n_days, n_ing), dtype=np.int64)
+    shortage = np.zeros_like(arrivals)
+    waste = np.zeros_like(arrivals)
+    closing = np.zeros_like(arrivals)
+    deliveries = []
+    receive = delivery_days(dates, settings, today)
+    next_receive = dict(zip(receive, receive[1:] + [n_days]))
+
+    for t in range(n_days):
+        if t in next_receive:
+            need = _window_shortage(stock, usage[t:next_receive[t]], life)
+            if need.any():
+                order_plan = solve_orders(ingredients, dict(zip(names, need.tolist())), {}, offers)
+                arrivals[t] = order_plan.quantity
+                stock[np.arange(n_ing), life - 1] += order_plan.quantity
+                deliveries.append(Delivery(dates[t] - timedelta(days=settings.lead_time), dates[t], order_plan))
+        stock, shortage[t] = consume_fifo(stock, usage[t])
+        stock, waste[t] = age_stock(stock)
+        closing[t] = stock.sum(axis=1)
+
+    return HorizonResult(dates, names, usage, arrivals, shortage, waste, closing, deliveries,
+                         plan_result.total)
@@ -0,0 +1,146 @@
+"""製造計画の集計を差分で更新する
+
+製造数・レシピ・在庫のどれかが変わるたびに全セットを計算し直すのではなく、
+変わったセットの分だけを引いて足し直し、ネタ使用数・製造金額・在庫に対する不足枚数を
+常に最新に保つ。
+
+    製造数（セット）──┐
+    レシピ・販売価格 ─┼─> ネタ使用数 ─┐
+                      └─> 製造金額     ├─> 不足枚数（ネタ）
+    在庫（ネタ）───────────────────────┘
+
+- 製造数の変更: 変わったセットの行（CSR の要素）だけを使って差分を加える。
+- レシピの変更: SetCatalog は変わっていないセットの内容を前の版と共有するため、
+  内容のオブジェクトが入れ替わったセットだけを変更ありとして引いて足し直す。
+- 在庫の変更・使用数の変更: 変わったネタの不足枚数だけを計算し直す。
+"""
+from typing import Dict, Mapping
+
+import numpy as np
+
+from sushi_app.planning import PlanResult, RecipeMatrix, plan_vector
+from sushi_app.set_catalog import SetCatalog
+
+
+def _row_elements(matrix: RecipeMatrix, rows: np.ndarray):
+    """セット rows の要素の位置と、セットごとの要素数"""
+    starts = matrix.indptr[rows]
+    lengths = matrix.indptr[rows + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(int(lengths.sum())), lengths
+
+
+class RunningPlan:
+    """1つの計画（今日 / 明日）の集計を保持し、変更分だけを反映する"""
+
+    def __init__(self, set_catalog: SetCatalog, matrix: RecipeMatrix):
+        self._reset(set_catalog, matrix)
+
+    def _reset(self, set_catalog: SetCatalog, matrix: RecipeMatrix) -> None:
+        self.set_catalog = set_catalog
+        self.matrix = matrix
+        n_sets, n_ing = len(matrix.set_names), len(matrix.ingredients)
+        self.counts = np.zeros(n_sets, dtype=np.int64)
+        self.money = np.zeros(n_sets, dtype=np.int64)
+        self.total = 0
+        self.usage = np.zeros(n_ing, dtype=np.int64)
+        self.inventory = np.zeros(n_ing, dtype=np.int64)
+        self.shortage = np.zeros(n_ing, dtype=np.int64)
+        self.touched_sets = 0   # 差分で計算し直したセットの延べ数（確認用）
+
+    # ----------------------------------------
+    # 差分の反映
+    # ----------------------------------------
+    def _add_rows(self, matrix: RecipeMatrix, rows: np.ndarray, delta: np.ndarray) -> None:
+        """セット rows の製造数が delta だけ変わった分をネタ使用数に加える"""
+        if len(rows) == 0:
+            return
+        elements, lengths = _row_elements(matrix, rows)
+        cols = matrix.indices[elements]
+        np.add.at(self.usage, cols, np.repeat(delta, lengths) * matrix.data[elements])
+        self._update_shortage(np.unique(cols))
+        self.touched_sets += len(rows)
+
+    def _update_shortage(self, cols: np.ndarray) -> None:
+        self.shortage[cols] = np.maximum(0, self.usage[cols] - self.inventory[cols])
+
+    def set_counts(self, counts: np.ndarray) -> None:
+        """製造数（行列の並び順のベクトル）を反映する"""
+        counts = np.asarray(counts, dtype=np.int64)
+        rows = np.flatnonzero(counts != self.counts)
+        if len(rows) == 0:
+            return
+        delta = counts[rows] - self.counts[rows]
+        self._add_rows(self.matrix, rows, delta)
+        new_money = counts[rows] * self.matrix.prices[rows]
+        self.total += int((new_money - self.money[rows]).sum())
+        self.money[rows] = new_money
+        self.counts[rows] = counts[rows]
+
+    def update_plan(self, plan: Mapping[str, int]) -> None:
+        """{セット名: 製造数} を反映する"""
+        self.set_counts(plan_vector(self.matrix, plan))
+
+    def set_inventory(self, inventory: Mapping[str, int]) -> None:
+        """在庫を反映する（変わったネタの不足枚数だけを計算し直す）"""
+        vec = np.array([inventory.get(ing, 0) for ing in self.matrix.ingredients], dtype=np.int64)
+        cols = np.flatnonzero(vec != self.inventory)
+        self.inventory[cols] = vec[cols]
+        self._update_shortage(cols)
+
+    def rebase(self, set_catalog: SetCatalog, matrix: RecipeMatrix) -> None:
+        """セット情報の新しい版に切り替える（変わったセットの分だけを引いて足し直す）"""
+        if set_catalog is self.set_catalog and matrix is self.matrix:
+            return
+        old_sets, new_sets = self.set_catalog.sets, set_catalog.sets
+        old_matrix = self.matrix
+        if matrix.ingredients != old_matrix.ingredients:
+            # ネタ一覧が変わった場合は列の意味が変わるため作り直す
+            counts = {name: int(c) for name, c in zip(old_matrix.set_names, self.counts) if c}
+            inventory = dict(zip(old_matrix.ingredients, self.inventory.tolist()))
+            self._reset(set_catalog, matrix)
+            self.set_inventory(inventory)
+            self.update_plan(counts)
+            return
+
+        # 変更・削除されたセットの分を引く
+        old_rows = np.array([
+            i for i, name in enumerate(old_matrix.set_names)
+            if self.counts[i] and new_sets.get(name) is not old_sets[name]
+        ], dtype=np.int64)
+        self._add_rows(old_matrix, old_rows, -self.counts[old_rows])
+        self.total -= int(self.money[old_rows].sum())
+
+        # 製造数を新しい並び順に移す（新しいセットは 0）
+        old_index = old_matrix.set_index
+        positions = np.array([old_index.get(name, -1) for name in matrix.set_names], dtype=np.int64)
+        kept = positions >= 0
+        counts = np.zeros(len(matrix.set_names), dtype=np.int64)
+        counts[kept] = self.counts[positions[kept]]
+        money = np.zeros(len(matrix.set_names), dtype=np.int64)
+        money[kept] = self.money[positions[kept]]
+
+        # 変更されたセットの分を新しいレシピ・価格で足す
+        new_rows = np.array([
+            j for j, name in enumerate(matrix.set_names)
+            if counts[j] and old_sets.get(name) is not new_sets[name]
+        ], dtype=np.int64)
+        self._add_rows(matrix, new_rows, counts[new_rows])
+        money[new_rows] = counts[new_rows] * matrix.prices[new_rows]
+        self.total += int(money[new_rows].sum())
+
+        self.set_catalog, self.matrix = set_catalog, matrix
+        self.counts, self.money = counts, money
+
+    # ----------------------------------------
+    # 結果
+    # ----------------------------------------
+    def result(self) -> PlanResult:
+        return PlanResult(plan=self.counts.copy(), money=self.money.copy(),
+                          usage=self.usage.copy(), total=np.int64(self.total))
+
+    def usage_dict(self) -> Dict[str, int]:
+        return {ing: int(q) for ing, q in zip(self.matrix.ingredients, self.usage)}
+
+    def shortage_dict(self) -> Dict[str, int]:
+        return {ing: int(q) for ing, q in zip(self.matrix.ingredients, self.shortage) if q > 0}
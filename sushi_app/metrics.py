@@ -0,0 +1,320 @@
+"""再実行ごとの処理時間の計測
+
+画面の再実行（全体 / セクションだけのフラグメント）ごとに、
+ページの準備・CSS・各セクション・各ボタンの処理にかかった時間を区間として記録する。
+
+- 集計はプロセス内で共有し、Prometheus のテキスト形式で出力できる
+  （計測ページ、または SUSHI_METRICS_PORT を指定したときの /metrics）。
+- 再実行1回ごとの記録は、データベースと同じディレクトリの sushi_metrics.jsonl に追記する
+  （サイズで切り替えるローテーション付き）。出力先は SUSHI_METRICS_LOG で変えられ、
+  空にすると書き出さない。
+- セッション状態の大きさは SUSHI_SESSION_SIZE_EVERY 回に1回だけ測る（0 なら測らない）。
+- profile=True の再実行は cProfile で計測し、結果の上位をテキストで残す。
+
+Streamlit には依存しない（セッションとの結び付けは sections.common で行う）。
+"""
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+LOG_FILENAME = "sushi_metrics.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+RECENT_RERUNS = 200          # 計測ページに表示する直近の再実行の数
+SESSION_TIMEOUT = 600        # この秒数再実行のないセッションは数えない
+PROFILE_LINES = 40
+SESSION_SIZE_EVERY = int(os.environ.get("SUSHI_SESSION_SIZE_EVERY", "20"))
+SESSION_SIZE_DEPTH = 3       # セッション状態の値をたどる深さ
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+# ----------------------------------------
+# 集計（プロセス内で共有）
+# ----------------------------------------
+class Registry:
+    """カウンタと、件数・合計・最大を持つ集計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._summaries: Dict[Tuple[str, Labels], List[float]] = {}   # [件数, 合計, 最大]
+        self._sessions: Dict[str, float] = {}
+        self.recent: deque = deque(maxlen=RECENT_RERUNS)
+
+    def inc(self, name: str, labels: Mapping[str, str], value: float = 1) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: Mapping[str, str], value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+    def touch_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions[session_id] = time.time()
+
+    def active_sessions(self) -> int:
+        cutoff = time.time() - SESSION_TIMEOUT
+        with self._lock:
+            for session_id in [s for s, seen in self._sessions.items() if seen < cutoff]:
+                del self._sessions[session_id]
+            return len(self._sessions)
+
+    def summaries(self) -> List[dict]:
+        """計測ページ用の表（区間ごとの件数・平均・最大）"""
+        with self._lock:
+            items = list(self._summaries.items())
+        rows = []
+        for (name, labels), (count, total, peak) in sorted(items):
+            rows.append({"name": name, **dict(labels), "count": int(count),
+                         "mean": total / count if count else 0.0, "max": peak})
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Prometheus のテキスト形式"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for (name, labels), (count, total, _) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            lines.append(f"{name}_count{_format_labels(labels)} {count:g}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total:.6f}")
+        # 最大値は summary に含められないため、別の gauge にする
+        for (name, labels), (_, _, peak) in summaries:
+            if f"{name}_max" not in typed:
+                lines.append(f"# TYPE {name}_max gauge")
+                typed.add(f"{name}_max")
+            lines.append(f"{name}_max{_format_labels(labels)} {peak:.6f}")
+        lines.append("# TYPE sushi_active_sessions gauge")
+        lines.append(f"sushi_active_sessions {self.active_sessions()}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = Registry()
+
+
+# ----------------------------------------
+# 再実行1回分の記録
+# ----------------------------------------
+@dataclass
+class RerunRecord:
+    kind: str                 # "full"（アプリ全体）または "fragment"（セクションだけ）
+    section: str
+    session_id: str = ""
+    started_at: str = ""
+    spans: Dict[str, float] = field(default_factory=dict)   # "種別:名前" -> ミリ秒（同じ区間は合計）
+    total_ms: float = 0.0
+    session_bytes: Optional[int] = None
+    profile_text: Optional[str] = None
+
+    def to_json(self) -> dict:
+        return {
+            "time": self.started_at,
+            "session": self.session_id,
+            "kind": self.kind,
+            "section": self.section,
+            "total_ms": round(self.total_ms, 2),
+            "spans": {name: round(ms, 2) for name, ms in self.spans.items()},
+            "session_bytes": self.session_bytes,
+        }
+
+
+_local = threading.local()
+
+
+def current() -> Optional[RerunRecord]:
+    """このスレッドで計測中の再実行（なければ None）"""
+    return getattr(_local, "record", None)
+
+
+@contextmanager
+def rerun(kind: str, section: str = "", session_id: str = "", profile: bool = False) -> Iterator[RerunRecord]:
+    """再実行1回分を計測する（終了時に集計・ログに反映する）"""
+    record = RerunRecord(kind, section, session_id, datetime.now().isoformat(timespec="milliseconds"))
+    profiler = cProfile.Profile() if profile else None
+    _local.record = record
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            record.profile_text = _profile_text(profiler)
+        record.total_ms = (time.perf_counter() - start) * 1000
+        _local.record = None
+        _finish(record)
+
+
+@contextmanager
+def timer(kind: str, name: str) -> Iterator[None]:
+    """区間の時間を計測する（デコレータとしても使える）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        REGISTRY.observe("sushi_span_seconds", {"kind": kind, "name": name}, elapsed)
+        record = current()
+        if record is not None:
+            key = f"{kind}:{name}"
+            record.spans[key] = record.spans.get(key, 0.0) + elapsed * 1000
+
+
+def should_measure_session(rerun_count: int) -> bool:
+    """セッションの rerun_count 回目（1 から数える）の再実行でセッション状態の大きさを測るか"""
+    return SESSION_SIZE_EVERY > 0 and (rerun_count - 1) % SESSION_SIZE_EVERY == 0
+
+
+def session_size(state: Mapping, depth: int = SESSION_SIZE_DEPTH) -> int:
+    """セッション状態のおおよその大きさ（sys.getsizeof を depth 段までたどった合計）
+
+    値を直列化しないため、pickle できない値（ロックを持つカタログなど）も数える。
+    同じオブジェクトは1度だけ数える。
+    """
+    seen = set()
+
+    def walk(value, level: int) -> int:
+        if id(value) in seen:
+            return 0
+        seen.add(id(value))
+        size = sys.getsizeof(value, 0)
+        if level >= depth or isinstance(value, (str, bytes, bytearray)):
+            return size
+        if isinstance(value, Mapping):
+            children = [*value.keys(), *value.values()]
+        elif isinstance(value, (list, tuple, set, frozenset, deque)):
+            children = value
+        elif hasattr(value, "__dict__"):
+            children = vars(value).values()
+        else:
+            return size
+        return size + sum(walk(child, level + 1) for child in children)
+
+    return sum(walk(value, 0) for value in list(state.values()))
+
+
+def _finish(record: RerunRecord) -> None:
+    labels = {"kind": record.kind, "section": record.section}
+    REGISTRY.inc("sushi_reruns_total", labels)
+    REGISTRY.observe("sushi_rerun_seconds", labels, record.total_ms / 1000)
+    if record.session_bytes is not None:
+        REGISTRY.observe("sushi_session_state_bytes", {}, record.session_bytes)
+    if record.session_id:
+        REGISTRY.touch_session(record.session_id)
+    REGISTRY.recent.append(record.to_json())
+    logger = _log()
+    if logger is not None:
+        logger.info(json.dumps(record.to_json(), ensure_ascii=False))
+
+
+def _profile_text(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_LINES)
+    return out.getvalue()
+
+
+# ----------------------------------------
+# JSONL ログ
+# ----------------------------------------
+_log_lock = threading.Lock()
+_log_path: Optional[str] = None
+
+
+def log_path() -> Optional[str]:
+    """JSONL ログの出力先（SUSHI_METRICS_LOG、なければデータベースと同じディレクトリ。空なら None）"""
+    path = os.environ.get("SUSHI_METRICS_LOG")
+    if path is None:
+        # storage を import せずに、データベースの置き場所（SUSHI_DB_PATH または既定）をたどる
+        db_path = os.environ.get("SUSHI_DB_PATH")
+        data_dir = Path(db_path).resolve().parent if db_path else Path(__file__).resolve().parent.parent
+        path = str(data_dir / LOG_FILENAME)
+    return path or None
+
+
+def _log() -> Optional[logging.Logger]:
+    """ローテーション付きの JSONL ロガー（出力先がなければ None。出力先が変わればファイルを替える）"""
+    global _log_path
+    path = log_path()
+    if path is None:
+        return None
+    logger = logging.getLogger("sushi_app.metrics")
+    with _log_lock:
+        if path != _log_path:
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            _log_path = path
+    return logger
+
+
+# ----------------------------------------
+# /metrics（Prometheus 形式）
+# ----------------------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """/metrics を返す HTTP サーバーを別スレッドで起動する"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="sushi-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,290 @@
+"""在庫から売上が最大になる製造数の組み合わせ
+
+セットの製造数 x（整数）について
+
+    最大化  Σ 販売価格_j × x_j − Σ 不足ペナルティ_i × 不足枚数_i
+    条件    Σ_j 使用枚数_ij × x_j − 不足枚数_i ≤ 在庫_i
+            下限_j ≤ x_j ≤ 上限_j,  不足枚数_i ≥ 0
+
+を、上下限付き単体法による LP 緩和と分枝限定法で解く。
+不足ペナルティを与えない場合（売上最大モード）は不足枚数を使わず、
+在庫の範囲内で売上を最大にする。
+
+レシピの使用枚数は非負なので、各変数を下限に置いた点が常に
+（実行可能なら）実行可能基底になり、第1段階の計算は不要になる。
+"""
+import heapq
+import math
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from sushi_app.planning import RecipeMatrix
+
+EPS = 1e-9
+
+
+# ----------------------------------------
+# 上下限付き単体法
+# ----------------------------------------
+def bounded_simplex(c: np.ndarray, A: np.ndarray, b: np.ndarray, upper: np.ndarray,
+                    max_iter: int = 10000):
+    """max c·y  s.t.  A y ≤ b, 0 ≤ y ≤ upper を解く（b ≥ 0 が前提）
+
+    上限は行として追加せず、非基底変数を「下限」「上限」のどちらかに置いて扱う。
+    戻り値は (y, 目的関数値)。有界でない場合は ValueError。
+    """
+    m, n = A.shape
+    # 列: 元の変数 n 個 + スラック m 個
+    T = np.hstack([A.astype(np.float64), np.eye(m)])
+    d = np.concatenate([c.astype(np.float64), np.zeros(m)])
+    ub = np.concatenate([upper.astype(np.float64), np.full(m, np.inf)])
+    basis = np.arange(n, n + m)
+    xb = b.astype(np.float64).copy()
+    at_upper = np.zeros(n + m, dtype=bool)
+    is_basic = np.zeros(n + m, dtype=bool)
+    is_basic[basis] = True
+
+    for iteration in range(max_iter):
+        # 入る変数：下限にあって被約費用が正、または上限にあって負
+        gain = np.where(at_upper, -d, d)
+        gain[is_basic] = 0.0
+        if iteration > 50 * (n + m):
+            # 退化による巡回を避けるため Bland の規則に切り替える
+            candidates = np.flatnonzero(gain > EPS)
+            if len(candidates) == 0:
+                break
+            j = candidates[0]
+        else:
+            j = int(np.argmax(gain))
+            if gain[j] <= EPS:
+                break
+        sigma = -1.0 if at_upper[j] else 1.0
+        alpha = sigma * T[:, j]
+
+        # 比率テスト
+        step = ub[j]
+        leave = -1
+        leave_to_upper = False
+        pos = alpha > EPS
+        if pos.any():
+            ratios = np.full(m, np.inf)
+            ratios[pos] = xb[pos] / alpha[pos]
+            r = int(np.argmin(ratios))
+            if ratios[r] < step:
+                step, leave, leave_to_upper = ratios[r], r, False
+        neg = alpha < -EPS
+        if neg.any():
+            ratios = np.full(m, np.inf)
+            ub_basic = ub[basis]
+            ratios[neg] = (ub_basic[neg] - xb[neg]) / -alpha[neg]
+            r = int(np.argmin(ratios))
+            if ratios[r] < step:
+                step, leave, leave_to_upper = ratios[r], r, True
+        if not np.isfinite(step):
+            raise ValueError("LP が有界ではありません")
+
+        xb -= step * alpha
+        if leave < 0:
+            # 入る変数が反対側の限界に達しただけ（基底は変わらない）
+            at_upper[j] = not at_upper[j]
+            continue
+
+        entering_value = ub[j] - step if at_upper[j] else step
+        leaving = basis[leave]
+        pivot = T[leave, j]
+        T[leave] /= pivot
+        col = T[:, j].copy()
+        col[leave] = 0.0
+        T -= np.outer(col, T[leave])
+        d -= d[j] * T[leave]
+        basis[leave] = j
+        xb[leave] = entering_value
+        is_basic[j] = True
+        at_upper[j] = False
+        is_basic[leaving] = False
+        at_upper[leaving] = leave_to_upper
+
+    values = np.where(at_upper, ub, 0.0)
+    values[basis] = xb
+    y = np.clip(values[:n], 0.0, upper)
+    return y, float(c @ y)
+
+
+# ----------------------------------------
+# 分枝限定法
+# ----------------------------------------
+@dataclass
+class MixResult:
+    """製造数の最適化結果"""
+    set_names: List[str]
+    ingredients: List[str]
+    counts: np.ndarray       # (セット数,) 製造数
+    revenue: int             # 売上（販売価格 × 製造数の合計）
+    usage: np.ndarray        # (ネタ数,) 使用枚数
+    shortage: np.ndarray     # (ネタ数,) 在庫を超える分（追加発注が必要な枚数）
+    optimal: bool            # 探索を打ち切らずに最適性（gap 以内）を確認できたか
+    bound: float             # 目的関数値の上界
+    nodes: int               # 解いた LP の数
+
+    def rows(self) -> List[dict]:
+        """製造数が1以上のセットの表示用の行"""
+        return [
+            {"セット名": self.set_names[j], "製造数": int(self.counts[j])}
+            for j in np.flatnonzero(self.counts > 0)
+        ]
+
+
+def _greedy_fill(x: np.ndarray, A: np.ndarray, b: np.ndarray, prices: np.ndarray,
+                 hi: np.ndarray) -> np.ndarray:
+    """整数解 x に、在庫の残りで作れるセットを高いものから追加する"""
+    x = x.copy()
+    residual = b - A @ x
+    for j in np.argsort(-prices, kind="stable"):
+        need = A[:, j]
+        used = need > 0
+        if not used.any() or prices[j] <= 0:
+            continue
+        room = np.floor(residual[used] / need[used]).min()
+        room = min(room, hi[j] - x[j])
+        if room >= 1:
+            x[j] += room
+            residual -= room * need
+    return x
+
+
+def solve_mix(matrix: RecipeMatrix,
+              inventory: Sequence[float],
+              lower: Optional[Sequence[float]] = None,
+              upper: Optional[Sequence[float]] = None,
+              shortage_penalty: Optional[Sequence[float]] = None,
+              gap: float = 1e-3,
+              max_nodes: int = 2000,
+              time_limit: float = 1.0) -> MixResult:
+    """在庫・レシピ・販売価格から、売上が最大になる整数の製造数を求める
+
+    lower / upper はセットごとの製造数の下限・上限（None なら 0 / 上限なし）。
+    shortage_penalty を与えると在庫不足を許し、不足1枚あたりその額を差し引く
+    （大きな値を与えれば「追加発注が最も少ない」組み合わせになる）。
+    上界との差が gap（相対値）以内になった枝は探索しない。
+    max_nodes・time_limit で探索を打ち切った場合は、その時点の最良解を返す。
+    """
+    started = time.perf_counter()
+    A = matrix.counts.T.astype(np.float64)          # (ネタ数, セット数)
+    m, n = A.shape
+    prices = matrix.prices.astype(np.float64)
+    inv = np.asarray(inventory, dtype=np.float64)
+    lo = np.zeros(n) if lower is None else np.asarray(lower, dtype=np.float64)
+    hi = np.full(n, np.inf) if upper is None else np.asarray(upper, dtype=np.float64)
+    # ネタを使わないセットは在庫で上限が決まらないため、上限がなければ下限で固定する
+    no_recipe = ~(A > 0).any(axis=0)
+    hi = np.where(no_recipe & ~np.isfinite(hi), lo, hi)
+    if (lo > hi).any():
+        raise ValueError("製造数の下限が上限を超えているセットがあります")
+
+    use_shortage = shortage_penalty is not None
+    if use_shortage:
+        penalty = np.broadcast_to(np.asarray(shortage_penalty, dtype=np.float64), (m,))
+        # 不足枚数の変数を列として追加する（使用枚数 −1）
+        A_full = np.hstack([A, -np.eye(m)])
+        c_full = np.concatenate([prices, -penalty])
+    else:
+        A_full, c_full = A, prices
+
+    def node_lp(node_lo, node_hi):
+        """下限をずらした LP を解く。実行不可能なら None"""
+        need = A @ node_lo
+        if use_shortage:
+            short_lo = np.maximum(0.0, need - inv)
+            full_lo = np.concatenate([node_lo, short_lo])
+            full_hi = np.concatenate([node_hi, np.full(m, np.inf)])
+        else:
+            if (need > inv + EPS).any():
+                return None
+            full_lo, full_hi = node_lo, node_hi
+        rhs = np.maximum(inv - A_full @ full_lo, 0.0)
+        y, value = bounded_simplex(c_full, A_full, rhs, full_hi - full_lo)
+        return full_lo + y, value + float(c_full @ full_lo)
+
+    def objective(x):
+        usage = A @ x
+        value = float(prices @ x)
+        if use_shortage:
+            value -= float(penalty @ np.maximum(0.0, usage - inv))
+        return value
+
+    def feasible(x):
+        return use_shortage or bool((A @ x <= inv + EPS).all())
+
+    root = node_lp(lo, hi)
+    if root is None:
+        raise ValueError("製造数の下限だけで在庫を超えています")
+    best_x = None
+    best_value = -math.inf
+    heap = [(-root[1], 0, lo, hi, root[0])]
+    counter = 1
+    nodes = 1
+    optimal = True
+    bound = root[1]
+    integer_prices = bool(np.all(prices == np.round(prices)))
+
+    while heap:
+        neg_value, _, node_lo, node_hi, z = heapq.heappop(heap)
+        node_bound = -neg_value
+        if integer_prices and not use_shortage:
+            node_bound = math.floor(node_bound + 1e-6)
+        if node_bound <= best_value + max(1e-6, gap * abs(best_value)):
+            continue
+        x = z[:n]
+        # 切り捨て＋貪欲法で暫定解を更新する
+        candidate = _greedy_fill(np.floor(x + 1e-6), A, inv, prices, node_hi) if not use_shortage \
+            else np.floor(x + 1e-6)
+        candidate = np.maximum(candidate, node_lo)
+        if feasible(candidate):
+            value = objective(candidate)
+            if value > best_value:
+                best_x, best_value = candidate, value
+        frac = np.abs(x - np.round(x))
+        j = int(np.argmax(frac))
+        if frac[j] <= 1e-6:
+            xi = np.round(x)
+            value = objective(xi)
+            if value > best_value:
+                best_x, best_value = xi, value
+            continue
+        if nodes >= max_nodes or time.perf_counter() - started > time_limit:
+            optimal = False
+            heapq.heappush(heap, (neg_value, counter, node_lo, node_hi, z))
+            break
+        # x_j ≤ floor と x_j ≥ ceil に分ける
+        for child_lo, child_hi in (
+            (node_lo, np.where(np.arange(n) == j, math.floor(x[j]), node_hi)),
+            (np.where(np.arange(n) == j, math.ceil(x[j]), node_lo), node_hi),
+        ):
+            if child_lo[j] > child_hi[j]:
+                continue
+            solved = node_lp(child_lo, child_hi)
+            nodes += 1
+            if solved is not None and solved[1] > best_value + max(1e-6, gap * abs(best_value)):
+                heapq.heappush(heap, (-solved[1], counter, child_lo, child_hi, solved[0]))
+                counter += 1
+
+    if heap and not optimal:
+        bound = max(best_value, -heap[0][0])
+    else:
+        bound = best_value
+    counts = best_x.astype(np.int64)
+    usage = matrix.counts.T @ counts
+    return MixResult(
+        set_names=list(matrix.set_names),
+        ingredients=list(matrix.ingredients),
+        counts=counts,
+        revenue=int(matrix.prices @ counts),
+        usage=usage,
+        shortage=np.maximum(0, usage - inv.astype(np.int64)),
+        optimal=optimal,
+        bound=bound,
+        nodes=nodes,
+    )
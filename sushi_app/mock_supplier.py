@@ -0,0 +1,99 @@
+"""動作確認用の仕入先サーバー（発注の送信 sushi_app.dispatch の相手）
+
+実際の仕入先の代わりに発注を受け付け、送信の処理量・失敗時の再送をオフラインで確かめる。
+
+- POST /suppliers/{supplier}/orders に Idempotency-Key ヘッダ付きで注文を受け付ける。
+  同じキーの注文は1回だけ記録し、2回目以降は最初と同じ応答を返す。
+- --fail-rate の割合で、記録する前に 503 を返す（送信側の再送を確かめる）。
+- --lost-rate の割合で、記録した後に 503 を返す（応答が届かなかった場合に、
+  送り直しても二重に記録されないことを確かめる）。
+- GET /suppliers/{supplier}/orders で受け付けた注文、GET /stats で件数を返す。
+
+    python -m sushi_app.mock_supplier --port 8090 --fail-rate 0.2 --lost-rate 0.1 --latency 20
+"""
+import argparse
+import asyncio
+import random
+import sys
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from aiohttp import web
+
+DEFAULT_PORT = 8090
+
+
+@dataclass
+class MockSupplierState:
+    fail_rate: float = 0.0
+    lost_rate: float = 0.0
+    latency: float = 0.0          # 秒
+    orders: Dict[str, List[dict]] = field(default_factory=dict)   # 仕入先 -> 受け付けた注文
+    responses: Dict[str, dict] = field(default_factory=dict)      # 冪等キー -> 最初の応答
+    stats: Dict[str, int] = field(default_factory=lambda: {
+        "requests": 0, "accepted": 0, "duplicates": 0, "failed": 0, "lost": 0,
+    })
+
+
+STATE = web.AppKey("state", MockSupplierState)
+
+
+async def post_order(request: web.Request) -> web.Response:
+    state = request.app[STATE]
+    state.stats["requests"] += 1
+    if state.latency:
+        await asyncio.sleep(state.latency)
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return web.json_response({"error": "Idempotency-Key ヘッダが必要です"}, status=400)
+    if key in state.responses:
+        state.stats["duplicates"] += 1
+        return web.json_response(state.responses[key])
+    if random.random() < state.fail_rate:
+        state.stats["failed"] += 1
+        return web.json_response({"error": "一時的に受け付けられません"}, status=503)
+
+    supplier = request.match_info["supplier"]
+    order = await request.json()
+    response = {"order_id": uuid.uuid4().hex[:12], "supplier": supplier, "lines": len(order.get("lines", []))}
+    state.orders.setdefault(supplier, []).append({"idempotency_key": key, **order})
+    state.responses[key] = response
+    state.stats["accepted"] += 1
+    if random.random() < state.lost_rate:
+        state.stats["lost"] += 1
+        return web.json_response({"error": "応答が失われました"}, status=503)
+    return web.json_response(response, status=201)
+
+
+async def get_orders(request: web.Request) -> web.Response:
+    return web.json_response(request.app[STATE].orders.get(request.match_info["supplier"], []))
+
+
+async def get_stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app[STATE].stats)
+
+
+def create_app(fail_rate: float = 0.0, lost_rate: float = 0.0, latency: float = 0.0) -> web.Application:
+    app = web.Application()
+    app[STATE] = MockSupplierState(fail_rate, lost_rate, latency)
+    app.router.add_post("/suppliers/{supplier}/orders", post_order)
+    app.router.add_get("/suppliers/{supplier}/orders", get_orders)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m sushi_app.mock_supplier", description="動作確認用の仕入先サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="記録する前に 503 を返す割合")
+    parser.add_argument("--lost-rate", type=float, default=0.0, help="記録した後に 503 を返す割合")
+    parser.add_argument("--latency", type=float, default=0.0, help="応答までの時間（ミリ秒）")
+    args = parser.parse_args(argv)
+    web.run_app(create_app(args.fail_rate, args.lost_rate, args.latency / 1000), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
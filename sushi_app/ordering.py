@@ -0,0 +1,359 @@
+"""発注量の最適化
+
+不足枚数（明日の必要枚数 − 在庫）を満たす、最も安い発注を求める。
+
+- 仕入先が1社・単価が一定のネタ（従来の「ロット単位で切り上げ」）は
+  全ネタまとめて配列演算で計算する。
+- 仕入先が複数、または数量による単価の段階（価格ブレーク）があるネタは、
+  ネタごとに「確保済み枚数（不足枚数で頭打ち）→ 最小費用」の動的計画法で
+  各仕入先のロット数を決める。枚数はロットの最大公約数を単位に数え、状態は
+  不足枚数 / 最大公約数 + 1 個に収める（ロット数の候補ごとの表は作らない）。
+"""
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+from sushi_app.catalog import IngredientCatalog, ingredient_names
+
+DEFAULT_SUPPLIER = "既定"
+
+
+# ----------------------------------------
+# 仕入先の条件
+# ----------------------------------------
+@dataclass(frozen=True)
+class SupplierOffer:
+    """ある仕入先が1つのネタを卸す条件"""
+    ingredient: str
+    supplier: str
+    lot: int                    # 発注ロット（枚）
+    moq: int = 0                # 最低発注数量（枚）。0 なら制限なし
+    # (この枚数以上, 1枚あたり単価) の段階。数量が多いほど安くなる全数値引き
+    price_tiers: Tuple[Tuple[int, float], ...] = ((0, 0.0),)
+
+    def unit_price(self, qty: int) -> float:
+        price = self.price_tiers[0][1]
+        for min_qty, tier_price in self.price_tiers:
+            if qty >= min_qty:
+                price = tier_price
+        return price
+
+    @property
+    def min_lots(self) -> int:
+        """発注する場合の最小ロット数"""
+        return max(1, math.ceil(self.moq / self.lot))
+
+
+def default_offers(order_lot: Mapping[str, int]) -> List[SupplierOffer]:
+    """仕入先の登録がない場合の条件（従来どおりのロット切り上げになる）"""
+    return [SupplierOffer(ing, DEFAULT_SUPPLIER, lot) for ing, lot in order_lot.items()]
+
+
+def parse_price_tiers(text: str) -> Tuple[Tuple[int, float], ...]:
+    """「0:120, 100:110」のような表記を価格段階に変換する（単価だけなら全数量同一）"""
+    tiers = []
+    for part in str(text).replace("、", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            qty, price = part.split(":", 1)
+            tiers.append((int(qty), float(price)))
+        else:
+            tiers.append((0, float(part)))
+    if not tiers:
+        return ((0, 0.0),)
+    tiers.sort()
+    if tiers[0][0] != 0:
+        raise ValueError("単価の段階は 0 枚からの単価を含めてください")
+    return tuple(tiers)
+
+
+def format_price_tiers(tiers: Sequence[Tuple[int, float]]) -> str:
+    return ", ".join(f"{qty}:{price:g}" for qty, price in tiers)
+
+
+# ----------------------------------------
+# 計算結果
+# ----------------------------------------
+@dataclass
+class OrderPlan:
+    """発注計算の結果"""
+    ingredients: List[str]
+    required: np.ndarray     # (ネタ数,) 必要枚数
+    inventory: np.ndarray    # (ネタ数,) 在庫
+    shortage: np.ndarray     # (ネタ数,) 不足枚数
+    quantity: np.ndarray     # (ネタ数,) 発注数量（全仕入先の合計）
+    cost: np.ndarray         # (ネタ数,) 発注金額
+    # 仕入先ごとの明細: {ingredient, supplier, lots, quantity, unit_price, cost}
+    lines: List[dict] = field(default_factory=list)
+
+    @property
+    def total_cost(self) -> float:
+        return float(self.cost.sum())
+
+    def rows(self, offers_by_ing: Mapping[str, List[SupplierOffer]]) -> List[dict]:
+        """タブ④の表示・レポート用の行（1ネタ1行）"""
+        suppliers: Dict[str, List[str]] = {}
+        for line in self.lines:
+            suppliers.setdefault(line["ingredient"], []).append(f"{line['supplier']}: {line['quantity']}")
+        rows = []
+        for j, ing in enumerate(self.ingredients):
+            lots = sorted({o.lot for o in offers_by_ing.get(ing, [])})
+            rows.append({
+                "ネタ": ing,
+                "必要枚数": int(self.required[j]),
+                "在庫": int(self.inventory[j]),
+                "不足枚数": int(self.shortage[j]),
+                "発注ロット": "/".join(str(lot) for lot in lots) if len(lots) > 1 else (lots[0] if lots else 1),
+                "発注数量": int(self.quantity[j]),
+                "仕入先": " / ".join(suppliers.get(ing, [])),
+                "発注金額": round(float(self.cost[j]))
+            })
+        return rows
+
+
+# ----------------------------------------
+# 単純な場合：ロット切り上げ（配列演算）
+# ----------------------------------------
+def lot_round(shortage: np.ndarray, lot: np.ndarray, moq: np.ndarray = None) -> np.ndarray:
+    """不足枚数をロットの倍数に切り上げ、最低発注数量を下回る場合は引き上げる"""
+    shortage = np.asarray(shortage, dtype=np.int64)
+    lot = np.maximum(np.asarray(lot, dtype=np.int64), 1)
+    lots = -(-shortage // lot)
+    if moq is not None:
+        min_lots = np.maximum(1, -(-np.asarray(moq, dtype=np.int64) // lot))
+        lots = np.where(lots > 0, np.maximum(lots, min_lots), 0)
+    return lots * lot
+
+
+# ----------------------------------------
+# 複数仕入先・価格段階：ネタごとの動的計画法
+# ----------------------------------------
+def _lot_bands(offer: SupplierOffer) -> List[Tuple[int, float, float]]:
+    """ロット数の範囲ごとの 1ロットの金額 [(最小ロット数, 最大ロット数, 1ロットの金額)]
+
+    価格段階は全数値引きなので、同じ段階の中では金額がロット数に比例する。
+    """
+    bands = []
+    for k, (min_qty, price) in enumerate(offer.price_tiers):
+        low = max(offer.min_lots, math.ceil(min_qty / offer.lot))
+        high = math.inf
+        if k + 1 < len(offer.price_tiers):
+            high = math.ceil(offer.price_tiers[k + 1][0] / offer.lot) - 1
+        if low <= high:
+            bands.append((low, high, offer.lot * price))
+    return bands
+
+
+def _window_min(values: np.ndarray, width: float) -> np.ndarray:
+    """各行 k について values[k - width .. k] の最小値（行方向。幅を倍々にして求める）"""
+    if width >= len(values) - 1:
+        return np.minimum.accumulate(values, axis=0)
+    result = values.copy()
+    covered = 1
+    while covered < width + 1:
+        step = int(min(covered, width + 1 - covered))
+        result[step:] = np.minimum(result[step:], result[:-step])
+        covered += step
+    return result
+
+
+def _add_offer(cost: np.ndarray, unit: int, bands: Sequence[Tuple[int, float, float]]) -> np.ndarray:
+    """仕入先を1社加えたときの各状態の最小費用
+
+    状態 0..target-1 は確保済みの数量（unit 単位の個数）、最後の状態 target は「不足分を満たした」。
+    ロット数 L の発注は状態を L*unit 進める。同じ段階の中では費用が L に比例するため、
+    unit ごとの剰余で分けた列に沿って「幅のある累積最小値」で全ロット数をまとめて計算する。
+    """
+    target = len(cost) - 1
+    new = cost.copy()   # この仕入先からは発注しない
+    rows = -(-target // unit)
+    chain_index = np.arange(rows * unit).reshape(rows, unit)
+    valid = chain_index < target
+    chains = np.full((rows, unit), np.inf)
+    chains[valid] = cost[chain_index[valid]]
+    k = np.arange(rows)[:, None]
+    states = np.arange(target + 1)
+    for low, high, lot_cost in bands:
+        # 満たすまでに届かない遷移: 列の位置 k - L から k へ（L は low..high）
+        if low < rows:
+            best = _window_min(chains - k * lot_cost, high - low)
+            reach = best[:rows - low] + k[low:] * lot_cost
+            moved = np.full((rows, unit), np.inf)
+            moved[low:] = reach
+            new[chain_index[valid]] = np.minimum(new[chain_index[valid]], moved[valid])
+        # 満たす遷移: 各状態から届くのに必要な最小のロット数
+        lots = np.maximum(low, -(-(target - states) // unit))
+        ok = lots <= high
+        if ok.any():
+            new[target] = min(new[target], float(np.min(cost[ok] + lots[ok] * lot_cost)))
+    return new
+
+
+def solve_ingredient(shortage: int, offers: Sequence[SupplierOffer]) -> List[Tuple[SupplierOffer, int]]:
+    """1ネタについて、不足枚数を満たす最安のロット数の組み合わせを返す
+
+    数量はすべてロットの最大公約数の倍数なので、その単位で数える（状態は不足枚数 / 最大公約数 + 1 個）。
+    仕入先を1社ずつ加えて各状態の最小費用を求め、加える前の費用から選んだロット数を逆にたどる。
+    """
+    if shortage <= 0:
+        return []
+    step = math.gcd(*(offer.lot for offer in offers))
+    target = -(-shortage // step)
+    cost = np.full(target + 1, np.inf)
+    cost[0] = 0.0
+    history = []
+    for offer in offers:
+        bands = _lot_bands(offer)
+        history.append((offer, bands, cost))
+        cost = _add_offer(cost, offer.lot // step, bands)
+
+    if not np.isfinite(cost[target]):
+        raise ValueError(f"{offers[0].ingredient} の不足分を満たす発注ができません")
+    result = []
+    state, value = target, cost[target]
+    states = np.arange(target + 1)
+    for offer, bands, before in reversed(history):
+        unit = offer.lot // step
+        choice = (before[state], 0, state)   # 同じ費用なら、この仕入先からは発注しない
+        for low, high, lot_cost in bands:
+            if state < target:
+                lots = np.arange(low, min(high, state // unit) + 1)
+                sources = state - lots * unit
+            else:
+                lots = np.maximum(low, -(-(target - states) // unit))
+                sources = states[lots <= high]
+                lots = lots[lots <= high]
+            if len(lots) == 0:
+                continue
+            values = before[sources] + lots * lot_cost
+            best = int(np.argmin(values))
+            if values[best] < choice[0] - 1e-9 * max(1.0, abs(value)):
+                choice = (values[best], int(lots[best]), int(sources[best]))
+        _, lots, state = choice
+        if lots > 0:
+            result.append((offer, lots))
+    result.reverse()
+    return result
+
+
+# ----------------------------------------
+# 全ネタの発注計算
+# ----------------------------------------
+def group_offers(offers: Sequence[SupplierOffer]) -> Dict[str, List[SupplierOffer]]:
+    grouped: Dict[str, List[SupplierOffer]] = {}
+    for offer in offers:
+        grouped.setdefault(offer.ingredient, []).append(offer)
+    return grouped
+
+
+def _offers_by_ingredient(ingredients: Union[IngredientCatalog, Sequence[str]],
+                          offers: Sequence[SupplierOffer]) -> Tuple[List[str], Dict[str, List[SupplierOffer]]]:
+    """ネタ名と、ネタごとの仕入先条件（登録がないネタはネタ一覧の発注ロットで1社）"""
+    names = ingredient_names(ingredients)
+    order_lot = ingredients.order_lot if isinstance(ingredients, IngredientCatalog) else {}
+    offers_by_ing = group_offers(offers)
+    for ing in names:
+        if not offers_by_ing.get(ing):
+            offers_by_ing[ing] = [SupplierOffer(ing, DEFAULT_SUPPLIER, order_lot.get(ing, 1))]
+    return names, offers_by_ing
+
+
+def _is_simple(offers: Sequence[SupplierOffer]) -> bool:
+    """仕入先が1社で単価が一定（ロット切り上げだけで決まる）か"""
+    return len(offers) == 1 and len(offers[0].price_tiers) == 1
+
+
+def _simple_orders(shortage: np.ndarray, offers: Sequence[SupplierOffer]) -> Tuple[np.ndarray, np.ndarray]:
+    """単純なネタの発注数量と発注金額（shortage の最後の次元のネタごとに offers[k] で発注する）"""
+    lot = np.array([o.lot for o in offers])
+    moq = np.array([o.moq for o in offers])
+    price = np.array([o.price_tiers[0][1] for o in offers])
+    quantity = lot_round(shortage, lot, moq)
+    return quantity, quantity * price
+
+
+def _ingredient_lines(ingredient: str, shortage: int, offers: Sequence[SupplierOffer]) -> List[dict]:
+    """複数仕入先・価格段階のあるネタの発注明細（動的計画法で選んだロット数に単価・金額を付ける）"""
+    lines = []
+    for offer, lots in solve_ingredient(shortage, offers):
+        qty = lots * offer.lot
+        unit_price = offer.unit_price(qty)
+        lines.append({"ingredient": ingredient, "supplier": offer.supplier, "lots": lots,
+                      "quantity": qty, "unit_price": unit_price, "cost": qty * unit_price})
+    return lines
+
+
+def solve_orders(ingredients: Union[IngredientCatalog, Sequence[str]],
+                 required: Mapping[str, int],
+                 inventory: Mapping[str, int],
+                 offers: Sequence[SupplierOffer]) -> OrderPlan:
+    """明日の必要枚数と在庫から、最も安い発注を計算する"""
+    ingredients, offers_by_ing = _offers_by_ingredient(ingredients, offers)
+    req = np.array([required.get(ing, 0) for ing in ingredients], dtype=np.int64)
+    inv = np.array([inventory.get(ing, 0) for ing in ingredients], dtype=np.int64)
+    shortage = np.maximum(0, req - inv)
+    quantity = np.zeros(len(ingredients), dtype=np.int64)
+    cost = np.zeros(len(ingredients), dtype=np.float64)
+    lines = []
+
+    simple = []
+    for j, ing in enumerate(ingredients):
+        if _is_simple(offers_by_ing[ing]):
+            simple.append(j)
+            continue
+        for line in _ingredient_lines(ing, int(shortage[j]), offers_by_ing[ing]):
+            quantity[j] += line["quantity"]
+            cost[j] += line["cost"]
+            lines.append(line)
+
+    if simple:
+        idx = np.array(simple)
+        simple_offers = [offers_by_ing[ingredients[j]][0] for j in simple]
+        quantity[idx], cost[idx] = _simple_orders(shortage[idx], simple_offers)
+        for k in np.flatnonzero(quantity[idx] > 0):
+            j = simple[k]
+            offer = simple_offers[k]
+            lines.append({"ingredient": ingredients[j], "supplier": offer.supplier,
+                          "lots": int(quantity[j] // offer.lot), "quantity": int(quantity[j]),
+                          "unit_price": float(offer.price_tiers[0][1]), "cost": float(cost[j])})
+        # 明細はネタの並び順にそろえる
+        order = {ing: j for j, ing in enumerate(ingredients)}
+        lines.sort(key=lambda line: order[line["ingredient"]])
+
+    return OrderPlan(ingredients, req, inv, shortage, quantity, cost, lines)
+
+
+def order_costs(ingredients: Union[IngredientCatalog, Sequence[str]],
+                required: np.ndarray,
+                inventory: Mapping[str, int],
+                offers: Sequence[SupplierOffer]) -> np.ndarray:
+    """複数の計画 required (計画数, ネタ数) それぞれの最安の発注金額 (計画数,)
+
+    solve_orders と同じネタごとの計算（_simple_orders / _ingredient_lines）を使う。単純なネタは
+    全計画まとめて配列演算で、仕入先が複数・価格段階のあるネタは不足枚数の値ごとに1度だけ解く。
+    """
+    ingredients, offers_by_ing = _offers_by_ingredient(ingredients, offers)
+    inv = np.array([inventory.get(ing, 0) for ing in ingredients], dtype=np.int64)
+    shortage = np.maximum(0, np.asarray(required, dtype=np.int64) - inv)
+    cost = np.zeros(shortage.shape[0], dtype=np.float64)
+
+    simple = []
+    for j, ing in enumerate(ingredients):
+        if _is_simple(offers_by_ing[ing]):
+            simple.append(j)
+            continue
+        values, inverse = np.unique(shortage[:, j], return_inverse=True)
+        value_cost = np.array([
+            sum(line["cost"] for line in _ingredient_lines(ing, int(v), offers_by_ing[ing])) for v in values
+        ])
+        cost += value_cost[inverse]
+
+    if simple:
+        idx = np.array(simple)
+        _, simple_cost = _simple_orders(shortage[:, idx], [offers_by_ing[ingredients[j]][0] for j in simple])
+        cost += simple_cost.sum(axis=1)
+    return cost
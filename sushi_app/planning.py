@@ -0,0 +1,165 @@
+"""製造計画の計算エンジン
+
+sets_data（セット名 -> レシピ・販売価格・ステータス）を
+「セット × ネタ」の疎行列（CSR 形式の indptr / indices / data）と
+販売価格ベクトルに変換し、ネタ使用数・製造金額をまとめて計算する。
+ネタの列番号はネタカタログの整数 ID と一致し、計算量・メモリは
+0 でないレシピ要素の数に比例する。
+計画は 1 件（セット数の1次元配列 / dict）でも、
+複数件（計画 × セット の2次元配列）でも同じ関数で扱える。
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Sequence, Union
+
+import numpy as np
+
+from sushi_app.catalog import IngredientCatalog, ingredient_names
+
+
+# ----------------------------------------
+# レシピ行列（CSR 形式）
+# ----------------------------------------
+@dataclass(frozen=True, eq=False)
+class RecipeMatrix:
+    """sets_data を数値配列にまとめたもの"""
+    set_names: List[str]
+    ingredients: List[str]
+    indptr: np.ndarray   # (セット数 + 1,) セット i の要素は indptr[i]:indptr[i+1]
+    indices: np.ndarray  # (要素数,) ネタ ID
+    data: np.ndarray     # (要素数,) 1セットあたりの使用枚数
+    prices: np.ndarray   # (セット数,) 販売価格
+
+    @property
+    def set_index(self) -> Dict[str, int]:
+        return {name: i for i, name in enumerate(self.set_names)}
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """各要素のセット番号"""
+        return np.repeat(np.arange(len(self.set_names)), np.diff(self.indptr))
+
+    @property
+    def counts(self) -> np.ndarray:
+        """(セット数, ネタ数) の密行列（最適化など密行列が必要な計算用）"""
+        dense = np.zeros((len(self.set_names), len(self.ingredients)), dtype=np.int64)
+        dense[self.rows, self.indices] = self.data
+        return dense
+
+    def recipe(self, i: int) -> Dict[str, int]:
+        start, end = self.indptr[i], self.indptr[i + 1]
+        return {self.ingredients[j]: int(c) for j, c in zip(self.indices[start:end], self.data[start:end])}
+
+
+def compile_sets(sets_data: Mapping[str, dict],
+                 ingredients: Union[IngredientCatalog, Sequence[str]]) -> RecipeMatrix:
+    """sets_data をセット×ネタの疎行列と価格ベクトルに変換する"""
+    names = ingredient_names(ingredients)
+    ing_index = ingredients.index if isinstance(ingredients, IngredientCatalog) \
+        else {ing: j for j, ing in enumerate(names)}
+    set_names = list(sets_data.keys())
+    indptr = np.zeros(len(set_names) + 1, dtype=np.int64)
+    indices = []
+    data = []
+    prices = np.zeros(len(set_names), dtype=np.int64)
+    for i, set_name in enumerate(set_names):
+        recipe = sets_data[set_name]
+        prices[i] = recipe["販売価格"]
+        # ネタ一覧にないネタ・0枚の要素は保持しない
+        entries = sorted(
+            (ing_index[ing], cnt) for ing, cnt in recipe["レシピ"].items()
+            if cnt and ing in ing_index
+        )
+        indices.extend(j for j, _ in entries)
+        data.extend(cnt for _, cnt in entries)
+        indptr[i + 1] = len(indices)
+    arrays = [indptr, np.array(indices, dtype=np.int64), np.array(data, dtype=np.int64), prices]
+    # 行列はセッション間で共有するため、配列を書き換えられないようにする
+    for array in arrays:
+        array.flags.writeable = False
+    return RecipeMatrix(set_names, names, *arrays)
+
+
+# ----------------------------------------
+# 計画の計算
+# ----------------------------------------
+@dataclass(frozen=True, eq=False)
+class PlanResult:
+    """計画の計算結果（計画が複数の場合は先頭の次元が計画）"""
+    plan: np.ndarray    # (..., セット数) 製造数
+    money: np.ndarray   # (..., セット数) セットごとの製造金額
+    usage: np.ndarray   # (..., ネタ数) ネタ使用枚数
+    total: np.ndarray   # (...,) 合計製造金額
+
+
+def plan_vector(matrix: RecipeMatrix, plan: Mapping[str, int]) -> np.ndarray:
+    """{セット名: 製造数} を行列の並び順のベクトルに変換する"""
+    vec = np.zeros(len(matrix.set_names), dtype=np.int64)
+    for i, set_name in enumerate(matrix.set_names):
+        vec[i] = plan.get(set_name, 0)
+    return vec
+
+
+def aggregate_usage(matrix: RecipeMatrix, plan: np.ndarray) -> np.ndarray:
+    """製造数 × レシピをネタごとに合計する（0 でない要素だけを使う）"""
+    n_ing = len(matrix.ingredients)
+    if plan.ndim == 1:
+        weights = matrix.data * plan[matrix.rows]
+        return np.bincount(matrix.indices, weights=weights, minlength=n_ing).astype(np.int64)
+    # 複数の計画：要素をネタ ID 順に並べ、ネタごとの区間で合計する
+    usage = np.zeros(plan.shape[:-1] + (n_ing,), dtype=np.int64)
+    if matrix.nnz == 0:
+        return usage
+    order = np.argsort(matrix.indices, kind="stable")
+    cols = matrix.indices[order]
+    contrib = plan[..., matrix.rows[order]] * matrix.data[order]
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    usage[..., cols[starts]] = np.add.reduceat(contrib, starts, axis=-1)
+    return usage
+
+
+def compute_plan(matrix: RecipeMatrix,
+                 plan: Union[Mapping[str, int], np.ndarray]) -> PlanResult:
+    """製造数からネタ使用数・セット別金額・合計金額を計算する
+
+    plan は {セット名: 製造数}、(セット数,) の配列、
+    または (計画数, セット数) の配列（複数店舗・複数シナリオの一括計算）。
+    """
+    if isinstance(plan, Mapping):
+        plan = plan_vector(matrix, plan)
+    plan = np.asarray(plan, dtype=np.int64)
+    if plan.shape[-1] != len(matrix.set_names):
+        raise ValueError(
+            f"計画のセット数({plan.shape[-1]})がレシピ行列({len(matrix.set_names)})と一致しません"
+        )
+    money = plan * matrix.prices
+    usage = aggregate_usage(matrix, plan)
+    total = money.sum(axis=-1)
+    return PlanResult(plan=plan, money=money, usage=usage, total=total)
+
+
+# ----------------------------------------
+# 画面・レポート用の変換
+# ----------------------------------------
+def summary_rows(matrix: RecipeMatrix, result: PlanResult,
+                 count_label: str = "製造数",
+                 money_label: str = "製造金額") -> List[dict]:
+    """製造数が1以上のセットだけを表示用の行にする（計画1件分。金額は数値のまま）"""
+    rows = []
+    for i in np.flatnonzero(result.plan > 0):
+        price = int(matrix.prices[i])
+        rows.append({
+            "セット名": matrix.set_names[i],
+            count_label: int(result.plan[i]),
+            "販売単価": price,
+            money_label: int(result.money[i])
+        })
+    return rows
+
+
+def usage_dict(matrix: RecipeMatrix, usage: np.ndarray) -> Dict[str, int]:
+    """ネタ使用数ベクトルを {ネタ: 枚数} に戻す"""
+    return {ing: int(q) for ing, q in zip(matrix.ingredients, usage)}
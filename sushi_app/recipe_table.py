@@ -0,0 +1,134 @@
+"""レシピ・価格の一括編集用テーブル
+
+セット一覧を「セット × (販売価格, ステータス, 各ネタの使用枚数)」の表に変換し、
+編集後の表（画面のグリッドまたは CSV）を検証して、
+登録・更新・削除するセットの差分を求める。
+"""
+import io
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping
+
+import pandas as pd
+
+from sushi_app.catalog import IngredientCatalog
+from sushi_app.defaults import STATUS_OPTIONS
+
+BASE_COLUMNS = ["セット名", "販売価格", "ステータス"]
+
+
+def sets_to_frame(sets_data: Mapping[str, dict], catalog: IngredientCatalog) -> pd.DataFrame:
+    """セット一覧を一括編集用の表にする（ネタは1列ずつ）"""
+    rows = []
+    for set_name, data in sets_data.items():
+        row = {"セット名": set_name, "販売価格": data["販売価格"], "ステータス": data["ステータス"]}
+        recipe = data["レシピ"]
+        for ing in catalog.names:
+            row[ing] = recipe.get(ing, 0)
+        rows.append(row)
+    return pd.DataFrame(rows, columns=BASE_COLUMNS + list(catalog.names))
+
+
+@dataclass
+class SetChanges:
+    """表の編集結果"""
+    upserts: Dict[str, dict] = field(default_factory=dict)   # 追加・変更されたセット
+    deletes: List[str] = field(default_factory=list)         # 削除されたセット
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not self.upserts and not self.deletes
+
+    def summary(self, sets_data: Mapping[str, dict]) -> str:
+        added = sum(1 for name in self.upserts if name not in sets_data)
+        return f"追加 {added} 件・変更 {len(self.upserts) - added} 件・削除 {len(self.deletes)} 件"
+
+
+def frame_to_sets(df: pd.DataFrame, catalog: IngredientCatalog) -> SetChanges:
+    """表を検証してセット一覧に戻す（差分は diff_sets で求める）"""
+    result = SetChanges()
+    unknown = [col for col in df.columns if col not in BASE_COLUMNS and col not in catalog]
+    if unknown:
+        result.errors.append(f"ネタ一覧にない列があります: {', '.join(map(str, unknown))}")
+    missing = [col for col in BASE_COLUMNS if col not in df.columns]
+    if missing:
+        result.errors.append(f"必要な列がありません: {', '.join(missing)}")
+        return result
+    ing_columns = [ing for ing in catalog.names if ing in df.columns]
+
+    df = df.dropna(how="all")
+    for line, row in enumerate(df.to_dict("records"), start=1):
+        name = row["セット名"]
+        name = "" if pd.isna(name) else str(name).strip()
+        if not name:
+            result.errors.append(f"{line} 行目: セット名が空です")
+            continue
+        if name in result.upserts:
+            result.errors.append(f"{line} 行目: セット名『{name}』が重複しています")
+            continue
+        try:
+            price = _non_negative_int(row["販売価格"])
+        except ValueError:
+            result.errors.append(f"{line} 行目: 販売価格は0以上の整数で入力してください")
+            continue
+        status = row["ステータス"]
+        status = "通常" if pd.isna(status) or status == "" else str(status)
+        if status not in STATUS_OPTIONS:
+            result.errors.append(f"{line} 行目: ステータス『{status}』は選択できません")
+            continue
+        recipe = {}
+        try:
+            for ing in ing_columns:
+                cnt = _non_negative_int(row[ing])
+                if cnt:
+                    recipe[ing] = cnt
+        except ValueError:
+            result.errors.append(f"{line} 行目: 使用枚数は0以上の整数で入力してください")
+            continue
+        result.upserts[name] = {"レシピ": recipe, "販売価格": price, "ステータス": status}
+    return result
+
+
+def _non_negative_int(value) -> int:
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value == "":
+        return 0
+    number = float(value)
+    # inf は int() で OverflowError になるため、先に有限の数か確かめる
+    if not math.isfinite(number) or number < 0 or number != int(number):
+        raise ValueError(value)
+    return int(number)
+
+
+def diff_sets(sets_data: Mapping[str, dict], edited: SetChanges,
+              delete_missing: bool = True) -> SetChanges:
+    """現在のセット一覧と編集後を比べ、変わったセットだけを残す
+
+    delete_missing が False の場合、編集後の表にないセットは削除しない。
+    """
+    changes = SetChanges(errors=list(edited.errors))
+    for name, data in edited.upserts.items():
+        current = sets_data.get(name)
+        if current is None or (
+            current["販売価格"] != data["販売価格"]
+            or current["ステータス"] != data["ステータス"]
+            or {k: v for k, v in current["レシピ"].items() if v} != data["レシピ"]
+        ):
+            changes.upserts[name] = data
+    if delete_missing:
+        changes.deletes = [name for name in sets_data if name not in edited.upserts]
+    return changes
+
+
+# ----------------------------------------
+# CSV
+# ----------------------------------------
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    """Excel でも文字化けしないよう BOM 付き UTF-8 で書き出す"""
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+def read_csv(data) -> pd.DataFrame:
+    if isinstance(data, bytes):
+        data = io.BytesIO(data)
+    return pd.read_csv(data, encoding="utf-8-sig")
@@ -0,0 +1,272 @@
+"""レポートのファイル出力（PDF / Excel）
+
+今日の製造集計・明日の製造計画・発注計算結果のレポートを、画面を通さずに
+PDF・XLSX のファイル（メモリ上のバイト列）にする。
+
+- 保存済み・画面上のレポートの内容から、表示に依存しない ReportDocument を作り、
+  形式ごとの関数で描画する。PDF は reportlab、XLSX は openpyxl を使う
+  （どちらも必要になったときに import する。入っていなければ RuntimeError）。
+- 描画結果は内容と形式から作ったキーでプロセス内に保持し、
+  同じ内容のレポートは描画し直さない（内容が変わればキーも変わる）。
+- 日付範囲の一括出力では、まだ描画していないレポートだけをプロセスプールで描画し、
+  1つの ZIP にまとめる。プールは spawn で起動する（画面のサーバーのような
+  スレッドの多いプロセスから fork しない）。
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from sushi_app.formatting import YEN_COLUMNS, format_value, yen
+
+DATE_FORMAT = "%Y年%m月%d日"   # 画面のレポート日付と同じ表記
+CACHE_SIZE = 256
+
+REPORT_TITLES = {
+    "today": "今日の製造集計",
+    "tomorrow": "明日の製造計画",
+    "order": "発注計算結果",
+}
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+REQUIRED_PACKAGES = {"pdf": "reportlab", "xlsx": "openpyxl"}
+
+
+def missing_package(fmt: str) -> Optional[str]:
+    """fmt の描画に必要なパッケージが入っていなければ、その名前を返す（描画せずに確かめる）"""
+    package = REQUIRED_PACKAGES[fmt]
+    return package if importlib.util.find_spec(package) is None else None
+
+
+# ----------------------------------------
+# レポートの内容
+# ----------------------------------------
+@dataclass(frozen=True)
+class ReportTable:
+    heading: str
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple, ...]
+
+
+@dataclass(frozen=True)
+class ReportDocument:
+    """1つのレポート（タイトル・日付・合計などの行・表）"""
+    kind: str
+    title: str
+    report_date: str
+    lines: Tuple[str, ...]
+    tables: Tuple[ReportTable, ...]
+
+    @property
+    def filename(self) -> str:
+        try:
+            day = datetime.strptime(self.report_date, DATE_FORMAT).strftime("%Y%m%d")
+        except ValueError:
+            day = self.report_date
+        return f"{self.kind}_{day}"
+
+
+def _records_table(heading: str, records: Sequence[Mapping]) -> ReportTable:
+    columns = tuple(records[0]) if records else ()
+    return ReportTable(heading, columns, tuple(tuple(r.get(c, "") for c in columns) for r in records))
+
+
+def _quantity_table(heading: str, quantities: Mapping[str, int], label: str) -> ReportTable:
+    return ReportTable(heading, ("ネタ", label),
+                       tuple((ing, qty) for ing, qty in quantities.items() if qty > 0))
+
+
+def build_document(kind: str, report_date: str, payload: Mapping) -> ReportDocument:
+    """保存済みレポート（storage.save_report の内容）からレポートを作る"""
+    if kind == "today":
+        return ReportDocument(kind, "今日の製造集計レポート", report_date, (
+            f"製造日: {payload.get('date', report_date)}",
+            f"合計製造金額: {yen(payload['total_money'])}",
+        ), (
+            _records_table("製造セット集計", payload["summary"]),
+            _quantity_table("使用ネタ集計", payload["usage"], "使用枚数"),
+        ))
+    if kind == "tomorrow":
+        return ReportDocument(kind, "明日の製造計画レポート", report_date, (
+            f"計画作成日: {report_date}",
+            f"合計目標製造金額: {yen(payload['total'])}",
+        ), (
+            _records_table("製造セット計画", payload["summary"]),
+            _quantity_table("必要ネタ数", payload["required"], "必要枚数"),
+        ))
+    if kind == "order":
+        return ReportDocument(kind, "発注計算結果レポート", report_date, (f"発注日: {report_date}",), (
+            _records_table("発注リスト", payload["rows"]),
+        ))
+    raise ValueError(f"未対応のレポート種別です: {kind}")
+
+
+# ----------------------------------------
+# 描画
+# ----------------------------------------
+def render_xlsx(doc: ReportDocument) -> bytes:
+    try:
+        from openpyxl import Workbook
+        from openpyxl.styles import Font
+    except ImportError:
+        raise RuntimeError("Excel 形式の出力には openpyxl が必要です（pip install openpyxl）") from None
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = REPORT_TITLES.get(doc.kind, doc.kind)[:31]
+    ws.append([doc.title])
+    ws.cell(ws.max_row, 1).font = Font(bold=True, size=14)
+    for line in doc.lines:
+        ws.append([line])
+    widths: Dict[int, int] = {}
+    for table in doc.tables:
+        ws.append([])
+        ws.append([table.heading])
+        ws.cell(ws.max_row, 1).font = Font(bold=True)
+        ws.append(list(table.columns))
+        for k in range(1, len(table.columns) + 1):
+            ws.cell(ws.max_row, k).font = Font(bold=True)
+        for row in table.rows:
+            ws.append(list(row))
+            for k, column in enumerate(table.columns, start=1):
+                if column in YEN_COLUMNS:
+                    ws.cell(ws.max_row, k).number_format = '"¥"#,##0'
+        for k, values in enumerate(zip(table.columns, *table.rows), start=1):
+            widths[k] = max(widths.get(k, 0), *(len(str(format_value(values[0], v))) for v in values))
+    for k, width in widths.items():
+        ws.column_dimensions[ws.cell(1, k).column_letter].width = min(60, width * 2 + 2)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def render_pdf(doc: ReportDocument) -> bytes:
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import ParagraphStyle
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    except ImportError:
+        raise RuntimeError("PDF 形式の出力には reportlab が必要です（pip install reportlab）") from None
+
+    font = "HeiseiKakuGo-W5"   # reportlab 同梱の日本語フォント（フォントファイル不要）
+    if font not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont(font))
+    title_style = ParagraphStyle("title", fontName=font, fontSize=16, leading=22, spaceAfter=8)
+    heading_style = ParagraphStyle("heading", fontName=font, fontSize=12, leading=16, spaceBefore=10, spaceAfter=4)
+    body_style = ParagraphStyle("body", fontName=font, fontSize=10, leading=14)
+
+    story = [Paragraph(doc.title, title_style)]
+    story += [Paragraph(line, body_style) for line in doc.lines]
+    for table in doc.tables:
+        story.append(Paragraph(table.heading, heading_style))
+        if not table.rows:
+            story.append(Paragraph("該当するデータはありません。", body_style))
+            continue
+        grid = Table([list(table.columns)] + [[str(format_value(c, v)) for c, v in zip(table.columns, row)]
+                                              for row in table.rows], repeatRows=1)
+        grid.setStyle(TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), font),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("BACKGROUND", (0, 0), (-1, 0), colors.whitesmoke),
+        ]))
+        story += [grid, Spacer(1, 6)]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, title=doc.title).build(story)
+    return buffer.getvalue()
+
+
+RENDERERS: Dict[str, Callable[[ReportDocument], bytes]] = {"pdf": render_pdf, "xlsx": render_xlsx}
+
+
+# ----------------------------------------
+# 描画結果のキャッシュ（内容が同じなら描画し直さない）
+# ----------------------------------------
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def document_key(doc: ReportDocument, fmt: str) -> str:
+    content = json.dumps(asdict(doc), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(f"{fmt}:{content}".encode("utf-8")).hexdigest()
+
+
+def _cached(key: str) -> Optional[bytes]:
+    with _cache_lock:
+        data = _cache.get(key)
+        if data is not None:
+            _cache.move_to_end(key)
+        return data
+
+
+def _store(key: str, data: bytes) -> None:
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def render(doc: ReportDocument, fmt: str) -> bytes:
+    """レポートを fmt（"pdf" / "xlsx"）で描画する（同じ内容は前回の結果を返す）"""
+    key = document_key(doc, fmt)
+    data = _cached(key)
+    if data is None:
+        data = RENDERERS[fmt](doc)
+        _store(key, data)
+    return data
+
+
+def _render_task(doc: ReportDocument, fmt: str) -> bytes:
+    return RENDERERS[fmt](doc)
+
+
+def export_documents(docs: Sequence[ReportDocument], fmt: str, workers: Optional[int] = None) -> bytes:
+    """複数のレポートを描画して ZIP にまとめる（未描画のものだけをプロセスプールで描画する）"""
+    keys = [document_key(doc, fmt) for doc in docs]
+    # ZIP は手元の描画結果から作る（件数がキャッシュより多いと、描画した分が追い出されるため）
+    results: Dict[int, bytes] = {}
+    missing: List[int] = []
+    for k, key in enumerate(keys):
+        data = _cached(key)
+        if data is None:
+            missing.append(k)
+        else:
+            results[k] = data
+    if len(missing) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            rendered = executor.map(_render_task, [docs[k] for k in missing], [fmt] * len(missing))
+            results.update(zip(missing, rendered))
+    else:
+        results.update((k, RENDERERS[fmt](docs[k])) for k in missing)
+    for k in missing:
+        _store(keys[k], results[k])
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for k, doc in enumerate(docs):
+            archive.writestr(f"{doc.filename}.{fmt}", results[k])
+    return buffer.getvalue()
+
+
+def load_documents(storage, kinds: Sequence[str], start: str, end: str) -> List[ReportDocument]:
+    """保存済みレポートのうち、start〜end の各日の最新のものをレポートにする"""
+    return [
+        build_document(kind, report_date, payload)
+        for kind in kinds
+        for report_date, payload in storage.latest_reports(kind, start, end)
+    ]
@@ -0,0 +1,174 @@
+"""価格・レシピ・製造数の変更の試算（シナリオの一括比較）
+
+販売価格の変更・レシピのネタの差し替え・製造数の変更を組み合わせた多数のシナリオについて、
+売上・必要ネタ数・発注金額をまとめて計算し、順位を付けた表にする。
+
+- 変更の候補を軸ごとに並べ、全軸の組み合わせ（直積）をシナリオとする。
+- 製造数・販売価格は (シナリオ数, セット数) の配列、ネタ使用数は
+  (シナリオ数, ネタ数) の配列として、タブ①②と同じ計算（compute_plan）でまとめて求める。
+- ネタの差し替えは「製造数 × 差し替え前のネタの枚数」を差し替え後のネタへ移すだけなので、
+  使用数の配列に差分として加える。1つのシナリオの差し替えはすべて元のレシピに対して同時に行い、
+  同じセット・同じ差し替え前のネタの差し替えが重なった場合は後に指定したものだけを使う
+  （差し替え前後が同じネタのものは何もしない）。ただし scenario_grid では、同じセット・同じネタの
+  差し替えが別の軸にあると組み合わせで重なるため誤りにする。
+- 同じセットの販売価格・製造数の倍率が1つのシナリオに重なった場合は掛け合わせる。
+- 発注金額はタブ④と同じ条件で計算する（ordering.order_costs）。
+  必要ネタ数が同じシナリオは1度だけ計算する。
+"""
+import itertools
+from dataclasses import dataclass
+from typing import List, Mapping, Sequence, Tuple, Union
+
+import numpy as np
+
+from sushi_app.catalog import IngredientCatalog, ingredient_names
+from sushi_app.ordering import SupplierOffer, order_costs
+from sushi_app.planning import RecipeMatrix, compute_plan
+
+MAX_SCENARIOS = 20000
+BASE_LABEL = "変更なし"
+
+
+@dataclass(frozen=True)
+class Variant:
+    """1つのシナリオ（または1つの軸の候補）の変更内容"""
+    label: str = ""
+    price_rates: Tuple[Tuple[str, float], ...] = ()        # (セット名, 販売価格の倍率)
+    count_rates: Tuple[Tuple[str, float], ...] = ()        # (セット名, 製造数の倍率)
+    swaps: Tuple[Tuple[str, str, str], ...] = ()           # (セット名, 差し替え前のネタ, 差し替え後のネタ)
+
+    def __add__(self, other: "Variant") -> "Variant":
+        label = " / ".join(part for part in (self.label, other.label) if part)
+        return Variant(label, self.price_rates + other.price_rates,
+                       self.count_rates + other.count_rates, self.swaps + other.swaps)
+
+
+def rate_axis(set_name: str, rates: Sequence[float], kind: str) -> List[Variant]:
+    """1セットの販売価格（kind="price"）または製造数（kind="count"）の倍率の候補"""
+    label = "価格" if kind == "price" else "製造数"
+    axis = []
+    for rate in rates:
+        text = "" if rate == 1 else f"{set_name} {label}{(rate - 1) * 100:+.0f}%"
+        entry = ((set_name, float(rate)),)
+        axis.append(Variant(text, price_rates=entry) if kind == "price" else Variant(text, count_rates=entry))
+    return axis
+
+
+def swap_axis(set_name: str, old: str, new: str) -> List[Variant]:
+    """ネタの差し替えの有無の候補"""
+    return [Variant(), Variant(f"{set_name} {old}→{new}", swaps=((set_name, old, new),))]
+
+
+def parse_percentages(text: str) -> List[float]:
+    """「-10, 0, 10」のような変更率（%）を倍率の一覧にする"""
+    rates = []
+    for part in text.replace("、", ",").split(","):
+        part = part.strip().rstrip("%")
+        if not part:
+            continue
+        try:
+            percent = float(part)
+        except ValueError:
+            raise ValueError(f"変更率「{part}」が数値ではありません") from None
+        if percent <= -100:
+            raise ValueError(f"変更率「{part}」は -100 より大きくしてください")
+        rates.append(1 + percent / 100)
+    return list(dict.fromkeys(rates)) or [1.0]
+
+
+def scenario_grid(axes: Sequence[Sequence[Variant]]) -> List[Variant]:
+    """全軸の候補の組み合わせ"""
+    size = int(np.prod([len(axis) for axis in axes], dtype=np.float64)) if axes else 1
+    if size > MAX_SCENARIOS:
+        raise ValueError(f"シナリオが多すぎます（{size:,} 件、上限 {MAX_SCENARIOS:,} 件）")
+    # 同じセット・同じネタの差し替えが別の軸にあると、組み合わせで2回差し替えることになる
+    swapped = {}
+    for k, axis in enumerate(axes):
+        for set_name, old, _ in {swap for variant in axis for swap in variant.swaps}:
+            if swapped.setdefault((set_name, old), k) != k:
+                raise ValueError(f"{set_name} の {old} の差し替えが重複しています")
+    scenarios = []
+    for combo in itertools.product(*axes):
+        variant = sum(combo, Variant())
+        scenarios.append(variant if variant.label else Variant(BASE_LABEL))
+    return scenarios
+
+
+@dataclass
+class SweepResult:
+    """全シナリオの計算結果（先頭の次元はシナリオ）"""
+    scenarios: List[Variant]
+    ingredients: List[str]
+    revenue: np.ndarray     # (シナリオ数,) 売上（製造金額）
+    usage: np.ndarray       # (シナリオ数, ネタ数) 必要枚数
+    shortage: np.ndarray    # (シナリオ数, ネタ数) 在庫に対する不足枚数
+    order_cost: np.ndarray  # (シナリオ数,) 発注金額
+
+    @property
+    def margin(self) -> np.ndarray:
+        return self.revenue - self.order_cost
+
+    def ranked_rows(self, limit: int = None) -> List[dict]:
+        """売上 − 発注金額 の大きい順の表"""
+        order = np.argsort(-self.margin, kind="stable")[:limit]
+        return [
+            {
+                "順位": rank + 1,
+                "シナリオ": self.scenarios[k].label,
+                "売上": int(self.revenue[k]),
+                "発注金額": round(float(self.order_cost[k])),
+                "売上−発注金額": round(float(self.margin[k])),
+                "必要枚数": int(self.usage[k].sum()),
+                "不足ネタ数": int((self.shortage[k] > 0).sum()),
+            }
+            for rank, k in enumerate(order)
+        ]
+
+
+def _set_factors(matrix: RecipeMatrix, scenarios: Sequence[Variant], field: str) -> np.ndarray:
+    """シナリオごとのセットの倍率 (シナリオ数, セット数)"""
+    set_index = matrix.set_index
+    factors = np.ones((len(scenarios), len(matrix.set_names)))
+    entries = [(s, set_index[name], rate) for s, v in enumerate(scenarios)
+               for name, rate in getattr(v, field) if name in set_index]
+    if entries:
+        s, i, rate = (np.array(col) for col in zip(*entries))
+        np.multiply.at(factors, (s.astype(np.int64), i.astype(np.int64)), rate)
+    return factors
+
+
+def evaluate_scenarios(matrix: RecipeMatrix,
+                       ingredients: Union[IngredientCatalog, Sequence[str]],
+                       base_plan: np.ndarray,
+                       inventory: Mapping[str, int],
+                       offers: Sequence[SupplierOffer],
+                       scenarios: Sequence[Variant]) -> SweepResult:
+    """基準の製造数 base_plan (セット数,) に各シナリオの変更を加えて計算する"""
+    names = ingredient_names(ingredients)
+    ing_index = {ing: j for j, ing in enumerate(names)}
+    base_plan = np.asarray(base_plan, dtype=np.int64)
+
+    counts = np.rint(base_plan * _set_factors(matrix, scenarios, "count_rates")).astype(np.int64)
+    prices = np.rint(matrix.prices * _set_factors(matrix, scenarios, "price_rates")).astype(np.int64)
+    usage = compute_plan(matrix, counts).usage.copy()
+    revenue = (counts * prices).sum(axis=1)
+
+    # ネタの差し替え: 差し替え前のネタの使用分を差し替え後のネタへ移す
+    # （元のレシピの枚数を移すので、同じセット・同じネタは1回だけにする。後に指定したものを使う）
+    set_index = matrix.set_index
+    collapsed = {
+        (s, set_index[name], ing_index[old]): ing_index[new]
+        for s, v in enumerate(scenarios) for name, old, new in v.swaps
+        if name in set_index and old in ing_index and new in ing_index
+    }
+    swaps = [(s, i, a, b) for (s, i, a), b in collapsed.items() if a != b]
+    if swaps:
+        s, i, a, b = (np.array(col, dtype=np.int64) for col in zip(*swaps))
+        moved = counts[s, i] * matrix.counts[i, a]
+        np.add.at(usage, (s, a), -moved)
+        np.add.at(usage, (s, b), moved)
+
+    inv = np.array([inventory.get(ing, 0) for ing in names], dtype=np.int64)
+    unique_usage, inverse = np.unique(usage, axis=0, return_inverse=True)
+    cost = order_costs(ingredients, unique_usage, inventory, offers)[inverse.reshape(-1)]
+    return SweepResult(list(scenarios), names, revenue, usage, np.maximum(0, usage - inv), cost)
@@ -0,0 +1,21 @@
+"""画面の各セクション（タブ①〜⑥）
+
+app.py は選択中のセクションのモジュールだけを import して render() を呼ぶ。
+各 render() は st.fragment なので、セクション内の入力変更では
+そのセクションだけが再実行される。
+"""
+
+# 表示名 -> モジュール名（表示順）
+SECTIONS = {
+    "① 今日の製造計画": "today",
+    "② 明日の製造計画": "tomorrow",
+    "③ 在庫入力": "inventory",
+    "④ 発注計算": "order",
+    "⑤ 印刷用レポート": "report",
+    "⑥ レシピ・価格カスタマイズ管理": "customize",
+}
+
+# 運用向けのページ（URL に ?metrics=1 を付けたときだけ表示する）
+TOOL_SECTIONS = {
+    "📈 計測": "metrics",
+}
@@ -0,0 +1,285 @@
+"""セクション共通の部品（データベース接続・表示用テーブル・入力欄・計測）"""
+import functools
+import os
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import streamlit as st
+
+from sushi_app import metrics
+from sushi_app.catalog import load_catalog
+from sushi_app.ordering import default_offers
+from sushi_app.planning import compile_sets
+from sushi_app.storage import open_storage
+
+
+# ----------------------------------------
+# データベース（プロセス内で1つの接続・キャッシュを共有）
+# ----------------------------------------
+@st.cache_resource(show_spinner=False)
+def get_storage():
+    storage = open_storage()
+    load_catalog(storage)
+    return storage
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _catalog_for_version(version):
+    return load_catalog(get_storage())
+
+
+def get_catalog():
+    """ネタカタログ（ネタ一覧が変更されたときだけ作り直す）"""
+    storage = get_storage()
+    storage.refresh()
+    return _catalog_for_version(storage.ingredients_version)
+
+
+def today_str():
+    return datetime.now().strftime("%Y年%m月%d日")
+
+
+def get_set_catalog():
+    """最新の版のセットカタログ（全セッションで共有し、セッションは参照だけを持つ）"""
+    set_catalog = get_storage().load_set_catalog()
+    st.session_state["set_catalog"] = set_catalog
+    return set_catalog
+
+
+def load_sets():
+    """最新のセット情報（読み取り専用。変更は storage の保存メソッドで行う）"""
+    return get_set_catalog().sets
+
+
+def get_recipe_matrix(set_catalog=None):
+    """セット情報のレシピ行列（セットの版・ネタ一覧ごとに1度だけ作る）"""
+    catalog = get_catalog()
+    set_catalog = set_catalog or get_set_catalog()
+    return set_catalog.derived(
+        ("recipe_matrix", catalog.names), lambda: compile_sets(set_catalog.sets, catalog)
+    )
+
+
+def running_plan(name):
+    """セッションごとの差分集計（name は "today" / "tomorrow"）
+
+    セット情報が新しい版になっていれば、変わったセットの分だけを反映してから返す。
+    """
+    from sushi_app.incremental import RunningPlan
+
+    set_catalog = get_set_catalog()
+    matrix = get_recipe_matrix(set_catalog)
+    key = f"running_{name}"
+    running = st.session_state.get(key)
+    if running is None:
+        running = st.session_state[key] = RunningPlan(set_catalog, matrix)
+    else:
+        running.rebase(set_catalog, matrix)
+    return running
+
+
+def load_inventory():
+    """最新の在庫（未登録のネタは0枚）"""
+    inventory = {ing: 0 for ing in get_catalog()} | get_storage().load_inventory()
+    st.session_state["current_inventory"] = inventory
+    return inventory
+
+
+def load_offers():
+    """登録済みの仕入先条件（未登録なら発注ロットだけの既定条件）"""
+    return get_storage().load_offers() or default_offers(get_catalog().order_lot)
+
+
+# ----------------------------------------
+# 需要予測（モデルはプロセス内で1つを共有し、新しい実績の日だけを追加する）
+# ----------------------------------------
+@st.cache_resource(show_spinner=False)
+def _forecast_state():
+    from sushi_app.forecast import DemandForecaster
+
+    return {"model": DemandForecaster(), "version": 0, "lock": threading.Lock(), "key": None, "predictions": {}}
+
+
+def record_production(plan):
+    """今日の製造数を製造実績として保存する（その日の実績は置き換え）"""
+    sets_data = load_sets()
+    statuses = {name: data["ステータス"] for name, data in sets_data.items()}
+    get_storage().save_production(datetime.now().date().isoformat(), plan, statuses)
+
+
+def forecast_days(days):
+    """days の各日の製造数の予測 [{セット名: 製造数}]（ステータスは現在のセット情報のもの）
+
+    予測は製造実績・セット情報の版が変わるまで日ごとに使い回す。
+    """
+    state = _forecast_state()
+    set_catalog = get_set_catalog()
+    with state["lock"]:
+        rows = list(get_storage().iter_production_history(state["version"]))
+        if rows:
+            state["model"].update(row[:4] for row in rows)
+            state["version"] = max(row[4] for row in rows)
+        key = (state["version"], set_catalog.version)
+        if state["key"] != key:
+            state["key"], state["predictions"] = key, {}
+        predictions = state["predictions"]
+        missing = [day for day in days if day not in predictions]
+        if missing:
+            statuses = {name: data["ステータス"] for name, data in set_catalog.sets.items()}
+            for day in missing:
+                predictions[day] = state["model"].predict(day, statuses)
+        return [predictions[day] for day in days]
+
+
+def forecast_tomorrow():
+    """明日の製造数の予測 {セット名: 製造数}"""
+    return forecast_days([datetime.now().date() + timedelta(days=1)])[0]
+
+
+# ----------------------------------------
+# 静的なファイル（プロセスで1度だけ読む）
+# ----------------------------------------
+CSS_PATH = Path(__file__).with_name("app.css")
+
+
+@st.cache_resource(show_spinner=False)
+def app_css():
+    """画面の CSS（コメント・空白を詰めた <style> タグ。再実行のたびに送る量を減らす）"""
+    css = re.sub(r"/\*.*?\*/", "", CSS_PATH.read_text(encoding="utf-8"), flags=re.S)
+    css = re.sub(r"\s*([{};:,])\s*", r"\1", re.sub(r"\s+", " ", css)).strip()
+    return f"<style>{css}</style>"
+
+
+# ----------------------------------------
+# 表示用テーブル（Arrow の表をセットの版ごとに1度だけ作り、書式は表示時に付ける）
+# ----------------------------------------
+def _build_set_info_table(sets_data):
+    set_info = []
+    for set_name, data in sets_data.items():
+        price = data["販売価格"]
+        recipe = data["レシピ"]
+        neta_info = ", ".join([f"{ing}: {cnt}枚" for ing, cnt in recipe.items() if cnt > 0]) or "特別品"
+        set_info.append({
+            "セット名": set_name,
+            "使用ネタ": neta_info,
+            "販売価格": price
+        })
+    return set_info
+
+
+def set_info_table():
+    from sushi_app.sections.tables import to_arrow
+
+    set_catalog = get_set_catalog()
+    return set_catalog.derived("set_info_table", lambda: to_arrow(_build_set_info_table(set_catalog.sets)))
+
+
+# ----------------------------------------
+# 入力欄
+# ----------------------------------------
+def plan_values(name):
+    """製造数の入力表の値 {セット名: 製造数}（name は "today" / "tomorrow"）
+
+    表示されていないウィジェットの値は Streamlit に破棄されるため、
+    入力値をセッションの別のキーにも控えておき、再表示時の初期値にする。
+    """
+    return st.session_state.setdefault(f"_{name}_plan", {})
+
+
+def set_plan_values(name, values):
+    """製造数の入力表の値を書き換える（表の表示前に呼ぶこと）"""
+    plan_values(name).update(values)
+    # 表の編集内容は控えの値に反映済みなので、表を新しい値で作り直す
+    st.session_state.pop(f"{name}_plan_editor", None)
+
+
+def plan_editor(name, sets_data, label):
+    """全セットの製造数を1つの表で入力する（セットが増えても入力欄を1つずつ作らない）"""
+    import pandas as pd
+
+    saved = plan_values(name)
+    names = list(sets_data)
+    edited = st.data_editor(
+        pd.DataFrame({"セット名": names, label: [saved.get(set_name, 0) for set_name in names]}),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["セット名"],
+        key=f"{name}_plan_editor",
+        column_config={label: st.column_config.NumberColumn(min_value=0, step=1, required=True)},
+    )
+    plan = dict(zip(names, edited[label].fillna(0).astype(int).tolist()))
+    saved.update(plan)
+    return plan
+
+
+# ----------------------------------------
+# 計測（sushi_app.metrics とセッションの結び付け）
+# ----------------------------------------
+@st.cache_resource(show_spinner=False)
+def start_metrics_server():
+    """SUSHI_METRICS_PORT が指定されていれば /metrics を返すサーバーを1つだけ起動する"""
+    port = os.environ.get("SUSHI_METRICS_PORT")
+    return metrics.start_http_server(int(port)) if port else None
+
+
+@contextmanager
+def rerun_metrics(kind, section=""):
+    """再実行1回分を計測し、何回かに1回はセッション状態の大きさも記録する
+
+    「次の再実行をプロファイル」が予約されていれば、その1回だけ cProfile で計測する。
+    """
+    session_id = st.session_state.setdefault("_metrics_session_id", uuid.uuid4().hex[:12])
+    rerun_count = st.session_state["_metrics_rerun_count"] = st.session_state.get("_metrics_rerun_count", 0) + 1
+    profile = st.session_state.pop("_profile_next_rerun", False)
+    with metrics.rerun(kind, section, session_id, profile) as run:
+        yield run
+        if metrics.should_measure_session(rerun_count):
+            run.session_bytes = metrics.session_size(st.session_state)
+    if run.profile_text is not None:
+        st.session_state["profile_output"] = run.profile_text
+
+
+def timed_section(name):
+    """セクションの render() を計測する（@st.fragment の内側に付ける）
+
+    アプリ全体の再実行中はその区間として、セクションだけの再実行では1回の再実行として記録する。
+    """
+    def decorator(render):
+        @functools.wraps(render)
+        def wrapper(*args, **kwargs):
+            if metrics.current() is not None:
+                with metrics.timer("section", name):
+                    return render(*args, **kwargs)
+            with rerun_metrics("fragment", name), metrics.timer("section", name):
+                return render(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_handler(name):
+    """ボタンを押したときの処理を計測する"""
+    return metrics.timer("handler", name)
+
+
+# ----------------------------------------
+# 入力中の集計
+# ----------------------------------------
+def live_totals(running, money_label, usage_label, show_shortage=False):
+    """入力中の製造数の集計（入力を変えるたびに差分で更新される）"""
+    from sushi_app.sections.tables import data_table
+
+    st.markdown(f"##### 💰 {money_label}（入力中）: ¥{running.total:,}")
+    usage = [(ing, q) for ing, q in running.usage_dict().items() if q > 0]
+    with st.expander(f"🔪 {usage_label}（入力中）", expanded=False):
+        if usage:
+            data_table([{"ネタ": ing, usage_label: q} for ing, q in usage], key=f"tbl_live_{usage_label}")
+        else:
+            st.info("使用するネタはありません。")
+    if show_shortage:
+        shortage = running.shortage_dict()
+        if shortage:
+            st.warning("在庫(タブ③)が足りないネタ: " + ", ".join(f"{ing} {q}枚" for ing, q in shortage.items()))
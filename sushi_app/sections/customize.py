@@ -0,0 +1,230 @@
+"""タブ⑥：レシピ・価格カスタマイズ管理"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sushi_app.defaults import STATUS_OPTIONS
+from sushi_app.recipe_table import diff_sets, frame_to_sets, read_csv, sets_to_frame, to_csv_bytes
+from sushi_app.scenarios import evaluate_scenarios, parse_percentages, rate_axis, scenario_grid, swap_axis
+from sushi_app.sections.common import (get_catalog, get_recipe_matrix, get_set_catalog, get_storage,
+                                       load_inventory, load_offers, load_sets, plan_values, timed_handler,
+                                       timed_section)
+from sushi_app.sections.tables import data_table, to_arrow
+
+EDIT_MODES = ["一括編集（表）", "1セットずつ編集"]
+
+
+@timed_handler("save_sets")
+def apply_changes(sets_data, changes):
+    """検証済みの差分を1回のトランザクションで保存し、アプリ全体を1回だけ再実行する"""
+    get_storage().apply_set_changes(changes.upserts, changes.deletes)
+    st.session_state["bulk_saved_message"] = f"セット情報を保存しました（{changes.summary(sets_data)}）"
+    st.rerun()
+
+
+def show_changes(sets_data, changes):
+    """検証結果を表示し、保存できる状態なら True を返す"""
+    if changes.errors:
+        for error in changes.errors:
+            st.error(error)
+        return False
+    if changes.empty:
+        st.info("変更はありません。")
+        return False
+    st.info(f"保存される変更: {changes.summary(sets_data)}")
+    if changes.deletes:
+        st.warning(f"削除されるセット: {', '.join(changes.deletes)}")
+    return True
+
+
+def bulk_editor(sets_data, catalog):
+    """全セットの販売価格・ステータス・レシピを表でまとめて編集する"""
+    storage = get_storage()
+    # 一括編集の元になる表はセットの版ごとに1度だけ作り、全セッションで共有する
+    base = get_set_catalog().derived(("recipe_frame", catalog.names), lambda: sets_to_frame(sets_data, catalog))
+    st.markdown("表のセルを直接編集し、最後に「変更をまとめて保存」を押してください。行の追加・削除もできます。")
+    column_config = {
+        "セット名": st.column_config.TextColumn(required=True),
+        "販売価格": st.column_config.NumberColumn(min_value=0, step=10, required=True),
+        "ステータス": st.column_config.SelectboxColumn(options=STATUS_OPTIONS, default="通常", required=True),
+    }
+    for ing in catalog.names:
+        column_config[ing] = st.column_config.NumberColumn(min_value=0, step=1, default=0)
+    edited = st.data_editor(
+        base,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        # 保存後はデータの版が変わるので、編集内容を破棄して最新の表から始める
+        key=f"bulk_editor_{storage.data_version()}",
+        column_config=column_config
+    )
+    changes = diff_sets(sets_data, frame_to_sets(edited, catalog))
+    can_save = show_changes(sets_data, changes)
+    if st.button("💾 変更をまとめて保存", key="save_bulk", disabled=not can_save, use_container_width=True):
+        apply_changes(sets_data, changes)
+
+    st.markdown("---")
+    st.markdown("##### 📄 CSV でのダウンロード・取り込み")
+    st.download_button(
+        "⬇️ レシピ表をCSVでダウンロード",
+        to_csv_bytes(base),
+        file_name="recipes.csv",
+        mime="text/csv"
+    )
+    uploaded = st.file_uploader("CSV を取り込む（ダウンロードしたCSVと同じ列構成）", type="csv", key="recipes_csv")
+    if uploaded is not None:
+        delete_missing = st.checkbox("CSV にないセットを削除する", value=False, key="csv_delete_missing")
+        try:
+            uploaded_df = read_csv(uploaded.getvalue())
+        except (ValueError, UnicodeDecodeError) as e:
+            st.error(f"CSV を読み込めませんでした: {e}")
+            return
+        csv_changes = diff_sets(sets_data, frame_to_sets(uploaded_df, catalog), delete_missing)
+        if show_changes(sets_data, csv_changes) and st.button("📥 CSV の内容を保存", key="save_csv"):
+            apply_changes(sets_data, csv_changes)
+
+
+def single_editor(sets_data, catalog):
+    """1セットずつの追加・編集"""
+    storage = get_storage()
+    st.subheader("現在のセット一覧")
+    data_table(get_set_catalog().derived("set_list_table", lambda: to_arrow([
+        {
+            "セット名": set_name,
+            "販売価格": data["販売価格"],
+            "ステータス": data["ステータス"],
+            "レシピ": ", ".join([f"{k}: {v}" for k, v in data["レシピ"].items() if v > 0])
+        }
+        for set_name, data in sets_data.items()
+    ])), key="tbl_sets_customize")
+
+    st.subheader("セット情報の追加・編集")
+
+    # セット選択または新規追加の選択
+    set_operation = st.radio("操作を選択", ["新規セット追加", "既存セット編集"])
+
+    if set_operation == "既存セット編集":
+        edit_set_name = st.selectbox("編集するセット名", list(sets_data.keys()))
+        default_price = sets_data[edit_set_name]["販売価格"]
+        default_status = sets_data[edit_set_name]["ステータス"]
+        default_recipe = sets_data[edit_set_name]["レシピ"]
+    else:
+        edit_set_name = st.text_input("新規セット名", "")
+        default_price = 0
+        default_status = "通常"
+        default_recipe = {}
+
+    price_input = st.number_input("販売価格", min_value=0, value=default_price, step=10)
+    status_input = st.selectbox("ステータス", STATUS_OPTIONS, index=STATUS_OPTIONS.index(default_status))
+
+    # レシピはネタごとの入力欄ではなく表で編集する（0 枚のネタは保存しない）
+    edited_recipe = st.data_editor(
+        pd.DataFrame({
+            "ネタ": catalog.names,
+            "使用枚数": [default_recipe.get(ing, 0) for ing in catalog.names],
+        }),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["ネタ"],
+        key=f"recipe_editor_{edit_set_name}",
+        column_config={
+            "使用枚数": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+        }
+    )
+    recipe_input = {
+        ing: int(cnt)
+        for ing, cnt in zip(edited_recipe["ネタ"], edited_recipe["使用枚数"].fillna(0))
+        if cnt > 0
+    }
+
+    if st.button("セット情報を保存"):
+        with timed_handler("save_set"):
+            if edit_set_name:
+                storage.save_sets({
+                    edit_set_name: {
+                        "レシピ": recipe_input,
+                        "販売価格": price_input,
+                        "ステータス": status_input
+                    }
+                })
+                st.success(f"『{edit_set_name}』のセット情報が保存されました！")
+
+                # セット一覧は他のセクションでも使うため、アプリ全体を再実行する
+                st.rerun()
+            else:
+                st.error("セット名を入力してください。")
+
+
+def scenario_axes(sets_data, catalog):
+    """試算する変更の候補（軸）の入力"""
+    col1, col2 = st.columns(2)
+    price_sets = col1.multiselect("販売価格を変えるセット", list(sets_data), key="sweep_price_sets")
+    price_rates = col1.text_input("販売価格の変更率（%）", "-10, 0, 10", key="sweep_price_rates")
+    count_sets = col2.multiselect("製造数を変えるセット", list(sets_data), key="sweep_count_sets")
+    count_rates = col2.text_input("製造数の変更率（%）", "-20, 0, 20", key="sweep_count_rates")
+    swaps = st.data_editor(
+        pd.DataFrame({"セット名": pd.Series(dtype="object"), "差し替え前": pd.Series(dtype="object"),
+                      "差し替え後": pd.Series(dtype="object")}),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key="sweep_swaps",
+        column_config={
+            "セット名": st.column_config.SelectboxColumn(options=list(sets_data), required=True),
+            "差し替え前": st.column_config.SelectboxColumn(options=catalog.names, required=True),
+            "差し替え後": st.column_config.SelectboxColumn(options=catalog.names, required=True),
+        }
+    )
+    axes = [rate_axis(name, parse_percentages(price_rates), "price") for name in price_sets]
+    axes += [rate_axis(name, parse_percentages(count_rates), "count") for name in count_sets]
+    axes += [swap_axis(row["セット名"], row["差し替え前"], row["差し替え後"])
+             for row in swaps.dropna().to_dict("records")]
+    return axes
+
+
+def scenario_sweep(sets_data, catalog):
+    """価格・レシピ・製造数の変更を組み合わせて、売上・発注金額を比較する（保存はしない）"""
+    st.markdown("明日の製造目標数(タブ②)を基準に、変更の候補のすべての組み合わせを計算し、"
+                "「売上 − 発注金額」の大きい順に並べます。表の見出しを押すと並べ替えられます。"
+                "セット情報は変更されません。")
+    try:
+        scenarios = scenario_grid(scenario_axes(sets_data, catalog))
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.caption(f"シナリオ数: {len(scenarios):,}")
+    if st.button("🧪 試算する", key="run_sweep", use_container_width=True):
+        with timed_handler("run_sweep"):
+            recipe_matrix = get_recipe_matrix()
+            base_plan = np.array([plan_values("tomorrow").get(name, 0) for name in recipe_matrix.set_names])
+            result = evaluate_scenarios(recipe_matrix, catalog, base_plan, load_inventory(), load_offers(),
+                                        scenarios)
+            st.session_state["sweep_rows"] = result.ranked_rows()
+
+    rows = st.session_state.get("sweep_rows")
+    if rows:
+        data_table(rows, key="tbl_sweep")
+
+
+@st.fragment
+@timed_section("customize")
+def render():
+    catalog = get_catalog()
+    st.header("⑥ レシピ・価格カスタマイズ管理")
+    st.markdown("#### セットごとのレシピや販売価格、ステータスを自由に変更・登録できます。（データベースに保存されます）")
+
+    sets_data = load_sets()
+    saved_message = st.session_state.pop("bulk_saved_message", None)
+    if saved_message:
+        st.success(saved_message)
+
+    edit_mode = st.radio("編集方法", EDIT_MODES, horizontal=True, key="edit_mode")
+    if edit_mode == EDIT_MODES[0]:
+        bulk_editor(sets_data, catalog)
+    else:
+        single_editor(sets_data, catalog)
+
+    st.markdown("---")
+    with st.expander("🧪 価格・レシピ変更の試算（複数のシナリオを比較）"):
+        scenario_sweep(sets_data, catalog)
@@ -0,0 +1,62 @@
+"""タブ③：在庫入力"""
+import pandas as pd
+import streamlit as st
+
+from sushi_app.dataio import import_inventory
+from sushi_app.sections.common import get_catalog, get_storage, load_inventory, timed_handler, timed_section
+from sushi_app.sections.tables import data_table
+
+
+def inventory_importer():
+    """在庫ファイル（CSV / JSONL）の取り込み"""
+    st.markdown("「ネタ,在庫枚数」の CSV（店舗列があれば店舗別在庫）または JSONL を取り込みます。")
+    uploaded = st.file_uploader("在庫ファイル", type=["csv", "jsonl"], key="inventory_file")
+    if uploaded is not None and st.button("📥 在庫ファイルを取り込む", key="import_inventory"):
+        with timed_handler("import_inventory"):
+            result = import_inventory(get_storage(), uploaded, get_catalog())
+            if result.error_count:
+                st.warning(f"{result.error_count} 件の行を取り込めませんでした。")
+                data_table([{"エラー": error} for error in result.errors])
+            st.success(f"{result.applied} 件の在庫を取り込みました。")
+            # 取り込んだ在庫を入力欄に反映する
+            st.session_state.pop("inventory_editor", None)
+
+
+@st.fragment
+@timed_section("inventory")
+def render():
+    storage = get_storage()
+    catalog = get_catalog()
+    st.header("③ 在庫入力")
+    st.markdown("#### 現在の各ネタの在庫数を入力してください。（データベースに保存されます）")
+
+    with st.expander("📥 ファイルから在庫を取り込む"):
+        inventory_importer()
+
+    saved_inventory = load_inventory()
+
+    st.markdown("##### 📝 在庫枚数の入力")
+    # ネタが増えても入力欄を1つずつ作らないよう、表の形で編集する
+    edited = st.data_editor(
+        pd.DataFrame({
+            "ネタ": catalog.names,
+            "単位": catalog.units,
+            "在庫枚数": [saved_inventory.get(ing, 0) for ing in catalog.names],
+        }),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["ネタ", "単位"],
+        key="inventory_editor",
+        column_config={
+            "在庫枚数": st.column_config.NumberColumn(min_value=0, step=1, required=True),
+        }
+    )
+    current_inventory = dict(zip(edited["ネタ"], edited["在庫枚数"].fillna(0).astype(int).tolist()))
+    st.markdown("---")
+    if st.button("✅ 在庫を保存する", key="save_inventory", use_container_width=True):
+        with timed_handler("save_inventory"):
+            storage.save_inventory(current_inventory)
+            st.session_state["current_inventory"] = current_inventory
+            st.success("在庫データを保存しました。")
+    st.markdown("### 📊 現在の在庫状況")
+    data_table([{"ネタ": ing, "在庫枚数": qty} for ing, qty in current_inventory.items()], key="tbl_inventory")
@@ -0,0 +1,45 @@
+"""計測ページ：再実行ごとの処理時間・Prometheus 形式の出力・プロファイル"""
+import pandas as pd
+import streamlit as st
+
+from sushi_app import metrics
+from sushi_app.sections.common import timed_section
+
+
+@st.fragment
+@timed_section("metrics")
+def render():
+    st.header("📈 計測")
+    st.markdown("#### 再実行ごとの処理時間（セクション・ボタン処理・ページの準備）を表示します。")
+
+    recent = list(metrics.REGISTRY.recent)
+    st.markdown(f"##### 直近の再実行（{len(recent)} 回・接続中のセッション {metrics.REGISTRY.active_sessions()}）")
+    if recent:
+        rows = []
+        for record in reversed(recent):
+            row = {k: record[k] for k in ("time", "kind", "section", "total_ms", "session_bytes")}
+            row.update(record["spans"])
+            rows.append(row)
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+    st.markdown("##### 区間ごとの集計（秒）")
+    summaries = metrics.REGISTRY.summaries()
+    if summaries:
+        st.dataframe(pd.DataFrame(summaries), hide_index=True, use_container_width=True)
+
+    prometheus_text = metrics.REGISTRY.render_prometheus()
+    with st.expander("Prometheus 形式"):
+        st.code(prometheus_text, language="text")
+    st.download_button("⬇️ Prometheus 形式でダウンロード", prometheus_text, file_name="metrics.prom",
+                       mime="text/plain")
+
+    st.markdown("---")
+    st.markdown("##### 🔬 プロファイル")
+    if st.button("次の再実行をプロファイルする", key="profile_next"):
+        st.session_state["_profile_next_rerun"] = True
+        st.info("次に画面を操作したときの再実行を cProfile で計測します。")
+    profile_output = st.session_state.get("profile_output")
+    if profile_output:
+        st.code(profile_output, language="text")
+        st.download_button("⬇️ プロファイル結果をダウンロード", profile_output, file_name="profile.txt",
+                           mime="text/plain")
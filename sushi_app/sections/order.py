@@ -0,0 +1,258 @@
+"""タブ④：発注計算"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sushi_app.horizon import (DEFAULT_HORIZON_DAYS, DEFAULT_SHELF_LIFE, MAX_HORIZON_DAYS, WEEKDAY_LABELS,
+                               HorizonSettings, format_day, simulate_horizon)
+from sushi_app.ordering import SupplierOffer, format_price_tiers, group_offers, parse_price_tiers, solve_orders
+from sushi_app.sections.common import (forecast_days, get_catalog, get_recipe_matrix, get_set_catalog, get_storage,
+                                       load_inventory, load_offers, plan_values, timed_handler, timed_section,
+                                       today_str)
+from sushi_app.sections.tables import data_table
+
+OUTBOX_STATUS = {"pending": "送信待ち", "sent": "送信済み", "failed": "失敗", "cancelled": "取り消し"}
+
+
+def offers_editor(offers):
+    """仕入先・ロット・最低発注数量・単価の編集"""
+    st.markdown("単価は「0:120, 100:110」のように「この枚数以上:1枚の単価」で入力します。")
+    df_offers = pd.DataFrame([
+        {
+            "ネタ": o.ingredient,
+            "仕入先": o.supplier,
+            "発注ロット": o.lot,
+            "最低発注数量": o.moq,
+            "単価": format_price_tiers(o.price_tiers)
+        }
+        for o in offers
+    ])
+    edited = st.data_editor(
+        df_offers,
+        num_rows="dynamic",
+        use_container_width=True,
+        hide_index=True,
+        key="offers_editor",
+        column_config={
+            "ネタ": st.column_config.SelectboxColumn(options=list(get_catalog()), required=True),
+            "仕入先": st.column_config.TextColumn(required=True),
+            "発注ロット": st.column_config.NumberColumn(min_value=1, step=1, required=True),
+            "最低発注数量": st.column_config.NumberColumn(min_value=0, step=1, default=0),
+            "単価": st.column_config.TextColumn(default="0"),
+        }
+    )
+    if st.button("💾 仕入先条件を保存", key="save_offers"):
+        with timed_handler("save_offers"):
+            try:
+                new_offers = [
+                    SupplierOffer(
+                        row["ネタ"], str(row["仕入先"]), int(row["発注ロット"]),
+                        int(row["最低発注数量"] or 0), parse_price_tiers(row["単価"])
+                    )
+                    for row in edited.dropna(subset=["ネタ", "仕入先", "発注ロット"]).to_dict("records")
+                ]
+            except ValueError as e:
+                st.error(f"入力内容に誤りがあります: {e}")
+            else:
+                get_storage().save_offers(new_offers)
+                st.success("仕入先条件を保存しました。")
+
+
+def horizon_settings(catalog):
+    """期間・入荷曜日・発注から入荷までの日数・ネタごとの消費期限の入力"""
+    col1, col2, col3 = st.columns(3)
+    days = col1.slider("計画日数", min_value=DEFAULT_HORIZON_DAYS, max_value=MAX_HORIZON_DAYS,
+                       value=DEFAULT_HORIZON_DAYS, key="horizon_days")
+    lead_time = col2.number_input("発注から入荷までの日数", min_value=0, max_value=7, value=1, step=1,
+                                  key="horizon_lead_time")
+    weekdays = col3.multiselect("入荷曜日", WEEKDAY_LABELS, default=WEEKDAY_LABELS, key="horizon_weekdays")
+    shelf_life = st.data_editor(
+        pd.DataFrame({"ネタ": catalog.names, "消費期限（日）": [DEFAULT_SHELF_LIFE] * len(catalog)}),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["ネタ"],
+        key="horizon_shelf_life",
+        column_config={"消費期限（日）": st.column_config.NumberColumn(min_value=1, max_value=30, step=1)},
+    )
+    return HorizonSettings(
+        days=days,
+        shelf_life=dict(zip(shelf_life["ネタ"], shelf_life["消費期限（日）"].fillna(DEFAULT_SHELF_LIFE).astype(int))),
+        delivery_weekdays=[WEEKDAY_LABELS.index(w) for w in weekdays],
+        lead_time=int(lead_time),
+    )
+
+
+def horizon_plans(sets_data, dates):
+    """日ごとの製造数の入力（初期値: 初日は明日の製造目標数(タブ②)、以降は製造実績からの予測）"""
+    forecasts = forecast_days(dates)
+    tomorrow_plan = plan_values("tomorrow")
+    columns = {}
+    for t, (day, forecast) in enumerate(zip(dates, forecasts)):
+        columns[format_day(day)] = [
+            tomorrow_plan.get(name, forecast.get(name, 0)) if t == 0 else forecast.get(name, 0)
+            for name in sets_data
+        ]
+    edited = st.data_editor(
+        pd.DataFrame({"セット名": list(sets_data), **columns}),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["セット名"],
+        key=f"horizon_plans_{len(dates)}",
+    )
+    return edited[list(columns)].fillna(0).to_numpy(dtype=np.int64).T
+
+
+def horizon_planner():
+    """複数日の在庫の持ち越し・消費期限・入荷を計算し、日ごとの発注予定を表示する"""
+    st.markdown("明日から最大14日間について、在庫の持ち越し・消費期限切れ・入荷を日ごとに計算し、"
+                "入荷曜日に合わせた発注予定を作ります。製造数・条件・在庫を変えると計算し直します。")
+    catalog = get_catalog()
+    set_catalog = get_set_catalog()
+    settings = horizon_settings(catalog)
+    start = datetime.now().date() + timedelta(days=1)
+    dates = [start + timedelta(days=t) for t in range(settings.days)]
+    plans = horizon_plans(set_catalog.sets, dates)
+    inventory = load_inventory()
+    offers = load_offers()
+
+    # 入力・データの版が前回と同じなら計算し直さない（タブ④の他の操作での再実行など）
+    key = (set_catalog.version, catalog.names, plans.shape, plans.tobytes(), repr(settings),
+           tuple(sorted(inventory.items())), tuple(offers), start)
+    cached = st.session_state.get("horizon_cache")
+    if cached is not None and cached[0] == key:
+        result = cached[1]
+    else:
+        with timed_handler("horizon"):
+            result = simulate_horizon(get_recipe_matrix(set_catalog), catalog, plans, inventory, offers,
+                                      start, settings, today=start - timedelta(days=1))
+        st.session_state["horizon_cache"] = (key, result)
+    st.markdown("##### 🗓️ 日ごとの在庫の動き")
+    data_table(result.daily_rows(), key="tbl_horizon_daily")
+    schedule = result.schedule_rows()
+    if schedule:
+        st.markdown(f"##### 🚚 発注予定（合計 ¥{round(result.order_cost):,}）")
+        data_table(schedule, key="tbl_horizon_schedule")
+    short = result.shortage.sum(axis=0)
+    if short.any():
+        items = ", ".join(f"{ing}: {int(q)}" for ing, q in zip(result.ingredients, short) if q > 0)
+        st.warning(f"入荷曜日・消費期限の都合で足りなくなるネタがあります（{items}）。")
+
+
+@st.fragment
+@timed_section("order")
+def render():
+    storage = get_storage()
+    st.header("④ 発注計算")
+    st.markdown("#### 明日の必要ネタ数(タブ②)と在庫数(タブ③)を比較し、不足分を最も安い発注で計算します。")
+
+    offers = load_offers()
+    with st.expander("🚚 仕入先・発注ロット・単価の設定"):
+        offers_editor(offers)
+    # 開いているときだけ計画の表を作って計算する
+    horizon = st.expander("🗓️ 複数日の発注計画（消費期限・入荷曜日）", key="horizon_expander", on_change="rerun")
+    if horizon.open:
+        with horizon:
+            horizon_planner()
+
+    st.markdown("---")
+    if st.button("✅ 発注を計算する", key="calc_order", use_container_width=True):
+        with timed_handler("calc_order"):
+            if st.session_state.get("tomorrow_required"):
+                tomorrow_required = st.session_state["tomorrow_required"]
+                current_inventory = load_inventory()
+                offers = load_offers()
+                order_plan = solve_orders(get_catalog(), tomorrow_required, current_inventory, offers)
+                order_calculation = order_plan.rows(group_offers(offers))
+                st.markdown("### 📋 発注計算結果")
+                data_table(order_calculation)
+                st.markdown(f"### 💰 合計発注金額: ¥{round(order_plan.total_cost):,}")
+                st.session_state["order_calculation"] = order_calculation
+                st.session_state["order_lines"] = order_plan.lines
+                storage.save_report("order", today_str(), {
+                    "rows": order_calculation,
+                    "lines": order_plan.lines
+                })
+            else:
+                st.info("まずは『明日の製造計画』と『在庫入力』を行ってください。")
+
+    if st.session_state.get("order_lines"):
+        send_orders()
+
+
+# ----------------------------------------
+# 発注の送信（画面の再実行とは別のスレッドで行い、状況はアウトボックスから表示する）
+# ----------------------------------------
+@st.cache_resource(show_spinner=False)
+def _dispatch_executor():
+    # 1本のスレッドで順に送る（同じ未送信の発注を複数のセッションから同時に送らない）
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="order-dispatch")
+
+
+def _dispatch(storage):
+    # aiohttp の読み込みに時間がかかるため、送信するときだけ import する
+    from sushi_app.dispatch import DEFAULT_URL_TEMPLATE, dispatch
+
+    return dispatch(storage, url_template=os.environ.get("SUSHI_SUPPLIER_URL", DEFAULT_URL_TEMPLATE))
+
+
+def outbox_table(storage, order_date):
+    outbox = [
+        {"仕入先": supplier, "状態": OUTBOX_STATUS.get(status, status), "試行回数": attempts, "エラー": error}
+        for _, supplier, status, attempts, error, _ in storage.iter_outbox(order_date)
+    ]
+    if outbox:
+        st.markdown("##### 📮 本日の発注の送信状況")
+        data_table(outbox, key="tbl_outbox")
+
+
+@st.fragment(run_every=1.0)
+def dispatch_progress(storage, order_date):
+    """送信中はアウトボックスの状況を1秒ごとに表示し、終わったらセクションを再実行して結果を出す"""
+    job = st.session_state.get("dispatch_job")
+    if job is not None and job.done():
+        st.rerun()
+    st.info("仕入先へ送信しています...")
+    outbox_table(storage, order_date)
+
+
+def dispatch_result(storage, order_date):
+    job = st.session_state.get("dispatch_job")
+    if job is not None and not job.done():
+        dispatch_progress(storage, order_date)
+        return
+    if job is not None:
+        try:
+            result = job.result()
+        except Exception as e:   # 送信処理の想定外の失敗も画面に出す（アウトボックスの状態は残る）
+            st.error(f"発注を送信できませんでした: {e}")
+        else:
+            if result.failed:
+                st.error(f"{result.failed} 件の発注を送信できませんでした。"
+                         "もう一度送信すると、失敗した分だけ送り直します。")
+            elif result.sent:
+                st.success(f"{result.sent} 件の発注を送信しました。")
+            else:
+                st.info("送信済みの発注です（同じ日・同じ仕入先の発注は2回送りません）。")
+    outbox_table(storage, order_date)
+
+
+def send_orders():
+    """計算した発注を仕入先ごとにアウトボックスへ登録し、別のスレッドで送信する"""
+    storage = get_storage()
+    order_date = today_str()
+    st.markdown("---")
+    job = st.session_state.get("dispatch_job")
+    sending = job is not None and not job.done()
+    if st.button("📤 仕入先へ発注を送信", key="send_orders", use_container_width=True, disabled=sending):
+        with timed_handler("dispatch_orders"):
+            from sushi_app.dispatch import enqueue_order
+
+            # 計算し直した発注は、未送信・失敗の分だけ新しい版に置き換わる（明細にない仕入先は取り消し）
+            enqueue_order(storage, order_date, st.session_state["order_lines"])
+            storage.retry_outbox(order_date)
+            st.session_state["dispatch_job"] = _dispatch_executor().submit(_dispatch, storage)
+    dispatch_result(storage, order_date)
@@ -0,0 +1,165 @@
+"""タブ⑤：印刷用レポート"""
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from sushi_app import reports
+from sushi_app.formatting import yen
+from sushi_app.sections.common import get_storage, timed_handler, timed_section, today_str
+from sushi_app.sections.tables import data_table
+
+
+def download_buttons(doc):
+    """レポートを PDF / Excel でダウンロードするボタン（押した形式だけを、押したときに描画する）"""
+    columns = st.columns(len(reports.RENDERERS))
+    for column, fmt in zip(columns, reports.RENDERERS):
+        package = reports.missing_package(fmt)
+        if package:
+            column.caption(f"{fmt.upper()} 形式の出力には {package} が必要です（pip install {package}）")
+            continue
+        column.download_button(f"⬇️ {fmt.upper()} でダウンロード", functools.partial(reports.render, doc, fmt),
+                               file_name=f"{doc.filename}.{fmt}", mime=reports.MIME_TYPES[fmt],
+                               key=f"download_{doc.kind}_{fmt}", use_container_width=True)
+
+
+# ----------------------------------------
+# 期間の一括出力（画面の再実行とは別のスレッドで行う）
+# ----------------------------------------
+@st.cache_resource(show_spinner=False)
+def _export_executor():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-export")
+
+
+def _export(storage, kinds, start, end, fmt):
+    docs = reports.load_documents(storage, kinds, start, end)
+    return len(docs), (reports.export_documents(docs, fmt) if docs else b"")
+
+
+@st.fragment(run_every=1.0)
+def export_progress():
+    """一括出力の完了を待つ（終わったらセクションを再実行してダウンロードボタンを出す）"""
+    job = st.session_state.get("report_export_job")
+    if job is None:
+        return
+    if not job["future"].done():
+        st.info(f"{job['name']} を作成しています...")
+        return
+    st.rerun()
+
+
+def export_result():
+    job = st.session_state.get("report_export_job")
+    if job is None:
+        return
+    if not job["future"].done():
+        export_progress()
+        return
+    try:
+        count, data = job["future"].result()
+    except RuntimeError as e:
+        st.error(str(e))
+        return
+    if not count:
+        st.info("期間内に保存されたレポートはありません。")
+        return
+    st.download_button(f"⬇️ {job['name']}（{count} 件）", data, file_name=job["name"], mime="application/zip",
+                       key="download_export", use_container_width=True)
+
+
+def batch_export():
+    """保存済みレポートを日付範囲でまとめて出力する"""
+    today = datetime.now().date()
+    col1, col2, col3 = st.columns(3)
+    dates = col1.date_input("期間", value=(today - timedelta(days=6), today), key="export_dates")
+    kinds = col2.multiselect("レポート", list(reports.REPORT_TITLES), default=list(reports.REPORT_TITLES),
+                             format_func=reports.REPORT_TITLES.get, key="export_kinds")
+    fmt = col3.radio("形式", list(reports.RENDERERS), format_func=str.upper, horizontal=True, key="export_format")
+    if st.button("📦 まとめて出力", key="export_reports", use_container_width=True):
+        if len(dates) != 2:
+            st.warning("期間の開始日と終了日を選択してください。")
+            return
+        start, end = (day.strftime(reports.DATE_FORMAT) for day in dates)
+        with timed_handler("export_reports"):
+            st.session_state["report_export_job"] = {
+                "name": f"reports_{dates[0]:%Y%m%d}_{dates[1]:%Y%m%d}_{fmt}.zip",
+                "future": _export_executor().submit(_export, get_storage(), kinds, start, end, fmt),
+            }
+    export_result()
+
+
+@st.fragment
+@timed_section("report")
+def render():
+    current_date = today_str()
+    st.header("⑤ 印刷用レポート")
+    print_view = st.checkbox("🖨️ 印刷ビューに切り替える", value=st.session_state["print_view"])
+    st.session_state["print_view"] = print_view
+
+    st.markdown("#### 印刷用レポートを表示します。")
+    st.info("**印刷したいタブを選択した状態で、ブラウザの印刷機能(Ctrl+P / ⌘+P)を使ってください。**")
+    if print_view:
+        st.caption("印刷ビューでは、大きな文字の表で表示します。行が多い表は、絞り込みやページで"
+                   "印刷する部分を選んでください（入力欄は印刷されません）。")
+
+    report_type = st.radio("表示するレポートを選択してください", ["今日の製造集計", "明日の製造計画", "発注計算結果"], horizontal=True)
+    st.markdown("---")
+
+    if report_type == "今日の製造集計":
+        st.markdown("## 📑 今日の製造集計レポート")
+        report = st.session_state.get("today_report")
+        if report:
+            st.markdown(f"### 製造日: {report.get('date', current_date)}")
+            st.markdown("### 製造セット集計")
+            data_table(report["summary"], key="tbl_report_today_summary", printable=print_view)
+            st.markdown(f"### 合計製造金額: {yen(report['total_money'])}")
+            st.markdown("### 使用ネタ集計")
+            usage_items = [{"ネタ": ing, "使用枚数": qty} for ing, qty in report["usage"].items() if qty > 0]
+            if usage_items:
+                data_table(usage_items, key="tbl_report_today_usage", printable=print_view)
+            else:
+                st.info("使用したネタはありません。")
+            download_buttons(reports.build_document("today", report.get("date", current_date), report))
+        else:
+            st.error("まだ『今日の製造計画』が計算されていません。")
+
+    elif report_type == "明日の製造計画":
+        st.markdown("## 📑 明日の製造計画レポート")
+        tomorrow_summary = st.session_state.get("tomorrow_summary")
+        tomorrow_total = st.session_state.get("tomorrow_total")
+        tomorrow_required = st.session_state.get("tomorrow_required")
+        if tomorrow_summary:
+            next_date = (datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+                         + timedelta(days=1)).strftime('%Y年%m月%d日')
+            st.markdown(f"### 計画日: {next_date}")
+            st.markdown("### 製造セット計画")
+            data_table(tomorrow_summary, key="tbl_report_tomorrow_summary", printable=print_view)
+            st.markdown(f"### 合計目標製造金額: {yen(tomorrow_total)}")
+            st.markdown("### 必要ネタ数")
+            required_items = [{"ネタ": ing, "必要枚数": qty} for ing, qty in tomorrow_required.items() if qty > 0]
+            if required_items:
+                data_table(required_items, key="tbl_report_tomorrow_required", printable=print_view)
+            else:
+                st.info("必要なネタはありません。")
+            download_buttons(reports.build_document("tomorrow", current_date, {
+                "summary": tomorrow_summary, "total": tomorrow_total, "required": tomorrow_required
+            }))
+        else:
+            st.error("まだ『明日の製造計画』が計算されていません。")
+
+    else:
+        st.markdown("## 📑 発注計算結果レポート")
+        order_calculation = st.session_state.get("order_calculation")
+        if order_calculation:
+            current_date_report = datetime.now().strftime('%Y年%m月%d日')
+            st.markdown(f"### 発注日: {current_date_report}")
+            st.markdown("### 発注リスト")
+            data_table(order_calculation, key="tbl_report_order", printable=print_view)
+            download_buttons(reports.build_document("order", current_date, {"rows": order_calculation}))
+        else:
+            st.error("まだ『発注計算』が行われていません。")
+
+    st.markdown("---")
+    with st.expander("📦 保存済みレポートを期間でまとめて出力"):
+        batch_export()
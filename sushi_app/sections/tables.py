@@ -0,0 +1,132 @@
+"""表の表示（大きな表はサーバー側で絞り込み・並べ替え・ページ分けしてから送る）
+
+st.table は表全体を HTML にして送るため、セット数・ネタ数・発注明細が増えると
+送る量とブラウザの描画時間が行数に比例して増える。ここでは
+
+- 行を pyarrow の Table にし、絞り込み・並べ替え・ページ分けをサーバー側で行い、
+  表示するページだけを st.dataframe（仮想スクロールの表）に Arrow のまま渡す。
+- 金額の列は数値のまま渡し、¥ 表記は列の書式で付ける（並べ替えも数値の順になる）。
+- 印刷ビュー（タブ⑤）では、選んだページ・絞り込み結果だけを大きな文字の HTML の表にする。
+
+key を省略した表（ボタンを押したときだけ表示する計算結果など）はページ分けせず、
+全体をそのまま仮想スクロールの表で表示する。
+"""
+import math
+from typing import Iterable, Mapping, Optional, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import streamlit as st
+
+from sushi_app.formatting import YEN_COLUMNS, format_rows, format_value
+
+PAGE_SIZES = (20, 50, 100, 500)
+DEFAULT_PAGE_SIZE = 50
+NO_SORT = "（並べ替えなし）"
+
+
+# ----------------------------------------
+# Arrow の表と、サーバー側の絞り込み・並べ替え・ページ分け
+# ----------------------------------------
+def to_arrow(rows: Iterable[Mapping]) -> pa.Table:
+    """行（dict のリスト）を Arrow の表にする
+
+    数値と文字列が混ざる列（以前に保存した "¥1,200" など）は、書式を付けた文字列の列にする。
+    """
+    rows = list(rows)
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    arrays = []
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array([None if v is None else str(format_value(column, v)) for v in values]))
+    return pa.Table.from_arrays(arrays, names=columns)
+
+
+def filter_table(table: pa.Table, text: str) -> pa.Table:
+    """どれかの列に text を含む行だけにする（大文字・小文字は区別しない）"""
+    text = text.strip()
+    if not text or table.num_rows == 0:
+        return table
+    mask = None
+    for column in table.columns:
+        match = pc.fill_null(pc.match_substring(pc.cast(column, pa.string()), text, ignore_case=True), False)
+        mask = match if mask is None else pc.or_(mask, match)
+    return table.filter(mask)
+
+
+def sort_table(table: pa.Table, column: Optional[str], descending: bool = False) -> pa.Table:
+    if not column or column not in table.column_names:
+        return table
+    return table.sort_by([(column, "descending" if descending else "ascending")])
+
+
+def page_count(num_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(num_rows / page_size))
+
+
+def page_of(table: pa.Table, page: int, page_size: int) -> pa.Table:
+    """1 から数えた page ページ目（範囲外は最後のページ）"""
+    page = min(max(page, 1), page_count(table.num_rows, page_size))
+    return table.slice((page - 1) * page_size, page_size)
+
+
+# ----------------------------------------
+# 表示
+# ----------------------------------------
+def column_config(table: pa.Table) -> dict:
+    """数値の金額の列に ¥ 表記の書式を付ける"""
+    return {
+        field.name: st.column_config.NumberColumn(format="¥%d")
+        for field in table.schema
+        if field.name in YEN_COLUMNS and (pa.types.is_integer(field.type) or pa.types.is_floating(field.type))
+    }
+
+
+def _grid(table: pa.Table):
+    st.dataframe(table, hide_index=True, use_container_width=True, column_config=column_config(table))
+
+
+def _print_table(table: pa.Table, key: str):
+    """印刷用の HTML の表（app.css の大きな文字・太い罫線のスタイルを使う）"""
+    with st.container(key=f"print_table_{key}"):
+        st.table(format_rows(table.to_pylist()))
+
+
+def _controls(table: pa.Table, key: str) -> pa.Table:
+    """絞り込み・並べ替え・ページの入力欄を表示し、表示するページを返す"""
+    with st.container(key=f"table_controls_{key}"):
+        col1, col2, col3, col4, col5 = st.columns([3, 2, 1, 1, 1])
+        text = col1.text_input("絞り込み", key=f"{key}_filter", placeholder="含む文字で絞り込み")
+        sort_column = col2.selectbox("並べ替え", [NO_SORT] + table.column_names, key=f"{key}_sort")
+        descending = col3.checkbox("降順", key=f"{key}_descending")
+        page_size = col4.selectbox("件数", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                   key=f"{key}_page_size")
+        table = sort_table(filter_table(table, text), None if sort_column == NO_SORT else sort_column, descending)
+        pages = page_count(table.num_rows, page_size)
+        page_key = f"{key}_page"
+        if st.session_state.get(page_key, 1) > pages:
+            # 絞り込みで行が減ったときは最後のページに戻す
+            st.session_state[page_key] = pages
+        page = col5.number_input("ページ", min_value=1, max_value=pages, step=1, key=page_key)
+        start = (page - 1) * page_size
+        st.caption(f"全 {table.num_rows:,} 件中 {min(start + 1, table.num_rows):,}〜"
+                   f"{min(start + page_size, table.num_rows):,} 件目（{page} / {pages} ページ）")
+    return page_of(table, page, page_size)
+
+
+def data_table(rows: Union[pa.Table, Iterable[Mapping]], key: Optional[str] = None, printable: bool = False):
+    """表を表示する
+
+    rows は行（dict のリスト）または to_arrow で作った表。key を指定し、行が1ページに収まらない場合だけ
+    絞り込み・並べ替え・ページの入力欄を出す。printable のときは表示中の部分を印刷用の表にする。
+    """
+    table = rows if isinstance(rows, pa.Table) else to_arrow(rows)
+    if key is not None and table.num_rows > PAGE_SIZES[0]:
+        table = _controls(table, key)
+    if printable:
+        _print_table(table, key or "table")
+    else:
+        _grid(table)
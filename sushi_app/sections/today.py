@@ -0,0 +1,67 @@
+"""タブ①：今日の製造計画"""
+import streamlit as st
+
+from sushi_app.planning import summary_rows, usage_dict
+from sushi_app.sections.common import (get_storage, live_totals, load_sets, plan_editor, record_production,
+                                       running_plan, set_info_table, timed_handler, timed_section, today_str)
+from sushi_app.sections.tables import data_table
+
+
+@st.fragment
+@timed_section("today")
+def render():
+    storage = get_storage()
+    current_date = today_str()
+    st.header("① 今日の製造計画")
+    st.markdown("#### 各セットの製造数を入力してください。集計は入力に合わせて更新され、「今日の計画を計算」でレポートに保存されます。")
+
+    sets_data = load_sets()
+
+    st.markdown("##### 🔍 セット内容の確認")
+    # カスタマイズ済みのセット情報をテーブル表示
+    data_table(set_info_table(), key="tbl_sets_today")
+
+    st.markdown("---")
+    st.markdown("##### 📝 製造数の入力")
+    # カスタマイズされたセット順の表で入力する
+    today_plan = plan_editor("today", sets_data, "製造数")
+
+    # 入力が変わったセットの分だけを集計に反映する
+    running = running_plan("today")
+    running.update_plan(today_plan)
+    live_totals(running, "合計製造金額", "使用枚数")
+
+    st.markdown("---")
+    if st.button("✅ 今日の計画を計算", key="calc_today", use_container_width=True):
+        with timed_handler("calc_today"):
+            # 集計は入力中に差分で更新済みのものを使う
+            recipe_matrix = running.matrix
+            result = running.result()
+            today_summary = summary_rows(recipe_matrix, result, "製造数", "製造金額")
+            total_production_money = int(result.total)
+            ingredient_usage = usage_dict(recipe_matrix, result.usage)
+
+            if today_summary:
+                st.markdown("### 📊 今日の製造集計")
+                data_table(today_summary)
+                st.markdown(f"### 💰 合計製造金額: ¥{total_production_money:,}")
+
+                st.markdown("### 🔪 使用ネタ集計")
+                usage_data = [{"ネタ": ing, "使用枚数": count} for ing, count in ingredient_usage.items() if count > 0]
+                if usage_data:
+                    data_table(usage_data)
+                else:
+                    st.info("使用するネタはありません。")
+
+                st.session_state["today_report"] = {
+                    "date": current_date,
+                    "summary": today_summary,
+                    "total_money": total_production_money,
+                    "usage": ingredient_usage
+                }
+                storage.save_report("today", current_date, st.session_state["today_report"])
+                # 明日の製造数の予測(タブ②)に使う
+                record_production(today_plan)
+                st.success("印刷用レポート(タブ⑤)に反映されました。")
+            else:
+                st.warning("製造数がすべて0でした。数字を入力してください。")
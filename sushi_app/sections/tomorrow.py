@@ -0,0 +1,154 @@
+"""タブ②：明日の製造計画"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from sushi_app.mix import solve_mix
+from sushi_app.planning import summary_rows, usage_dict
+from sushi_app.sections.common import (forecast_tomorrow, get_catalog, get_recipe_matrix, get_storage, live_totals,
+                                       load_inventory, load_sets, plan_editor, plan_values, running_plan,
+                                       set_info_table, set_plan_values, timed_handler, timed_section, today_str)
+from sushi_app.sections.tables import data_table
+
+MIX_MODES = ["在庫の範囲で売上を最大にする", "追加発注が最も少なくなるようにする"]
+
+
+def mix_planner(sets_data):
+    """在庫から製造数の組み合わせを計算し、製造目標数の入力欄に反映する"""
+    st.markdown("在庫(タブ③)・レシピ・販売価格から製造数を計算します。最小・最大が空欄のセットは制限なしです。")
+    mode = st.radio("計算方法", MIX_MODES, horizontal=True, key="mix_mode")
+    limits = st.data_editor(
+        pd.DataFrame({"セット名": list(sets_data), "最小": [0] * len(sets_data), "最大": [None] * len(sets_data)}),
+        hide_index=True,
+        use_container_width=True,
+        disabled=["セット名"],
+        key="mix_limits",
+        column_config={
+            "最小": st.column_config.NumberColumn(min_value=0, step=1),
+            "最大": st.column_config.NumberColumn(min_value=0, step=1),
+        }
+    )
+    if st.button("🧮 製造数を自動計算", key="calc_mix", use_container_width=True):
+        with timed_handler("calc_mix"):
+            recipe_matrix = get_recipe_matrix()
+            inventory = load_inventory()
+            lower = limits["最小"].fillna(0).to_numpy(dtype=np.float64)
+            upper = limits["最大"].fillna(np.inf).to_numpy(dtype=np.float64)
+            # 追加発注を最小にする場合、不足1枚の罰則をどのセットの販売価格よりも大きくする
+            penalty = None if mode == MIX_MODES[0] else float(recipe_matrix.prices.max(initial=0)) + 1
+            try:
+                result = solve_mix(recipe_matrix, get_catalog().vector(inventory),
+                                   lower, upper, shortage_penalty=penalty)
+            except ValueError as e:
+                st.error(f"製造数を計算できませんでした: {e}")
+                return
+            set_plan_values("tomorrow", {name: int(count) for name, count in zip(result.set_names, result.counts)})
+            st.session_state["mix_result"] = result
+
+    result = st.session_state.get("mix_result")
+    if result is not None:
+        st.markdown(f"#### 💰 計算結果の売上: ¥{result.revenue:,}")
+        if not result.optimal:
+            st.info(f"時間内に最適性を確認できなかったため、見つかった最良の組み合わせを表示しています。"
+                    f"（売上の上限の目安: ¥{int(result.bound):,}）")
+        shortage_items = [{"ネタ": ing, "追加で必要な枚数": int(q)}
+                          for ing, q in zip(result.ingredients, result.shortage) if q > 0]
+        if shortage_items:
+            data_table(shortage_items, key="tbl_mix_shortage")
+        st.success("製造目標数の入力欄に反映しました。内容を確認して「明日の計画を計算」を押してください。")
+
+
+def prefill_forecast(sets_data):
+    """まだ入力していないセットの製造目標数を、製造実績からの予測で埋める（セッションで1回）"""
+    if st.session_state.get("forecast_prefilled"):
+        return
+    st.session_state["forecast_prefilled"] = True
+    with timed_handler("forecast_prefill"):
+        forecast = forecast_tomorrow()
+    saved = plan_values("tomorrow")
+    set_plan_values("tomorrow", {name: count for name, count in forecast.items() if name not in saved})
+
+
+def forecast_panel(sets_data):
+    """製造実績からの予測を表示し、入力欄に反映する"""
+    st.markdown("今日の製造計画(タブ①)で計算した日々の製造数から、曜日とステータスを考慮して予測します。"
+                "まだ入力していないセットには、予測が自動で入力されています。")
+    forecast = forecast_tomorrow()
+    if not forecast:
+        st.info("製造実績がまだありません。タブ①で今日の計画を計算すると、翌日から予測できます。")
+        return
+    data_table([
+        {"セット名": name, "ステータス": data["ステータス"], "予測製造数": forecast.get(name, "－")}
+        for name, data in sets_data.items()
+    ], key="tbl_forecast")
+    if st.button("📈 予測を入力欄に反映", key="apply_forecast", use_container_width=True):
+        set_plan_values("tomorrow", forecast)
+        st.success("製造目標数の入力欄に反映しました。")
+
+
+@st.fragment
+@timed_section("tomorrow")
+def render():
+    storage = get_storage()
+    st.header("② 明日の製造計画")
+    st.markdown("#### 各セットの明日の製造目標数を入力してください。集計は入力に合わせて更新され、「明日の計画を計算」で発注計算(タブ④)に反映されます。")
+
+    sets_data = load_sets()
+
+    st.markdown("##### 🔍 セット内容の確認")
+    data_table(set_info_table(), key="tbl_sets_tomorrow")  # タブ①と同じ表示用の表
+
+    prefill_forecast(sets_data)
+    # 開いているときだけ中身を作る（製造目標数を入力するたびに予測の表・上下限の表を作らない）
+    forecast = st.expander("📈 製造実績から予測", key="forecast_expander", on_change="rerun")
+    if forecast.open:
+        with forecast:
+            forecast_panel(sets_data)
+    mix = st.expander("🧮 在庫から製造数を自動計算", key="mix_expander", on_change="rerun")
+    if mix.open:
+        with mix:
+            mix_planner(sets_data)
+
+    st.markdown("---")
+    st.markdown("##### 📝 製造目標数の入力")
+    # カスタマイズされたセット順の表で入力する
+    tomorrow_plan = plan_editor("tomorrow", sets_data, "製造目標数")
+
+    # 入力・在庫が変わったセット・ネタの分だけを集計と不足枚数に反映する
+    running = running_plan("tomorrow")
+    running.update_plan(tomorrow_plan)
+    running.set_inventory(load_inventory())
+    live_totals(running, "合計目標製造金額", "必要枚数", show_shortage=True)
+
+    st.markdown("---")
+    if st.button("✅ 明日の計画を計算", key="calc_tomorrow", use_container_width=True):
+        with timed_handler("calc_tomorrow"):
+            recipe_matrix = running.matrix
+            result = running.result()
+            tomorrow_summary = summary_rows(recipe_matrix, result, "製造目標数", "目標製造金額")
+            total_target_money = int(result.total)
+            ingredient_required = usage_dict(recipe_matrix, result.usage)
+
+            if tomorrow_summary:
+                st.markdown("### 📊 明日の製造目標")
+                data_table(tomorrow_summary)
+                st.markdown(f"### 💰 合計目標製造金額: ¥{total_target_money:,}")
+
+                st.markdown("### 🔪 明日の必要ネタ数")
+                required_data = [{"ネタ": ing, "必要枚数": c} for ing, c in ingredient_required.items() if c > 0]
+                if required_data:
+                    data_table(required_data)
+                else:
+                    st.info("必要なネタはありません。")
+
+                st.session_state["tomorrow_required"] = ingredient_required
+                st.session_state["tomorrow_summary"] = tomorrow_summary
+                st.session_state["tomorrow_total"] = total_target_money
+                storage.save_report("tomorrow", today_str(), {
+                    "summary": tomorrow_summary,
+                    "total": total_target_money,
+                    "required": ingredient_required
+                })
+                st.success("在庫入力(タブ③)・発注計算(タブ④)で使用されます。")
+            else:
+                st.warning("すべて0でした。数字を入力してください。")
@@ -0,0 +1,79 @@
+"""セット情報の共有カタログ（版ごとに不変）
+
+プロセス内のすべてのセッションは、同じ版のカタログを参照するだけで複製を持たない。
+
+- カタログと各セットの内容は読み取り専用（MappingProxyType）で、変更できない。
+- セットの追加・変更・削除は新しい版を作る。変わったセットだけを新しく作り、
+  ほかのセットの内容は前の版と同じオブジェクトを共有する。
+- 表示用の表・レシピ行列など、セット情報から作るものは版ごとに1度だけ作って保持する。
+"""
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Callable, Dict, Hashable, Iterable, Mapping, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def freeze_set(data: Mapping) -> Mapping:
+    """1セット分の内容を読み取り専用にする"""
+    return MappingProxyType({
+        "レシピ": MappingProxyType(dict(data["レシピ"])),
+        "販売価格": data["販売価格"],
+        "ステータス": data["ステータス"],
+    })
+
+
+@dataclass(frozen=True, eq=False)
+class SetCatalog:
+    """ある版のセット一覧（セット名 -> レシピ・販売価格・ステータス）"""
+    version: int                      # 最後にセットが変更されたときのデータの版
+    sets: Mapping[str, Mapping]       # 読み取り専用。並び順 = 登録順
+    _derived: Dict[Hashable, object] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.sets)
+
+    def __iter__(self):
+        return iter(self.sets)
+
+    def __contains__(self, name) -> bool:
+        return name in self.sets
+
+    def derived(self, key: Hashable, build: Callable[[], T]) -> T:
+        """この版から作るもの（表・行列など）を1度だけ作って共有する"""
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build()
+            return self._derived[key]
+
+    def evolve(self, version: int, upserts: Mapping[str, Mapping], deletes: Iterable[str] = (),
+               order: Optional[Mapping[str, int]] = None) -> "SetCatalog":
+        """変わったセットだけを差し替えた新しい版を作る
+
+        order（セット名 -> 並び順）を渡すと、その順に並べ直す。
+        """
+        sets = dict(self.sets)
+        for name in deletes:
+            sets.pop(name, None)
+        for name, data in upserts.items():
+            sets[name] = freeze_set(data)
+        if order is not None:
+            sets = dict(sorted(sets.items(), key=lambda kv: order[kv[0]]))
+        return SetCatalog(version, MappingProxyType(sets))
+
+    def to_dict(self) -> Dict[str, dict]:
+        """変更できる通常の dict に戻す（別プロセスへ渡す場合など）"""
+        return {
+            name: {"レシピ": dict(data["レシピ"]), "販売価格": data["販売価格"], "ステータス": data["ステータス"]}
+            for name, data in self.sets.items()
+        }
+
+
+def empty_set_catalog() -> SetCatalog:
+    return SetCatalog(0, MappingProxyType({}))
@@ -0,0 +1,661 @@
+"""SQLite によるデータ保存
+
+セット情報・レシピ・在庫スナップショット・日次レポートを
+1つの SQLite ファイル（WAL モード）に保存する。
+
+- 書き込みはトランザクション単位でまとめて行い、
+  トランザクションごとに data_version を1つ進める。
+- 各行には書き込んだ時点の data_version を記録しておき、
+  読み込み側は前回読んだ版より新しい行だけを取得してキャッシュに反映する。
+- セット情報は版ごとに不変の SetCatalog として保持し、変更のたびに新しい版に差し替える
+  （読み込み中のセッションが見ている版は変わらない）。
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sushi_app.defaults import DEFAULT_SETS
+from sushi_app.ordering import SupplierOffer
+from sushi_app.set_catalog import SetCatalog, empty_set_catalog
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "sushi.db"
+READ_POOL_SIZE = 8   # iter_query で使い回す読み取り用接続の数
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sets (
+    name       TEXT PRIMARY KEY,
+    price      INTEGER NOT NULL,
+    status     TEXT NOT NULL,
+    sort_order INTEGER NOT NULL,
+    deleted    INTEGER NOT NULL DEFAULT 0,
+    version    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sets_version ON sets(version);
+CREATE TABLE IF NOT EXISTS recipes (
+    set_name   TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    count      INTEGER NOT NULL,
+    PRIMARY KEY (set_name, ingredient)
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_ingredient ON recipes(ingredient);
+CREATE TABLE IF NOT EXISTS inventory_snapshots (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    taken_at   TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    quantity   INTEGER NOT NULL,
+    version    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_inventory_version ON inventory_snapshots(version);
+CREATE INDEX IF NOT EXISTS idx_inventory_ingredient ON inventory_snapshots(ingredient, id);
+CREATE TABLE IF NOT EXISTS reports (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,
+    report_date TEXT NOT NULL,
+    payload     TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    version     INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_kind_date ON reports(kind, report_date);
+CREATE INDEX IF NOT EXISTS idx_reports_version ON reports(version);
+CREATE TABLE IF NOT EXISTS store_inventory (
+    store      TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    quantity   INTEGER NOT NULL,
+    version    INTEGER NOT NULL,
+    PRIMARY KEY (store, ingredient)
+);
+CREATE INDEX IF NOT EXISTS idx_store_inventory_version ON store_inventory(version);
+CREATE TABLE IF NOT EXISTS store_plans (
+    store      TEXT NOT NULL,
+    plan_date  TEXT NOT NULL,
+    set_name   TEXT NOT NULL,
+    count      INTEGER NOT NULL,
+    version    INTEGER NOT NULL,
+    PRIMARY KEY (store, plan_date, set_name)
+);
+CREATE INDEX IF NOT EXISTS idx_store_plans_date ON store_plans(plan_date, store);
+CREATE INDEX IF NOT EXISTS idx_store_plans_version ON store_plans(version);
+CREATE TABLE IF NOT EXISTS production_history (
+    production_date TEXT NOT NULL,
+    set_name        TEXT NOT NULL,
+    count           INTEGER NOT NULL,
+    status          TEXT NOT NULL,
+    version         INTEGER NOT NULL,
+    PRIMARY KEY (production_date, set_name)
+);
+CREATE INDEX IF NOT EXISTS idx_production_history_version ON production_history(version);
+CREATE TABLE IF NOT EXISTS order_outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    order_date      TEXT NOT NULL,
+    supplier        TEXT NOT NULL,
+    revision        INTEGER NOT NULL DEFAULT 1,
+    payload         TEXT NOT NULL,
+    status          TEXT NOT NULL DEFAULT 'pending',
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT NOT NULL DEFAULT '',
+    response        TEXT NOT NULL DEFAULT '',
+    created_at      TEXT NOT NULL,
+    updated_at      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_order_outbox_status ON order_outbox(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_order_outbox_date ON order_outbox(order_date, supplier);
+CREATE TABLE IF NOT EXISTS ingredients (
+    name       TEXT PRIMARY KEY,
+    lot        INTEGER NOT NULL,
+    unit       TEXT NOT NULL,
+    sort_order INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS supplier_offers (
+    ingredient  TEXT NOT NULL,
+    supplier    TEXT NOT NULL,
+    lot         INTEGER NOT NULL,
+    moq         INTEGER NOT NULL DEFAULT 0,
+    price_tiers TEXT NOT NULL,
+    PRIMARY KEY (ingredient, supplier)
+);
+"""
+
+REPORT_KINDS = ("today", "tomorrow", "order")
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """ある版のデータ一式（Storage.snapshot。後から別の書き込みがあっても変わらない）"""
+    version: int
+    set_catalog: SetCatalog
+    inventory: Dict[str, int]
+    offers: List[SupplierOffer]
+    ingredients: List[Tuple[str, int, str]]
+    ingredients_version: int
+
+
+def connect(path) -> sqlite3.Connection:
+    """WAL モードの接続を作る（Streamlit の複数スレッドから共有する）"""
+    conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+class Storage:
+    """セット・在庫・レポートの読み書き（読み込みはキャッシュ付き）"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get("SUSHI_DB_PATH", DEFAULT_DB_PATH))
+        self._lock = threading.RLock()
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('data_version', 0)")
+        self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('offers_version', 0)")
+        self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('ingredients_version', 0)")
+        # 読み込みキャッシュと、キャッシュに反映済みの版
+        self._loaded_version = 0
+        self._set_catalog = empty_set_catalog()
+        self._set_order: Dict[str, int] = {}
+        self._inventory: Dict[str, int] = {}
+        self._reports: Dict[str, dict] = {}
+        self._offers: List[SupplierOffer] = []
+        self._ingredients: List[Tuple[str, int, str]] = []
+        self.ingredients_version = 0
+        self._readers: "queue.SimpleQueue[sqlite3.Connection]" = queue.SimpleQueue()
+        self._transaction_version: Optional[int] = None
+
+    # ----------------------------------------
+    # 版の管理
+    # ----------------------------------------
+    def data_version(self) -> int:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+        return row[0]
+
+    @contextmanager
+    def transaction(self) -> Iterator[int]:
+        """書き込みをまとめる。ブロック内の書き込みには新しい版番号が付く
+
+        入れ子にすると外側のトランザクションにまとまる（save_report などを1つの版で続けて保存できる）。
+        """
+        with self._lock:
+            if self._transaction_version is not None:
+                yield self._transaction_version
+                return
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+                version = self._transaction_version = self.data_version()
+                yield version
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._transaction_version = None
+            conn.execute("COMMIT")
+
+    def refresh(self) -> int:
+        """前回読んだ版より後に変更された行だけを読み込んでキャッシュを更新する"""
+        with self._lock:
+            current = self.data_version()
+            if current == self._loaded_version:
+                return current
+            since = self._loaded_version
+            self._load_sets_since(since)
+            self._load_inventory_since(since)
+            self._load_reports_since(since)
+            self._load_offers_since(since)
+            self._load_ingredients_since(since)
+            self._loaded_version = current
+            return current
+
+    # ----------------------------------------
+    # 差分読み込み
+    # ----------------------------------------
+    def _load_sets_since(self, since: int) -> None:
+        changed = self._conn.execute(
+            "SELECT name, price, status, sort_order, deleted, version FROM sets WHERE version > ?",
+            (since,),
+        ).fetchall()
+        if not changed:
+            return
+        upserts: Dict[str, dict] = {}
+        deletes = []
+        reorder = False
+        for name, price, status, sort_order, deleted, _ in changed:
+            if deleted:
+                deletes.append(name)
+                self._set_order.pop(name, None)
+            else:
+                upserts[name] = {"レシピ": {}, "販売価格": price, "ステータス": status}
+                reorder = reorder or self._set_order.get(name) != sort_order
+                self._set_order[name] = sort_order
+        live = list(upserts)
+        for start in range(0, len(live), 500):
+            chunk = live[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            for set_name, ingredient, count in self._conn.execute(
+                f"SELECT set_name, ingredient, count FROM recipes WHERE set_name IN ({marks}) ORDER BY rowid",
+                chunk,
+            ):
+                upserts[set_name]["レシピ"][ingredient] = count
+        # 変わったセットだけを差し替えた新しい版にする（登録順を保つ）
+        version = max(row[5] for row in changed)
+        self._set_catalog = self._set_catalog.evolve(
+            version, upserts, deletes, self._set_order if reorder else None
+        )
+
+    def _load_inventory_since(self, since: int) -> None:
+        for ingredient, quantity in self._conn.execute(
+            "SELECT ingredient, quantity FROM inventory_snapshots WHERE version > ? ORDER BY id",
+            (since,),
+        ):
+            self._inventory[ingredient] = quantity
+
+    def _load_reports_since(self, since: int) -> None:
+        for kind, payload in self._conn.execute(
+            "SELECT kind, payload FROM reports WHERE version > ? ORDER BY id",
+            (since,),
+        ):
+            self._reports[kind] = json.loads(payload)
+
+    def _load_offers_since(self, since: int) -> None:
+        # 仕入先条件は一括で置き換えるため、変更があれば全件読み直す
+        offers_version = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'offers_version'"
+        ).fetchone()[0]
+        if offers_version <= since:
+            return
+        self._offers = [
+            SupplierOffer(ingredient, supplier, lot, moq,
+                          tuple(tuple(tier) for tier in json.loads(price_tiers)))
+            for ingredient, supplier, lot, moq, price_tiers in self._conn.execute(
+                "SELECT ingredient, supplier, lot, moq, price_tiers FROM supplier_offers ORDER BY rowid"
+            )
+        ]
+
+    def _load_ingredients_since(self, since: int) -> None:
+        # ネタ一覧も一括で置き換えるため、変更があれば全件読み直す
+        version = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'ingredients_version'"
+        ).fetchone()[0]
+        if version <= since:
+            return
+        self._ingredients = self._conn.execute(
+            "SELECT name, lot, unit FROM ingredients ORDER BY sort_order"
+        ).fetchall()
+        self.ingredients_version = version
+
+    # ----------------------------------------
+    # 読み込み（キャッシュを返す。呼び出し側で変更しないこと）
+    # ----------------------------------------
+    def snapshot(self) -> DataSnapshot:
+        """最新の版に更新し、版とその版のデータを一緒に返す（在庫はコピー）"""
+        with self._lock:
+            version = self.refresh()
+            return DataSnapshot(version, self._set_catalog, dict(self._inventory), self._offers,
+                                self._ingredients, self.ingredients_version)
+
+    def load_set_catalog(self) -> SetCatalog:
+        """最新の版のセットカタログ（全セッションで共有する読み取り専用の版）"""
+        self.refresh()
+        return self._set_catalog
+
+    def load_sets(self) -> Mapping[str, Mapping]:
+        return self.load_set_catalog().sets
+
+    def load_inventory(self) -> Dict[str, int]:
+        self.refresh()
+        return self._inventory
+
+    def load_report(self, kind: str) -> Optional[dict]:
+        self.refresh()
+        return self._reports.get(kind)
+
+    def load_ingredients(self) -> List[Tuple[str, int, str]]:
+        """登録済みのネタ一覧 [(ネタ名, 発注ロット, 単位)]（並び順 = ID 順）"""
+        self.refresh()
+        return self._ingredients
+
+    def load_offers(self) -> List[SupplierOffer]:
+        """登録済みの仕入先条件（未登録なら空）"""
+        self.refresh()
+        return self._offers
+
+    # ----------------------------------------
+    # 書き込み
+    # ----------------------------------------
+    def save_sets(self, sets_data: Mapping[str, dict]) -> int:
+        """複数セットをまとめて登録・更新する"""
+        return self.apply_set_changes(sets_data, ())
+
+    def delete_sets(self, names) -> int:
+        """セットを削除する（差分読み込みのため行は削除済みとして残す）"""
+        return self.apply_set_changes({}, names)
+
+    def apply_set_changes(self, upserts: Mapping[str, dict], deletes: Sequence[str]) -> int:
+        """セットの登録・更新・削除を1つのトランザクションでまとめて反映する"""
+        with self.transaction() as version:
+            if deletes:
+                self._delete_sets(version, deletes)
+            if upserts:
+                self._upsert_sets(version, upserts)
+        return version
+
+    def _upsert_sets(self, version: int, sets_data: Mapping[str, dict]) -> None:
+        conn = self._conn
+        next_order = conn.execute("SELECT COALESCE(MAX(sort_order), -1) + 1 FROM sets").fetchone()[0]
+        existing = dict(conn.execute("SELECT name, sort_order FROM sets"))
+        set_rows = []
+        recipe_rows = []
+        for name, data in sets_data.items():
+            order = existing.get(name)
+            if order is None:
+                order = next_order
+                next_order += 1
+            set_rows.append((name, data["販売価格"], data["ステータス"], order, version))
+            # レシピは 0 枚の要素を保存しない
+            recipe_rows.extend((name, ing, cnt) for ing, cnt in data["レシピ"].items() if cnt)
+        conn.executemany(
+            "INSERT INTO sets(name, price, status, sort_order, deleted, version) VALUES (?, ?, ?, ?, 0, ?) "
+            "ON CONFLICT(name) DO UPDATE SET price = excluded.price, status = excluded.status, "
+            "deleted = 0, version = excluded.version",
+            set_rows,
+        )
+        conn.executemany("DELETE FROM recipes WHERE set_name = ?", [(name,) for name in sets_data])
+        conn.executemany(
+            "INSERT INTO recipes(set_name, ingredient, count) VALUES (?, ?, ?)",
+            recipe_rows,
+        )
+
+    def _delete_sets(self, version: int, names: Sequence[str]) -> None:
+        self._conn.executemany(
+            "UPDATE sets SET deleted = 1, version = ? WHERE name = ?",
+            [(version, name) for name in names],
+        )
+        self._conn.executemany("DELETE FROM recipes WHERE set_name = ?", [(name,) for name in names])
+
+    def save_inventory(self, inventory: Mapping[str, int]) -> int:
+        """在庫のスナップショットを保存する"""
+        taken_at = datetime.now().isoformat(timespec="seconds")
+        with self.transaction() as version:
+            self._conn.executemany(
+                "INSERT INTO inventory_snapshots(taken_at, ingredient, quantity, version) VALUES (?, ?, ?, ?)",
+                [(taken_at, ing, int(qty), version) for ing, qty in inventory.items()],
+            )
+        return version
+
+    def save_report(self, kind: str, report_date: str, payload: dict) -> int:
+        """日次レポート（today / tomorrow / order）を保存する"""
+        if kind not in REPORT_KINDS:
+            raise ValueError(f"未知のレポート種別です: {kind}")
+        created_at = datetime.now().isoformat(timespec="seconds")
+        with self.transaction() as version:
+            self._conn.execute(
+                "INSERT INTO reports(kind, report_date, payload, created_at, version) VALUES (?, ?, ?, ?, ?)",
+                (kind, report_date, json.dumps(payload, ensure_ascii=False), created_at, version),
+            )
+        return version
+
+    def save_ingredients(self, rows: Sequence[Tuple[str, int, str]]) -> int:
+        """ネタ一覧 [(ネタ名, 発注ロット, 単位)] をまとめて置き換える"""
+        with self.transaction() as version:
+            self._conn.execute("DELETE FROM ingredients")
+            self._conn.executemany(
+                "INSERT INTO ingredients(name, lot, unit, sort_order) VALUES (?, ?, ?, ?)",
+                [(name, int(lot), unit, i) for i, (name, lot, unit) in enumerate(rows)],
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'ingredients_version'", (version,))
+        return version
+
+    def save_offers(self, offers: Sequence[SupplierOffer]) -> int:
+        """仕入先条件をまとめて置き換える"""
+        with self.transaction() as version:
+            self._conn.execute("DELETE FROM supplier_offers")
+            self._conn.executemany(
+                "INSERT INTO supplier_offers(ingredient, supplier, lot, moq, price_tiers) VALUES (?, ?, ?, ?, ?)",
+                [(o.ingredient, o.supplier, o.lot, o.moq, json.dumps(o.price_tiers)) for o in offers],
+            )
+            self._conn.execute("UPDATE meta SET value = ? WHERE key = 'offers_version'", (version,))
+        return version
+
+    # ----------------------------------------
+    # 店舗別データ（件数が多いため読み込みキャッシュには載せない）
+    # ----------------------------------------
+    def upsert_store_inventory(self, rows: Iterable[Tuple[str, str, int]]) -> int:
+        """店舗別在庫 [(店舗, ネタ, 在庫枚数)] をまとめて登録・更新する"""
+        with self.transaction() as version:
+            self._conn.executemany(
+                "INSERT INTO store_inventory(store, ingredient, quantity, version) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(store, ingredient) DO UPDATE SET quantity = excluded.quantity, "
+                "version = excluded.version",
+                ((store, ing, int(qty), version) for store, ing, qty in rows),
+            )
+        return version
+
+    def upsert_store_plans(self, rows: Iterable[Tuple[str, str, str, int]]) -> int:
+        """店舗別の製造計画 [(店舗, 日付, セット名, 製造数)] をまとめて登録・更新する"""
+        with self.transaction() as version:
+            self._conn.executemany(
+                "INSERT INTO store_plans(store, plan_date, set_name, count, version) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(store, plan_date, set_name) DO UPDATE SET count = excluded.count, "
+                "version = excluded.version",
+                ((store, day, name, int(count), version) for store, day, name, count in rows),
+            )
+        return version
+
+    # ----------------------------------------
+    # 製造実績（需要予測用）
+    # ----------------------------------------
+    def save_production(self, production_date: str, counts: Mapping[str, int],
+                        statuses: Mapping[str, str]) -> int:
+        """1日分の製造実績（日付は YYYY-MM-DD）を保存する。同じ日の実績は丸ごと置き換える"""
+        with self.transaction() as version:
+            self._conn.execute("DELETE FROM production_history WHERE production_date = ?", (production_date,))
+            self._conn.executemany(
+                "INSERT INTO production_history(production_date, set_name, count, status, version) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(production_date, name, int(count), statuses.get(name, "通常"), version)
+                 for name, count in counts.items()],
+            )
+        return version
+
+    def iter_production_history(self, since: int = 0) -> Iterator[Tuple[str, str, int, str, int]]:
+        """版が since より新しい製造実績 [(日付, セット名, 製造数, ステータス, 版)] を日付順に読む
+
+        保存し直した日は全セットの行が新しい版になるため、差分は常に日単位でそろう。
+        """
+        return self.iter_query(
+            "SELECT production_date, set_name, count, status, version FROM production_history "
+            "WHERE version > ? ORDER BY production_date",
+            (since,),
+        )
+
+    # ----------------------------------------
+    # 発注の送信待ち（アウトボックス）
+    # ----------------------------------------
+    def enqueue_outbox(self, order_date: str, orders: Mapping[str, dict],
+                       make_key: Callable[[str, str, int], str]) -> int:
+        """発注日の発注 {仕入先: 内容} を登録し、登録・置き換え・未送信に戻した件数を返す
+
+        仕入先ごとに有効な行（取り消し以外）は1件だけで、冪等キーは make_key(発注日, 仕入先, 版) で作る。
+        - 送信済みの仕入先は何もしない（同じ発注を2回送らない）。
+        - 内容が同じなら未送信に戻すだけ（同じ冪等キーで送り直す）。
+        - 内容が変わったら元の行を取り消し（cancelled）、版を1つ上げた新しい冪等キーで登録する。
+          元のキーで送り直すと、仕入先が受け付け済みのとき古い内容の応答が返ってしまうため。
+        - 新しい発注にない仕入先の未送信・失敗の行は取り消す。
+        送信を試みた行を取り消したときは、仕入先に届いている可能性があることを last_error に残す。
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        count = 0
+        with self.transaction():
+            rows = self._conn.execute(
+                "SELECT idempotency_key, supplier, revision, payload, status, attempts, last_error "
+                "FROM order_outbox WHERE order_date = ? ORDER BY revision",
+                (order_date,),
+            ).fetchall()
+            revisions: Dict[str, int] = {}
+            active: Dict[str, tuple] = {}
+            for row in rows:
+                revisions[row[1]] = max(revisions.get(row[1], 0), row[2])
+                if row[4] != "cancelled":
+                    active[row[1]] = row
+            for supplier, (key, _, _, _, status, attempts, error) in active.items():
+                if supplier not in orders and status != "sent":
+                    self._cancel_outbox(key, attempts, error, now)
+            for supplier, payload in orders.items():
+                content = json.dumps(payload, ensure_ascii=False)
+                row = active.get(supplier)
+                if row is not None:
+                    key, _, _, current, status, attempts, error = row
+                    if status == "sent":
+                        continue
+                    if current == content:
+                        self._conn.execute(
+                            "UPDATE order_outbox SET status = 'pending', attempts = 0, updated_at = ? "
+                            "WHERE idempotency_key = ?",
+                            (now, key),
+                        )
+                        count += 1
+                        continue
+                    self._cancel_outbox(key, attempts, error, now)
+                revision = revisions.get(supplier, 0) + 1
+                self._conn.execute(
+                    "INSERT INTO order_outbox(idempotency_key, order_date, supplier, revision, payload, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (make_key(order_date, supplier, revision), order_date, supplier, revision, content, now, now),
+                )
+                count += 1
+        return count
+
+    def _cancel_outbox(self, key: str, attempts: int, error: str, now: str) -> None:
+        # 送信を試みた（試行回数か誤りが残っている）行は、仕入先が受け付けている可能性がある
+        if attempts or error:
+            error = f"送信を試みた後に取り消しました（仕入先に届いていないか確認してください）: {error}"
+        self._conn.execute(
+            "UPDATE order_outbox SET status = 'cancelled', last_error = ?, updated_at = ? WHERE idempotency_key = ?",
+            (error, now, key),
+        )
+
+    def pending_outbox(self, limit: int = 1000) -> List[Tuple[str, str, dict, int]]:
+        """未送信の発注 [(冪等キー, 仕入先, 内容, 試行回数)] を古い順に返す"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, supplier, payload, attempts FROM order_outbox "
+                "WHERE status = 'pending' ORDER BY created_at LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(key, supplier, json.loads(payload), attempts) for key, supplier, payload, attempts in rows]
+
+    def update_outbox(self, key: str, status: str, attempts: int, error: str = "", response: str = "") -> None:
+        """送信結果を記録する（status は pending / sent / failed、取り消しは enqueue_outbox で行う）"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE order_outbox SET status = ?, attempts = ?, last_error = ?, response = ?, updated_at = ? "
+                "WHERE idempotency_key = ?",
+                (status, attempts, error, response, datetime.now().isoformat(timespec="seconds"), key),
+            )
+
+    def retry_outbox(self, order_date: str) -> int:
+        """送信に失敗した発注を未送信に戻す（同じ冪等キーで送り直すので二重発注にはならない）"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE order_outbox SET status = 'pending', attempts = 0, updated_at = ? "
+                "WHERE order_date = ? AND status = 'failed'",
+                (datetime.now().isoformat(timespec="seconds"), order_date),
+            )
+        return cursor.rowcount
+
+    def iter_outbox(self, order_date: Optional[str] = None) -> Iterator[tuple]:
+        """発注の送信状況 [(発注日, 仕入先, 状態, 試行回数, 最後の誤り, 冪等キー)]"""
+        sql = "SELECT order_date, supplier, status, attempts, last_error, idempotency_key FROM order_outbox"
+        if order_date is None:
+            return self.iter_query(sql + " ORDER BY created_at, revision")
+        return self.iter_query(sql + " WHERE order_date = ? ORDER BY created_at, revision", (order_date,))
+
+    def iter_query(self, sql: str, params: Sequence = (), batch_size: int = 1000) -> Iterator[tuple]:
+        """大きな結果を少しずつ読む（読み取り専用の別接続を使い、書き込みを妨げない）
+
+        読み取り用の接続は READ_POOL_SIZE 本まで使い回す。
+        """
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = connect(self.path)
+        cursor = None
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if self._readers.qsize() < READ_POOL_SIZE:
+                self._readers.put(conn)
+            else:
+                conn.close()
+
+    def iter_store_inventory(self, store: Optional[str] = None) -> Iterator[Tuple[str, str, int]]:
+        if store is None:
+            return self.iter_query("SELECT store, ingredient, quantity FROM store_inventory ORDER BY store")
+        return self.iter_query(
+            "SELECT store, ingredient, quantity FROM store_inventory WHERE store = ?", (store,)
+        )
+
+    def iter_store_plans(self, plan_date: Optional[str] = None) -> Iterator[Tuple[str, str, str, int]]:
+        if plan_date is None:
+            return self.iter_query(
+                "SELECT store, plan_date, set_name, count FROM store_plans ORDER BY plan_date, store"
+            )
+        return self.iter_query(
+            "SELECT store, plan_date, set_name, count FROM store_plans WHERE plan_date = ? ORDER BY store",
+            (plan_date,),
+        )
+
+    def iter_reports(self, kind: Optional[str] = None) -> Iterator[Tuple[str, str, str, dict]]:
+        """保存済みレポート [(種別, 日付, 作成日時, 内容)] を古い順に読む"""
+        sql = "SELECT kind, report_date, created_at, payload FROM reports"
+        params: Sequence = ()
+        if kind is not None:
+            sql += " WHERE kind = ?"
+            params = (kind,)
+        for kind_, report_date, created_at, payload in self.iter_query(sql + " ORDER BY id", params):
+            yield kind_, report_date, created_at, json.loads(payload)
+
+    def latest_reports(self, kind: str, start: str, end: str) -> List[Tuple[str, dict]]:
+        """start〜end（レポートの日付表記）の各日の最新のレポート [(日付, 内容)] を日付順に返す"""
+        rows = self.iter_query(
+            "SELECT report_date, payload FROM reports WHERE id IN ("
+            "SELECT MAX(id) FROM reports WHERE kind = ? AND report_date BETWEEN ? AND ? GROUP BY report_date"
+            ") ORDER BY report_date",
+            (kind, start, end),
+        )
+        return [(report_date, json.loads(payload)) for report_date, payload in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+def open_storage(path=None) -> Storage:
+    """Storage を開き、セットが1つもなければ初期のセット（DEFAULT_SETS）を登録する
+
+    画面・API・コマンドラインのどこから始めても同じ初期データになる。
+    """
+    storage = Storage(path)
+    if not storage.load_sets():
+        storage.save_sets(DEFAULT_SETS)
+    return storage
@@ -0,0 +1,16 @@
+"""テスト共通の準備（一時ディレクトリのデータベース）"""
+import pytest
+
+from sushi_app.catalog import load_catalog
+from sushi_app.defaults import DEFAULT_SETS
+from sushi_app.storage import Storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """初期のセットとネタ一覧を登録した一時データベース"""
+    storage = Storage(tmp_path / "sushi.db")
+    storage.save_sets(DEFAULT_SETS)
+    load_catalog(storage)
+    yield storage
+    storage.close()
@@ -0,0 +1,136 @@
+"""JSON API のハンドラ（aiohttp のテストクライアントで呼ぶ）"""
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from sushi_app import metrics
+from sushi_app.api import create_app
+
+
+def call(storage, requests):
+    """API を起動し、requests(client) を実行する"""
+    async def main():
+        client = TestClient(TestServer(create_app(storage, workers=2)))
+        await client.start_server()
+        try:
+            return await requests(client)
+        finally:
+            await client.close()
+
+    return asyncio.run(main())
+
+
+async def fetch(response):
+    return response.status, await response.json()
+
+
+async def fetch_put(client, name, body):
+    return await fetch(await client.put(f"/api/sets/{name}", json=body))
+
+
+@pytest.mark.parametrize("body", [
+    {"レシピ": {"マグロ": 1}},
+    {"販売価格": "abc"},
+    {"販売価格": True},
+    {"販売価格": -1},
+    {"販売価格": 100, "ステータス": "?"},
+    {"販売価格": 100, "レシピ": {"マグロ": 1.5}},
+    {"販売価格": 100, "レシピ": {"マグロ": {"x": 1}}},
+    {"販売価格": 100, "レシピ": {"なし": 1}},
+    {"販売価格": 100, "レシピ": [1]},
+])
+def test_put_set_rejects_invalid_body(storage, body):
+    status, data = call(storage, lambda client: fetch_put(client, "テスト", body))
+    assert status == 400 and "error" in data
+    assert "テスト" not in storage.load_sets()
+
+
+@pytest.mark.parametrize("body", [b"{broken", b"\xff\xfe{}", b"[1, 2]"])
+def test_unreadable_body_is_json_400(storage, body):
+    async def requests(client):
+        response = await client.post("/api/plans/today", data=body, headers={"Content-Type": "application/json"})
+        return response.status, response.content_type, await response.json()
+
+    status, content_type, data = call(storage, requests)
+    assert status == 400 and content_type == "application/json" and "error" in data
+
+
+def test_put_set_strips_name(storage):
+    async def requests(client):
+        created = await fetch_put(client, "%20テスト%20", {"販売価格": 500, "レシピ": {"マグロ": 2, "イカ": 0}})
+        updated = await fetch_put(client, "テスト", {"販売価格": 600})
+        empty = await fetch_put(client, "%20", {"販売価格": 600})
+        return created, updated, empty
+
+    created, updated, empty = call(storage, requests)
+    assert created[0] == 201 and created[1]["name"] == "テスト"
+    assert updated[0] == 200 and not updated[1]["created"]
+    assert empty[0] == 400
+    assert storage.load_sets()["テスト"]["販売価格"] == 600
+
+
+def test_get_and_delete_set(storage):
+    async def requests(client):
+        found = await fetch(await client.get("/api/sets/極上セット"))
+        deleted = await fetch(await client.delete("/api/sets/極上セット"))
+        missing = await fetch(await client.get("/api/sets/極上セット"))
+        return found, deleted, missing
+
+    found, deleted, missing = call(storage, requests)
+    assert found[0] == 200 and found[1]["販売価格"] == 1480
+    assert deleted[0] == 200
+    assert missing[0] == 404
+
+
+def test_plan_response_is_cached_until_sets_change(storage):
+    def hits():
+        prefix = 'sushi_api_cache_hits_total{route="plans/today"} '
+        lines = [line for line in metrics.REGISTRY.render_prometheus().splitlines() if line.startswith(prefix)]
+        return float(lines[0][len(prefix):]) if lines else 0
+
+    async def requests(client):
+        body = {"plan": {"極上セット": 2}}
+        before = hits()
+        first = await fetch(await client.post("/api/plans/today", json=body))
+        second = await fetch(await client.post("/api/plans/today", json=body))
+        cached = hits() - before
+        await fetch_put(client, "極上セット", {"販売価格": 1000, "レシピ": {"マグロ": 3}})
+        third = await fetch(await client.post("/api/plans/today", json=body))
+        return first, second, cached, third
+
+    first, second, cached, third = call(storage, requests)
+    assert first == second and cached == 1
+    assert first[1]["total_money"] == 2960
+    assert third[1]["total_money"] == 2000
+
+
+def test_today_plan_is_saved_in_one_version(storage):
+    async def requests(client):
+        before = storage.data_version()
+        saved = await fetch(await client.post("/api/plans/today", json={"plan": {"極上セット": 2}, "save": True}))
+        after = storage.data_version()
+        invalid = await fetch(await client.post("/api/plans/today", json={"plan": {"なし": 2}, "save": True}))
+        return saved, after - before, invalid, storage.data_version() - after
+
+    saved, versions, invalid, invalid_versions = call(storage, requests)
+    assert saved[0] == 200 and versions == 1
+    assert storage.load_report("today")["total_money"] == 2960
+    # 誤りのある計画は何も保存しない
+    assert invalid[0] == 400 and invalid_versions == 0
+
+
+def test_orders_use_saved_inventory(storage):
+    async def requests(client):
+        await fetch(await client.put("/api/inventory", json={"マグロ": 6}))
+        inventory = await fetch(await client.get("/api/inventory"))
+        orders = await fetch(await client.post("/api/orders", json={"plan": {"極上セット": 2}}))
+        invalid = await fetch(await client.put("/api/inventory", json={"マグロ": -1}))
+        return inventory, orders, invalid
+
+    inventory, orders, invalid = call(storage, requests)
+    assert inventory[1]["マグロ"] == 6
+    lines = {line["ingredient"]: line["quantity"] for line in orders[1]["lines"]}
+    assert "マグロ" not in lines   # 必要な6枚は在庫でまかなえる
+    assert lines["サーモン"] == 30   # 4枚の不足を発注ロット30で切り上げる
+    assert invalid[0] == 400
@@ -0,0 +1,65 @@
+"""多店舗の一括計算（店舗ごとのまとめ・計算・コマンドライン）"""
+import csv
+
+import pytest
+
+from sushi_app import batch
+from sushi_app.batch import StoreInput, collect_stores, plan_stores, run_batch
+from sushi_app.catalog import load_catalog
+from sushi_app.dataio import ImportResult
+from sushi_app.ordering import solve_orders
+from sushi_app.planning import compile_sets, compute_plan, usage_dict
+
+
+def test_collect_stores_matches_normalized_dates():
+    result = ImportResult()
+    rows = [
+        ("本店", "2024-01-05", "極上セット", 3),
+        ("本店", "2024年01月06日", "極上セット", 4),
+        ("支店", "20240105", "季節の彩りセット", 2),
+        ("支店", "2024-01-07", "極上セット", 9),
+        ("支店", "昨日", "極上セット", 1),
+    ]
+    stores = collect_stores(rows, [("支店", "マグロ", 5)], "2024/1/5", "2024-01-06", result)
+    assert stores == [
+        StoreInput("本店", {"極上セット": 3}, {"極上セット": 4}),
+        StoreInput("支店", {"季節の彩りセット": 2}, {}, {"マグロ": 5}),
+    ]
+    # 使った計画の行だけを数え、読めない日付は誤りにする
+    assert result.applied == 3 and result.error_count == 1
+
+
+def test_batch_matches_single_store_calculation(storage):
+    sets_data = storage.load_set_catalog().to_dict()
+    catalog = load_catalog(storage)
+    stores = [StoreInput(f"店舗{k}", {"極上セット": k}, {"極上セット": k, "季節の彩りセット": 2 * k},
+                         {"マグロ": 3 * k}) for k in range(5)]
+    results = list(run_batch(stores, sets_data, catalog, [], workers=1, stores_per_task=2))
+    matrix = compile_sets(sets_data, catalog)
+    for store, result in zip(stores, results):
+        required = usage_dict(matrix, compute_plan(matrix, store.tomorrow).usage)
+        assert result.store == store.store
+        assert result.required == required
+        assert result.total_cost == pytest.approx(solve_orders(catalog, required, store.inventory, []).total_cost)
+    assert plan_stores([]) == []
+
+
+def test_cli_on_fresh_database(tmp_path):
+    plans = tmp_path / "plans.csv"
+    plans.write_text("店舗,日付,セット名,製造数\n本店,2024-01-06,極上セット,3\n", encoding="utf-8-sig")
+    orders, summary = tmp_path / "orders.csv", tmp_path / "summary.csv"
+    code = batch.main(["--db", str(tmp_path / "fresh.db"), "--plans", str(plans), "--today", "2024-01-05",
+                       "--tomorrow", "2024-01-06", "--workers", "1", "--orders", str(orders),
+                       "--summary", str(summary)])
+    assert code == 0
+    with open(summary, encoding="utf-8-sig") as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["店舗"], row["明日の製造金額"]) for row in rows] == [("本店", str(1480 * 3))]
+    with open(orders, encoding="utf-8-sig") as f:
+        assert {row["日付"] for row in csv.DictReader(f)} == {"2024年01月06日"}
+
+
+def test_cli_rejects_unreadable_date(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        batch.main(["--plans", "plans.csv", "--orders", "orders.csv", "--today", "きょう"])
+    assert "きょう" in capsys.readouterr().err
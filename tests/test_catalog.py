@@ -0,0 +1,44 @@
+"""ネタカタログの読み込みと整数 ID"""
+import pytest
+
+from sushi_app.catalog import DEFAULT_CATALOG_PATH, catalog_from_rows, load_catalog, read_catalog_csv
+from sushi_app.planning import compile_sets
+
+
+def test_ids_follow_row_order():
+    catalog = catalog_from_rows([("マグロ", 20, "枚"), ("イカ", 0, "")])
+    assert catalog.index == {"マグロ": 0, "イカ": 1}
+    # 発注ロットは1以上、単位の既定は「枚」
+    assert catalog.rows() == [("マグロ", 20, "枚"), ("イカ", 1, "枚")]
+    assert catalog.vector({"イカ": 3, "なし": 5}).tolist() == [0, 3]
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError):
+        catalog_from_rows([("マグロ", 20, "枚"), ("マグロ", 10, "枚")])
+
+
+def test_read_csv_with_bom(tmp_path):
+    path = tmp_path / "ingredients.csv"
+    path.write_text("ネタ,発注ロット,単位\nマグロ,20,枚\n,5,枚\nウニ,,パック\n", encoding="utf-8-sig")
+    assert read_catalog_csv(path).rows() == [("マグロ", 20, "枚"), ("ウニ", 1, "パック")]
+
+
+def test_load_catalog_seeds_empty_database(tmp_path):
+    from sushi_app.storage import Storage
+
+    storage = Storage(tmp_path / "sushi.db")
+    try:
+        catalog = load_catalog(storage)
+        assert catalog.rows() == read_catalog_csv(DEFAULT_CATALOG_PATH).rows()
+        assert storage.load_ingredients() == catalog.rows()
+    finally:
+        storage.close()
+
+
+def test_recipes_use_catalog_ids():
+    catalog = catalog_from_rows([("マグロ", 20, "枚"), ("サーモン", 30, "枚"), ("イカ", 20, "枚")])
+    matrix = compile_sets({"テスト": {"レシピ": {"イカ": 2, "マグロ": 1}, "販売価格": 100, "ステータス": "通常"}},
+                          catalog)
+    assert matrix.indices.tolist() == [0, 2]
+    assert matrix.data.tolist() == [1, 2]
@@ -0,0 +1,73 @@
+"""在庫・計画の取り込み（行ごとの誤り）と書き出し"""
+import json
+
+from sushi_app import dataio
+from sushi_app.dataio import (MAX_ERRORS, ImportResult, export_store_plans, import_inventory, import_plans,
+                              normalize_date)
+from sushi_app.storage import Storage
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8-sig" if path.suffix == ".csv" else "utf-8")
+    return path
+
+
+def test_inventory_rows_and_errors(storage, tmp_path):
+    path = write(tmp_path / "inventory.csv", "店舗,ネタ,在庫枚数\n"
+                 ",マグロ,12\n本店,マグロ,5\n本店,ウニ,3\n本店,イカ,-1\n本店,イカ,inf\n本店,イカ,1.5\n")
+    result = import_inventory(storage, path, chunksize=2)
+    assert result.applied == 2
+    assert [error.split(":")[0] for error in result.errors] == ["4 行目", "5 行目", "6 行目", "7 行目"]
+    assert storage.load_inventory()["マグロ"] == 12
+    assert list(storage.iter_store_inventory()) == [("本店", "マグロ", 5)]
+
+
+def test_nested_jsonl_plans(storage, tmp_path):
+    lines = [
+        {"店舗": "本店", "日付": "2024-01-05", "計画": {"極上セット": 3, "季節の彩りセット": 2}},
+        {"店舗": "本店", "日付": "2024/1/6", "セット名": "極上セット", "製造数": "4"},
+        {"店舗": "本店", "日付": "昨日", "セット名": "極上セット", "製造数": 1},
+        {"店舗": "本店", "日付": "2024-01-05", "セット名": "なし", "製造数": 1},
+        {"日付": "2024-01-05", "セット名": "極上セット", "製造数": 1},
+    ]
+    path = write(tmp_path / "plans.jsonl", "\n".join(json.dumps(line, ensure_ascii=False) for line in lines)
+                 + "\n{broken\n")
+    result = import_plans(storage, path)
+    assert result.applied == 3 and result.error_count == 4
+    assert sorted(storage.iter_store_plans()) == [
+        ("本店", "2024年01月05日", "季節の彩りセット", 2),
+        ("本店", "2024年01月05日", "極上セット", 3),
+        ("本店", "2024年01月06日", "極上セット", 4),
+    ]
+
+
+def test_export_round_trip(storage, tmp_path):
+    storage.upsert_store_plans([("本店", "2024年01月05日", "極上セット", 3)])
+    out = tmp_path / "plans.csv"
+    assert export_store_plans(storage, out) == 1
+    storage.upsert_store_plans([("本店", "2024年01月05日", "極上セット", 0)])
+    assert import_plans(storage, out).applied == 1
+    assert list(storage.iter_store_plans("2024年01月05日")) == [("本店", "2024年01月05日", "極上セット", 3)]
+
+
+def test_error_list_is_capped():
+    result = ImportResult()
+    for k in range(MAX_ERRORS + 5):
+        result.add_error(str(k))
+    assert result.error_count == MAX_ERRORS + 5 and len(result.errors) == MAX_ERRORS
+
+
+def test_normalize_date():
+    assert normalize_date(" 20240105 ") == normalize_date("2024/1/5") == "2024年01月05日"
+
+
+def test_cli_seeds_sets_on_fresh_database(tmp_path, capsys):
+    db = tmp_path / "fresh.db"
+    path = write(tmp_path / "plans.csv", "店舗,日付,セット名,製造数\n本店,2024-01-05,極上セット,3\n")
+    assert dataio.main(["--db", str(db), "import-plans", str(path)]) == 0
+    assert "エラー: 0 件" in capsys.readouterr().out
+    storage = Storage(db)
+    try:
+        assert list(storage.iter_store_plans()) == [("本店", "2024年01月05日", "極上セット", 3)]
+    finally:
+        storage.close()
@@ -0,0 +1,138 @@
+"""発注の送信（アウトボックス・冪等キー）を動作確認用の仕入先サーバーで確かめる"""
+import asyncio
+
+from aiohttp.test_utils import TestServer
+
+from sushi_app import mock_supplier
+from sushi_app.dispatch import dispatch_pending, enqueue_order, idempotency_key
+
+ORDER_DATE = "2024年01月05日"
+
+
+def order_lines(lots, suppliers=("A", "B")):
+    return [{"ingredient": "マグロ", "supplier": supplier, "lots": lots, "quantity": lots * 10, "unit_price": 100.0}
+            for supplier in suppliers]
+
+
+def run_with_supplier(steps, fail_rate=0.0, lost_rate=0.0):
+    """仕入先サーバーを起動し、steps(state, url_template) を実行する"""
+    async def main():
+        app = mock_supplier.create_app(fail_rate, lost_rate)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            url_template = str(server.make_url("/")) + "suppliers/{supplier}/orders"
+            return await steps(app[mock_supplier.STATE], url_template)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def outbox_status(storage):
+    """仕入先ごとの状態（古い版から順に）"""
+    statuses = {}
+    for _, supplier, status, _, _, _ in storage.iter_outbox(ORDER_DATE):
+        statuses.setdefault(supplier, []).append(status)
+    return statuses
+
+
+def test_key_depends_on_date_supplier_and_revision():
+    assert idempotency_key(ORDER_DATE, "A") == idempotency_key(ORDER_DATE, "A", 1)
+    assert idempotency_key(ORDER_DATE, "A") != idempotency_key(ORDER_DATE, "B")
+    assert idempotency_key(ORDER_DATE, "A") != idempotency_key("2024年01月06日", "A")
+    assert idempotency_key(ORDER_DATE, "A", 1) != idempotency_key(ORDER_DATE, "A", 2)
+
+
+def test_same_order_keeps_its_key(storage):
+    enqueue_order(storage, ORDER_DATE, order_lines(1))
+    keys = [row[5] for row in storage.iter_outbox(ORDER_DATE)]
+    assert enqueue_order(storage, ORDER_DATE, order_lines(1)) == 2
+    assert [row[5] for row in storage.iter_outbox(ORDER_DATE)] == keys
+    assert outbox_status(storage) == {"A": ["pending"], "B": ["pending"]}
+
+
+def test_sent_order_is_not_sent_again(storage):
+    async def steps(state, url):
+        assert enqueue_order(storage, ORDER_DATE, order_lines(1)) == 2
+        first = await dispatch_pending(storage, url, base_delay=0.01)
+        # 計算し直しても、送信済みの仕入先には送らない
+        assert enqueue_order(storage, ORDER_DATE, order_lines(3)) == 0
+        second = await dispatch_pending(storage, url, base_delay=0.01)
+        return state, first, second
+
+    state, first, second = run_with_supplier(steps)
+    assert (first.sent, first.failed) == (2, 0)
+    assert (second.sent, second.failed) == (0, 0)
+    assert {supplier: len(orders) for supplier, orders in state.orders.items()} == {"A": 1, "B": 1}
+    assert outbox_status(storage) == {"A": ["sent"], "B": ["sent"]}
+
+
+def test_failed_order_is_replaced_by_recomputed_one(storage):
+    async def steps(state, url):
+        enqueue_order(storage, ORDER_DATE, order_lines(1))
+        failed = await dispatch_pending(storage, url, max_attempts=2, base_delay=0.01)
+        statuses = outbox_status(storage)
+        # 失敗した発注は取り消され、計算し直した明細が新しい版で登録される
+        assert enqueue_order(storage, ORDER_DATE, order_lines(3)) == 2
+        state.fail_rate = 0.0
+        sent = await dispatch_pending(storage, url, base_delay=0.01)
+        return state, failed, statuses, sent
+
+    state, failed, statuses, sent = run_with_supplier(steps, fail_rate=1.0)
+    assert failed.failed == 2 and statuses == {"A": ["failed"], "B": ["failed"]}
+    assert sent.sent == 2
+    assert [order["lines"][0]["quantity"] for order in state.orders["A"]] == [30]
+    assert outbox_status(storage) == {"A": ["cancelled", "sent"], "B": ["cancelled", "sent"]}
+
+
+def test_recomputed_order_after_lost_response_is_sent_with_new_key(storage):
+    async def steps(state, url):
+        enqueue_order(storage, ORDER_DATE, order_lines(1, ["A"]))
+        # 仕入先は受け付けたが応答が届かず、試行回数を使い切って失敗になる
+        failed = await dispatch_pending(storage, url, max_attempts=1, base_delay=0.01)
+        state.lost_rate = 0.0
+        enqueue_order(storage, ORDER_DATE, order_lines(3, ["A"]))
+        sent = await dispatch_pending(storage, url, base_delay=0.01)
+        return state, failed, sent
+
+    state, failed, sent = run_with_supplier(steps, lost_rate=1.0)
+    assert failed.failed == 1 and sent.sent == 1
+    # 古いキーの応答を新しい明細の送信結果として記録せず、新しい明細が仕入先に届く
+    assert state.stats["duplicates"] == 0
+    assert [order["lines"][0]["quantity"] for order in state.orders["A"]] == [10, 30]
+    rows = list(storage.iter_outbox(ORDER_DATE))
+    assert [row[2] for row in rows] == ["cancelled", "sent"]
+    # 届いている可能性がある取り消しは、確認できるように誤りとして残す
+    assert "取り消しました" in rows[0][4]
+    assert rows[1][5] == idempotency_key(ORDER_DATE, "A", 2)
+
+
+def test_supplier_missing_from_new_order_is_cancelled(storage):
+    async def steps(state, url):
+        enqueue_order(storage, ORDER_DATE, order_lines(1, ["A", "B", "C"]))
+        # C が明細からなくなった
+        enqueue_order(storage, ORDER_DATE, order_lines(1, ["A", "B"]))
+        result = await dispatch_pending(storage, url, base_delay=0.01)
+        return state, result
+
+    state, result = run_with_supplier(steps)
+    assert result.sent == 2
+    assert sorted(state.orders) == ["A", "B"]
+    assert outbox_status(storage) == {"A": ["sent"], "B": ["sent"], "C": ["cancelled"]}
+    # 取り消した行は失敗として送り直されない
+    assert storage.retry_outbox(ORDER_DATE) == 0
+
+
+def test_lost_response_is_not_recorded_twice(storage):
+    async def steps(state, url):
+        enqueue_order(storage, ORDER_DATE, order_lines(1))
+        result = await dispatch_pending(storage, url, max_attempts=3, base_delay=0.01)
+        return state, result
+
+    # 受け付けた後に応答が失われても、同じ冪等キーで送り直すので注文は1件だけ
+    state, result = run_with_supplier(steps, lost_rate=1.0)
+    assert result.sent == 2
+    assert outbox_status(storage) == {"A": ["sent"], "B": ["sent"]}
+    assert state.stats["accepted"] == 2 and state.stats["duplicates"] == 2
+    assert {supplier: len(orders) for supplier, orders in state.orders.items()} == {"A": 1, "B": 1}
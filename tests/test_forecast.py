@@ -0,0 +1,60 @@
+"""製造数の需要予測（曜日・ステータスのリッジ回帰と古い実績の減衰）"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from sushi_app.forecast import DemandForecaster
+
+START = date(2024, 1, 1)   # 月曜
+
+
+def history(days, weekend=10, weekday=4):
+    """土日だけ多く売れるセットの実績 [(日付, セット名, 製造数, ステータス)]"""
+    rows = []
+    for t in range(days):
+        day = START + timedelta(days=t)
+        rows.append((day.isoformat(), "極上セット", weekend if day.weekday() >= 5 else weekday, "通常"))
+    return rows
+
+
+def test_predicts_weekday_pattern():
+    forecaster = DemandForecaster(ridge=1e-3)
+    forecaster.fit(history(56))
+    saturday, tuesday = date(2024, 3, 2), date(2024, 3, 5)
+    assert forecaster.predict(saturday, {"極上セット": "通常"}) == {"極上セット": 10}
+    assert forecaster.predict(tuesday, {"極上セット": "通常"}) == {"極上セット": 4}
+
+
+def test_add_day_matches_fit():
+    rows = history(30)
+    batch = DemandForecaster()
+    batch.fit(rows)
+    daily = DemandForecaster()
+    for day, name, count, status in rows:
+        daily.add_day(date.fromisoformat(day), {name: count}, {name: status})
+    assert np.allclose(batch.weight, daily.weight)
+    assert np.allclose(batch.coefficients(), daily.coefficients())
+
+
+def test_saving_a_day_again_replaces_it():
+    forecaster = DemandForecaster()
+    forecaster.fit(history(14))
+    before = forecaster.weighted_sum.copy()
+    day = START + timedelta(days=13)
+    forecaster.add_day(day, {"極上セット": 100}, {})
+    forecaster.add_day(day, {"極上セット": 10}, {})
+    assert np.allclose(forecaster.weighted_sum, before)
+
+
+def test_old_history_weighs_less():
+    forecaster = DemandForecaster(half_life_days=7)
+    forecaster.update([(START.isoformat(), "極上セット", 1, "通常")])
+    forecaster.update([((START + timedelta(days=7)).isoformat(), "極上セット", 1, "通常")])
+    assert forecaster.weight.sum() == pytest.approx(1.5)
+
+
+def test_sets_without_enough_history_are_skipped():
+    forecaster = DemandForecaster(min_weight=3)
+    forecaster.fit(history(2))
+    assert forecaster.predict(START + timedelta(days=2), {"極上セット": "通常", "なし": "通常"}) == {}
@@ -0,0 +1,59 @@
+"""複数日の在庫の動き（先入れ先出し・消費期限・入荷曜日）"""
+from datetime import date
+
+import numpy as np
+
+from sushi_app.horizon import HorizonSettings, age_stock, consume_fifo, delivery_days, simulate_horizon
+from sushi_app.ordering import SupplierOffer
+from sushi_app.planning import compile_sets
+
+MONDAY = date(2024, 1, 1)
+INGREDIENTS = ["マグロ", "イカ"]
+SETS = {"A": {"レシピ": {"マグロ": 1}, "販売価格": 100, "ステータス": "通常"}}
+OFFERS = [SupplierOffer("マグロ", "A", 1), SupplierOffer("イカ", "A", 1)]
+
+
+def simulate(plan, inventory, shelf_life, weekdays, days=7):
+    matrix = compile_sets(SETS, INGREDIENTS)
+    settings = HorizonSettings(days=days, shelf_life={"マグロ": shelf_life}, delivery_weekdays=weekdays,
+                               lead_time=1)
+    plans = np.array([[count] for count in plan], dtype=np.int64)
+    return simulate_horizon(matrix, INGREDIENTS, plans, inventory, OFFERS, MONDAY, settings)
+
+
+def test_consume_oldest_first():
+    remaining, short = consume_fifo(np.array([[2, 3, 4]]), np.array([4]))
+    assert remaining.tolist() == [[0, 1, 4]] and short.tolist() == [0]
+    remaining, short = consume_fifo(np.array([[2, 3, 4]]), np.array([10]))
+    assert remaining.tolist() == [[0, 0, 0]] and short.tolist() == [1]
+    aged, waste = age_stock(np.array([[2, 3, 4]]))
+    assert aged.tolist() == [[3, 4, 0]] and waste.tolist() == [2]
+
+
+def test_expired_stock_is_wasted():
+    result = simulate([5] * 7, {"マグロ": 20}, shelf_life=2, weekdays=[])
+    assert result.usage[:, 0].tolist() == [5] * 7
+    assert result.waste[:, 0].tolist() == [0, 10, 0, 0, 0, 0, 0]
+    assert result.shortage[:, 0].tolist() == [0, 0, 5, 5, 5, 5, 5]
+    assert result.deliveries == []
+
+
+def test_delivery_covers_only_shelf_life():
+    # 月曜にしか入荷せず、消費期限が2日なので、水曜以降の分は入荷しても使えない
+    result = simulate([5] * 7, {}, shelf_life=2, weekdays=[0])
+    assert result.arrivals[:, 0].tolist() == [10, 0, 0, 0, 0, 0, 0]
+    assert result.shortage[:, 0].sum() == 25 and result.waste.sum() == 0
+    assert [d.order_date for d in result.deliveries] == [date(2023, 12, 31)]
+
+
+def test_daily_delivery_meets_plan():
+    result = simulate([3, 0, 4, 5, 1, 2, 6], {"マグロ": 2}, shelf_life=3, weekdays=range(7))
+    assert result.shortage.sum() == 0 and result.waste.sum() == 0
+    assert result.arrivals[:, 0].sum() == 21 - 2
+    assert result.revenue.tolist() == [300, 0, 400, 500, 100, 200, 600]
+
+
+def test_delivery_days_respect_lead_time():
+    dates = [date(2024, 1, d) for d in range(1, 8)]
+    settings = HorizonSettings(delivery_weekdays=[0, 2, 4], lead_time=2)
+    assert delivery_days(dates, settings, today=date(2023, 12, 31)) == [2, 4]
@@ -0,0 +1,72 @@
+"""差分での集計の更新を、毎回の計算し直しと比べる"""
+import numpy as np
+
+from sushi_app.incremental import RunningPlan
+from sushi_app.planning import compile_sets, compute_plan
+from sushi_app.set_catalog import empty_set_catalog
+
+INGREDIENTS = ["マグロ", "サーモン", "イカ", "玉子"]
+
+
+def random_set(rng):
+    return {"レシピ": {ing: int(rng.integers(0, 3)) for ing in INGREDIENTS},
+            "販売価格": int(rng.integers(1, 20)) * 100, "ステータス": "通常"}
+
+
+def assert_matches(running, plan, inventory):
+    expected = compute_plan(running.matrix, plan)
+    assert (running.usage == expected.usage).all()
+    assert (running.money == expected.money).all()
+    assert running.total == int(expected.total)
+    inv = np.array([inventory.get(ing, 0) for ing in running.matrix.ingredients])
+    assert (running.shortage == np.maximum(0, expected.usage - inv)).all()
+
+
+def test_random_edits_match_full_recompute():
+    rng = np.random.default_rng(0)
+    catalog = empty_set_catalog().evolve(1, {f"セット{i}": random_set(rng) for i in range(6)})
+    running = RunningPlan(catalog, compile_sets(catalog.sets, INGREDIENTS))
+    plan, inventory = {}, {}
+    for step in range(60):
+        action = step % 3
+        if action == 0:
+            name = list(catalog)[int(rng.integers(len(catalog)))]
+            plan[name] = int(rng.integers(0, 10))
+            running.update_plan(plan)
+        elif action == 1:
+            inventory[INGREDIENTS[int(rng.integers(len(INGREDIENTS)))]] = int(rng.integers(0, 30))
+            running.set_inventory(inventory)
+        else:
+            # レシピ・価格の変更、追加、削除
+            names = list(catalog)
+            deletes = [names[int(rng.integers(len(names)))]] if len(names) > 3 and rng.random() < 0.3 else []
+            upserts = {names[int(rng.integers(len(names)))]: random_set(rng)}
+            if rng.random() < 0.3:
+                upserts[f"新セット{step}"] = random_set(rng)
+            upserts = {name: data for name, data in upserts.items() if name not in deletes}
+            catalog = catalog.evolve(catalog.version + 1, upserts, deletes)
+            running.rebase(catalog, compile_sets(catalog.sets, INGREDIENTS))
+            plan = {name: count for name, count in plan.items() if name in catalog}
+        assert_matches(running, plan, inventory)
+
+
+def test_rebase_only_touches_changed_sets():
+    rng = np.random.default_rng(1)
+    catalog = empty_set_catalog().evolve(1, {f"セット{i}": random_set(rng) for i in range(50)})
+    running = RunningPlan(catalog, compile_sets(catalog.sets, INGREDIENTS))
+    running.update_plan({name: 1 for name in catalog})
+    running.touched_sets = 0
+    catalog = catalog.evolve(2, {"セット7": random_set(rng)})
+    running.rebase(catalog, compile_sets(catalog.sets, INGREDIENTS))
+    assert running.touched_sets == 2   # 古い内容を引いて、新しい内容を足す
+    assert_matches(running, {name: 1 for name in catalog}, {})
+
+
+def test_rebase_with_new_ingredients():
+    catalog = empty_set_catalog().evolve(1, {"A": {"レシピ": {"マグロ": 2}, "販売価格": 100, "ステータス": "通常"}})
+    running = RunningPlan(catalog, compile_sets(catalog.sets, INGREDIENTS))
+    running.update_plan({"A": 3})
+    running.set_inventory({"マグロ": 4})
+    running.rebase(catalog, compile_sets(catalog.sets, ["ウニ"] + INGREDIENTS))
+    assert running.usage_dict()["マグロ"] == 6
+    assert running.shortage_dict() == {"マグロ": 2}
@@ -0,0 +1,54 @@
+"""再実行の計測（区間・集計・JSONL ログ・セッション状態の大きさ）"""
+import json
+
+from sushi_app import metrics
+
+
+def test_rerun_records_spans(monkeypatch, tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setenv("SUSHI_METRICS_LOG", str(path))
+    with metrics.rerun("fragment", "order", "s1") as record:
+        with metrics.timer("handler", "calc_order"):
+            pass
+        with metrics.timer("handler", "calc_order"):
+            pass
+        record.session_bytes = 1234
+    assert list(record.spans) == ["handler:calc_order"]
+    assert metrics.current() is None
+    logged = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert logged[-1]["section"] == "order" and logged[-1]["session_bytes"] == 1234
+    text = metrics.REGISTRY.render_prometheus()
+    assert 'sushi_reruns_total{kind="fragment",section="order"}' in text
+    assert 'sushi_span_seconds_count{kind="handler",name="calc_order"}' in text
+
+
+def test_log_defaults_to_data_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("SUSHI_METRICS_LOG", raising=False)
+    monkeypatch.setenv("SUSHI_DB_PATH", str(tmp_path / "sushi.db"))
+    assert metrics.log_path() == str(tmp_path / metrics.LOG_FILENAME)
+    with metrics.rerun("full"):
+        pass
+    assert (tmp_path / metrics.LOG_FILENAME).exists()
+    # 空にすると書き出さない
+    monkeypatch.setenv("SUSHI_METRICS_LOG", "")
+    assert metrics.log_path() is None
+
+
+def test_session_size_counts_shared_objects_once():
+    shared = list(range(1000))
+    single = metrics.session_size({"a": shared})
+    assert metrics.session_size({"a": shared, "b": shared}) < 2 * single
+    assert metrics.session_size({"a": [shared]}, depth=1) < single
+
+
+def test_session_size_sampling(monkeypatch):
+    monkeypatch.setattr(metrics, "SESSION_SIZE_EVERY", 3)
+    assert [n for n in range(1, 8) if metrics.should_measure_session(n)] == [1, 4, 7]
+    monkeypatch.setattr(metrics, "SESSION_SIZE_EVERY", 0)
+    assert not metrics.should_measure_session(1)
+
+
+def test_label_values_are_escaped():
+    registry = metrics.Registry()
+    registry.inc("sushi_test_total", {"name": 'a"b'})
+    assert 'sushi_test_total{name="a\\"b"} 1' in registry.render_prometheus()
@@ -0,0 +1,52 @@
+"""製造数の最適化（分枝限定法）を総当たりと比べる"""
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from sushi_app.mix import solve_mix
+from sushi_app.planning import compile_sets
+
+INGREDIENTS = ["マグロ", "サーモン", "イカ"]
+
+
+def brute_force(matrix, inventory, limit=12):
+    counts = matrix.counts
+    best = 0
+    for x in itertools.product(range(limit + 1), repeat=len(matrix.set_names)):
+        x = np.array(x)
+        # ネタを使わないセットは在庫で上限が決まらないため作らない
+        if (x[counts.sum(axis=1) == 0] > 0).any():
+            continue
+        if (counts.T @ x <= inventory).all():
+            best = max(best, int(matrix.prices @ x))
+    return best
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_solve_mix_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(40):
+        sets_data = {
+            f"セット{i}": {"レシピ": {ing: rng.randint(0, 3) for ing in INGREDIENTS},
+                          "販売価格": rng.randint(1, 20) * 10, "ステータス": "通常"}
+            for i in range(rng.randint(1, 3))
+        }
+        matrix = compile_sets(sets_data, INGREDIENTS)
+        inventory = np.array([rng.randint(0, 12) for _ in INGREDIENTS])
+        result = solve_mix(matrix, inventory)
+        assert (result.usage <= inventory).all()
+        assert result.revenue == brute_force(matrix, inventory)
+
+
+def test_solve_mix_bounds():
+    sets_data = {
+        "極上": {"レシピ": {"マグロ": 2}, "販売価格": 300, "ステータス": "通常"},
+        "並": {"レシピ": {"マグロ": 1}, "販売価格": 100, "ステータス": "通常"},
+    }
+    matrix = compile_sets(sets_data, INGREDIENTS)
+    result = solve_mix(matrix, [10, 0, 0], lower=[0, 4], upper=[2, np.inf])
+    assert result.counts.tolist() == [2, 6]
+    with pytest.raises(ValueError):
+        solve_mix(matrix, [10, 0, 0], lower=[3, 0], upper=[2, np.inf])
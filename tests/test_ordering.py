@@ -0,0 +1,80 @@
+"""発注計算（動的計画法）を総当たりと比べる"""
+import itertools
+import math
+import random
+
+import numpy as np
+import pytest
+
+from sushi_app.catalog import catalog_from_rows
+from sushi_app.ordering import SupplierOffer, order_costs, solve_ingredient, solve_orders
+
+
+def order_cost(solution):
+    return sum(lots * offer.lot * offer.unit_price(lots * offer.lot) for offer, lots in solution)
+
+
+def brute_force(shortage, offers):
+    """ロット数のすべての組み合わせから最安の発注金額を求める"""
+    ranges = []
+    for offer in offers:
+        top = math.ceil(max([shortage, offer.moq] + [q for q, _ in offer.price_tiers]) / offer.lot) + 2
+        ranges.append([0] + list(range(max(1, offer.min_lots), top + 1)))
+    best = math.inf
+    for combo in itertools.product(*ranges):
+        if sum(lots * offer.lot for lots, offer in zip(combo, offers)) >= shortage:
+            best = min(best, order_cost(zip(offers, combo)))
+    return best
+
+
+def random_offers(rng):
+    offers = []
+    for k in range(rng.randint(1, 3)):
+        tiers = {0: float(rng.randint(50, 150))}
+        for _ in range(rng.randint(0, 2)):
+            tiers[rng.randint(1, 40)] = float(rng.randint(30, 150))
+        offers.append(SupplierOffer("マグロ", f"仕入先{k}", rng.choice([1, 2, 3, 5, 6, 10, 12]),
+                                    rng.choice([0, 0, 5, 13]), tuple(sorted(tiers.items()))))
+    return offers
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_solve_ingredient_matches_brute_force(seed):
+    rng = random.Random(seed)
+    for _ in range(50):
+        offers = random_offers(rng)
+        shortage = rng.randint(0, 40)
+        solution = solve_ingredient(shortage, offers)
+        assert sum(lots * offer.lot for offer, lots in solution) >= shortage
+        assert all(lots >= offer.min_lots for offer, lots in solution)
+        expected = brute_force(shortage, offers) if shortage else 0
+        assert order_cost(solution) == pytest.approx(expected)
+
+
+def test_solve_ingredient_no_shortage():
+    assert solve_ingredient(0, [SupplierOffer("マグロ", "A", 10)]) == []
+
+
+def test_order_costs_matches_solve_orders():
+    catalog = catalog_from_rows([("マグロ", 20, "枚"), ("サーモン", 30, "枚"), ("イカ", 1, "枚")])
+    offers = [
+        SupplierOffer("マグロ", "A", 10, 0, ((0, 120.0), (50, 100.0))),
+        SupplierOffer("マグロ", "B", 7, 14, ((0, 110.0),)),
+        SupplierOffer("サーモン", "A", 5, 0, ((0, 90.0),)),
+    ]
+    inventory = {"マグロ": 5, "イカ": 2}
+    rng = np.random.default_rng(0)
+    required = rng.integers(0, 80, size=(20, len(catalog)))
+    costs = order_costs(catalog, required, inventory, offers)
+    for plan, cost in zip(required, costs):
+        expected = solve_orders(catalog, dict(zip(catalog.names, plan.tolist())), inventory, offers).total_cost
+        assert cost == pytest.approx(expected)
+
+
+def test_solve_orders_uses_catalog_lot_without_offers():
+    catalog = catalog_from_rows([("マグロ", 20, "枚"), ("イカ", 1, "枚")])
+    plan = solve_orders(catalog, {"マグロ": 25, "イカ": 3}, {"イカ": 1}, [])
+    assert plan.quantity.tolist() == [40, 2]
+    # ネタ名の一覧だけなら発注ロットは1
+    plan = solve_orders(["マグロ"], {"マグロ": 25}, {}, [])
+    assert plan.quantity.tolist() == [25]
@@ -0,0 +1,57 @@
+"""レシピ行列による計画の計算をセットごとのループと比べる"""
+import numpy as np
+import pytest
+
+from sushi_app.defaults import DEFAULT_SETS
+from sushi_app.planning import compile_sets, compute_plan, summary_rows, usage_dict
+
+INGREDIENTS = ["マグロ", "サーモン", "イカ", "玉子", "エビ", "ホタテ"]
+
+
+def loop_usage(sets_data, plan):
+    usage = dict.fromkeys(INGREDIENTS, 0)
+    for name, count in plan.items():
+        for ing, cnt in sets_data[name]["レシピ"].items():
+            usage[ing] += cnt * count
+    return usage
+
+
+def random_sets(rng, n):
+    return {
+        f"セット{i}": {"レシピ": {ing: int(rng.integers(0, 4)) for ing in INGREDIENTS},
+                      "販売価格": int(rng.integers(1, 30)) * 100, "ステータス": "通常"}
+        for i in range(n)
+    }
+
+
+def test_compute_plan_matches_loops():
+    matrix = compile_sets(DEFAULT_SETS, INGREDIENTS)
+    plan = {"極上セット": 3, "季節の彩りセット": 2}
+    result = compute_plan(matrix, plan)
+    assert usage_dict(matrix, result.usage) == loop_usage(DEFAULT_SETS, plan)
+    assert int(result.total) == 1480 * 3 + 1280 * 2
+    assert summary_rows(matrix, result) == [
+        {"セット名": "極上セット", "製造数": 3, "販売単価": 1480, "製造金額": 4440},
+        {"セット名": "季節の彩りセット", "製造数": 2, "販売単価": 1280, "製造金額": 2560},
+    ]
+
+
+def test_batch_plans_match_single_plans():
+    rng = np.random.default_rng(0)
+    sets_data = random_sets(rng, 8)
+    matrix = compile_sets(sets_data, INGREDIENTS)
+    plans = rng.integers(0, 10, size=(5, len(sets_data)))
+    batch = compute_plan(matrix, plans)
+    for k, plan in enumerate(plans):
+        single = compute_plan(matrix, plan)
+        assert (batch.usage[k] == single.usage).all()
+        assert batch.total[k] == single.total
+        assert usage_dict(matrix, single.usage) == loop_usage(sets_data, dict(zip(sets_data, plan.tolist())))
+
+
+def test_unknown_ingredients_and_zero_counts_are_dropped():
+    sets_data = {"テスト": {"レシピ": {"マグロ": 2, "イカ": 0, "なし": 5}, "販売価格": 100, "ステータス": "通常"}}
+    matrix = compile_sets(sets_data, INGREDIENTS)
+    assert matrix.recipe(0) == {"マグロ": 2}
+    with pytest.raises(ValueError):
+        compute_plan(matrix, np.zeros(2, dtype=np.int64))
@@ -0,0 +1,45 @@
+"""レシピ・価格の一括編集用テーブルの検証と差分"""
+import pandas as pd
+
+from sushi_app.catalog import catalog_from_rows
+from sushi_app.defaults import DEFAULT_SETS
+from sushi_app.recipe_table import diff_sets, frame_to_sets, read_csv, sets_to_frame, to_csv_bytes
+
+CATALOG = catalog_from_rows([(name, 1, "枚") for name in ("マグロ", "サーモン", "イカ", "玉子", "エビ", "ホタテ")])
+
+
+def test_csv_round_trip_has_no_changes():
+    df = read_csv(to_csv_bytes(sets_to_frame(DEFAULT_SETS, CATALOG)))
+    changes = diff_sets(DEFAULT_SETS, frame_to_sets(df, CATALOG))
+    assert changes.empty and not changes.errors
+
+
+def test_only_changed_sets_are_upserted():
+    df = sets_to_frame(DEFAULT_SETS, CATALOG)
+    df.loc[df["セット名"] == "極上セット", "販売価格"] = 1500
+    df = df[df["セット名"] != "季節の彩りセット"]
+    df = pd.concat([df, pd.DataFrame([{"セット名": "新セット", "販売価格": 800, "ステータス": "通常", "イカ": 2}])])
+    changes = diff_sets(DEFAULT_SETS, frame_to_sets(df, CATALOG))
+    assert list(changes.upserts) == ["極上セット", "新セット"]
+    assert changes.upserts["新セット"]["レシピ"] == {"イカ": 2}
+    assert changes.deletes == ["季節の彩りセット"]
+    assert changes.summary(DEFAULT_SETS) == "追加 1 件・変更 1 件・削除 1 件"
+
+
+def test_invalid_rows_are_reported():
+    df = pd.DataFrame([
+        {"セット名": "", "販売価格": 100, "ステータス": "通常", "マグロ": 1},
+        {"セット名": "A", "販売価格": -1, "ステータス": "通常", "マグロ": 1},
+        {"セット名": "B", "販売価格": 100, "ステータス": "?", "マグロ": 1},
+        {"セット名": "C", "販売価格": 100, "ステータス": "通常", "マグロ": 1.5},
+        {"セット名": "D", "販売価格": "inf", "ステータス": "通常", "マグロ": 1},
+        {"セット名": "E", "販売価格": 100, "ステータス": "通常", "マグロ": 2},
+    ])
+    result = frame_to_sets(df, CATALOG)
+    assert list(result.upserts) == ["E"]
+    assert [error.split(" ")[0] for error in result.errors] == ["1", "2", "3", "4", "5"]
+
+
+def test_unknown_and_missing_columns():
+    result = frame_to_sets(pd.DataFrame([{"セット名": "A", "ウニ": 1}]), CATALOG)
+    assert len(result.errors) == 2 and not result.upserts
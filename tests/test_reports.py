@@ -0,0 +1,68 @@
+"""レポートのファイル出力（内容・描画結果のキャッシュ・ZIP の一括出力）"""
+import io
+import zipfile
+
+import pytest
+
+from sushi_app import reports
+from sushi_app.reports import build_document, export_documents, load_documents, render
+
+ORDER = {"rows": [{"ネタ": "マグロ", "発注数量": 20, "発注金額": 2000}], "lines": []}
+
+
+def order_document(day="2024年01月05日", rows=ORDER["rows"]):
+    return build_document("order", day, {"rows": rows})
+
+
+def test_document_from_saved_report():
+    doc = build_document("today", "2024年01月05日", {
+        "summary": [{"セット名": "極上セット", "製造数": 2, "販売単価": 1480, "製造金額": 2960}],
+        "total_money": 2960,
+        "usage": {"マグロ": 6, "ウニ": 0},
+    })
+    assert doc.filename == "today_20240105"
+    assert "合計製造金額: ¥2,960" in doc.lines
+    assert doc.tables[1].rows == (("マグロ", 6),)
+    with pytest.raises(ValueError):
+        build_document("weekly", "2024年01月05日", {})
+
+
+def test_render_reuses_same_content(monkeypatch):
+    calls = []
+    monkeypatch.setitem(reports.RENDERERS, "xlsx", lambda doc: calls.append(doc) or b"x")
+    doc = order_document(rows=[{"ネタ": "キャッシュ確認", "発注数量": 1}])
+    assert render(doc, "xlsx") == render(order_document(rows=[{"ネタ": "キャッシュ確認", "発注数量": 1}]), "xlsx")
+    assert len(calls) == 1
+    render(order_document(rows=[{"ネタ": "キャッシュ確認", "発注数量": 2}]), "xlsx")
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("fmt", ["xlsx", "pdf"])
+def test_export_zip(fmt):
+    if reports.missing_package(fmt):
+        pytest.skip(f"{reports.REQUIRED_PACKAGES[fmt]} がありません")
+    docs = [order_document(f"2024年01月0{d}日") for d in (5, 6, 7)]
+    render(docs[0], fmt)
+    data = export_documents(docs, fmt, workers=1)
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.namelist() == [f"order_2024010{d}.{fmt}" for d in (5, 6, 7)]
+        assert archive.read(f"order_20240105.{fmt}") == render(docs[0], fmt)
+
+
+def test_export_with_process_pool():
+    if reports.missing_package("xlsx"):
+        pytest.skip("openpyxl がありません")
+    docs = [order_document(f"2024年02月0{k + 1}日", [{"ネタ": "プール確認", "発注数量": k}]) for k in range(3)]
+    with zipfile.ZipFile(io.BytesIO(export_documents(docs, "xlsx", workers=2))) as archive:
+        assert len(archive.namelist()) == 3
+    # プールで描画した結果もキャッシュに入る
+    assert all(reports._cached(reports.document_key(doc, "xlsx")) is not None for doc in docs)
+
+
+def test_load_latest_reports_per_day(storage):
+    storage.save_report("order", "2024年01月05日", {"rows": [{"ネタ": "古い"}]})
+    storage.save_report("order", "2024年01月05日", ORDER)
+    storage.save_report("order", "2024年01月08日", ORDER)
+    docs = load_documents(storage, ["order"], "2024年01月05日", "2024年01月07日")
+    assert [doc.report_date for doc in docs] == ["2024年01月05日"]
+    assert docs[0].tables[0].rows == (("マグロ", 20, 2000),)
@@ -0,0 +1,73 @@
+"""シナリオの組み合わせと一括計算（差し替えの重なり・倍率）"""
+import numpy as np
+import pytest
+
+from sushi_app.ordering import SupplierOffer
+from sushi_app.planning import compile_sets, compute_plan
+from sushi_app.scenarios import (BASE_LABEL, Variant, evaluate_scenarios, parse_percentages, rate_axis,
+                                 scenario_grid, swap_axis)
+
+INGREDIENTS = ["マグロ", "サーモン", "イカ", "玉子"]
+SETS = {
+    "A": {"レシピ": {"マグロ": 2, "イカ": 1}, "販売価格": 1000, "ステータス": "通常"},
+    "B": {"レシピ": {"サーモン": 1}, "販売価格": 500, "ステータス": "通常"},
+}
+OFFERS = [SupplierOffer(ing, "仕入先", 1, 0, ((0, price),))
+          for ing, price in zip(INGREDIENTS, (100.0, 80.0, 50.0, 20.0))]
+
+
+def evaluate(scenarios, plan=(3, 2), inventory=None):
+    matrix = compile_sets(SETS, INGREDIENTS)
+    return evaluate_scenarios(matrix, INGREDIENTS, np.array(plan), inventory or {}, OFFERS, scenarios)
+
+
+def usage_of(result, k):
+    return dict(zip(INGREDIENTS, result.usage[k].tolist()))
+
+
+def test_grid_is_cartesian_product():
+    axes = [rate_axis("A", parse_percentages("-10, 0, 10"), "price"), swap_axis("B", "サーモン", "玉子")]
+    scenarios = scenario_grid(axes)
+    assert len(scenarios) == 6
+    assert scenarios[2].label == BASE_LABEL
+    result = evaluate(scenarios)
+    assert result.revenue.tolist() == [3700, 3700, 4000, 4000, 4300, 4300]
+
+
+def test_duplicate_swaps_collapse_to_the_last_one():
+    chained = Variant(swaps=(("A", "マグロ", "イカ"), ("A", "マグロ", "玉子")))
+    last_only = Variant(swaps=(("A", "マグロ", "玉子"),))
+    to_itself = Variant(swaps=(("A", "マグロ", "玉子"), ("A", "マグロ", "マグロ")))
+    result = evaluate([chained, last_only, to_itself, Variant()])
+    # 元のレシピのマグロ 6 枚を1回だけ移す（イカを経由して2回移さない）
+    assert usage_of(result, 0) == usage_of(result, 1) == {"マグロ": 0, "サーモン": 2, "イカ": 3, "玉子": 6}
+    # 最後の指定が「マグロ→マグロ」なら何も変えない
+    assert usage_of(result, 2) == usage_of(result, 3)
+
+
+def test_swap_on_two_axes_is_rejected():
+    with pytest.raises(ValueError):
+        scenario_grid([swap_axis("A", "マグロ", "イカ"), swap_axis("A", "マグロ", "玉子")])
+
+
+def test_rates_for_the_same_set_multiply():
+    twice = Variant(count_rates=(("A", 2.0), ("A", 1.5)))
+    result = evaluate([twice, Variant(count_rates=(("A", 3.0),))])
+    assert usage_of(result, 0) == usage_of(result, 1)
+    assert result.revenue[0] == result.revenue[1] == 9 * 1000 + 2 * 500
+
+
+def test_order_cost_uses_inventory():
+    matrix = compile_sets(SETS, INGREDIENTS)
+    result = evaluate([Variant()], inventory={"マグロ": 4})
+    usage = compute_plan(matrix, np.array([3, 2])).usage
+    assert usage.tolist() == [6, 2, 3, 0]
+    assert result.order_cost[0] == 2 * 100 + 2 * 80 + 3 * 50
+
+
+def test_parse_percentages():
+    assert parse_percentages("-10、10%, 10") == [0.9, 1.1]
+    with pytest.raises(ValueError):
+        parse_percentages("-100")
+    with pytest.raises(ValueError):
+        parse_percentages("abc")
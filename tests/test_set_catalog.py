@@ -0,0 +1,52 @@
+"""版ごとに不変のセットカタログ（変わらないセットは前の版と共有する）"""
+import pytest
+
+from sushi_app.defaults import DEFAULT_SETS
+from sushi_app.set_catalog import empty_set_catalog
+from sushi_app.storage import Storage
+
+SET = {"レシピ": {"マグロ": 1}, "販売価格": 500, "ステータス": "通常"}
+
+
+def test_evolve_shares_unchanged_sets():
+    v1 = empty_set_catalog().evolve(1, DEFAULT_SETS)
+    v2 = v1.evolve(2, {"テスト": SET}, ["季節の彩りセット"])
+    assert list(v2) == ["極上セット", "テスト"]
+    assert v2.sets["極上セット"] is v1.sets["極上セット"]
+    # 前の版は変わらない
+    assert list(v1) == ["極上セット", "季節の彩りセット"] and v1.version == 1
+
+
+def test_sets_are_read_only():
+    catalog = empty_set_catalog().evolve(1, DEFAULT_SETS)
+    with pytest.raises(TypeError):
+        catalog.sets["テスト"] = SET
+    with pytest.raises(TypeError):
+        catalog.sets["極上セット"]["レシピ"]["マグロ"] = 0
+    copy = catalog.to_dict()
+    copy["極上セット"]["レシピ"]["マグロ"] = 0
+    assert catalog.sets["極上セット"]["レシピ"]["マグロ"] == 3
+
+
+def test_derived_is_built_once_per_version():
+    catalog = empty_set_catalog().evolve(1, DEFAULT_SETS)
+    calls = []
+    for _ in range(3):
+        catalog.derived("table", lambda: calls.append(1) or len(calls))
+    assert calls == [1]
+    assert catalog.evolve(2, {}).derived("table", lambda: "new") == "new"
+
+
+def test_storage_shares_versions_between_writes(storage, tmp_path):
+    catalog = storage.load_set_catalog()
+    storage.save_inventory({"マグロ": 1})
+    assert storage.load_set_catalog() is catalog
+    other = Storage(tmp_path / "sushi.db")
+    try:
+        other.save_sets({"テスト": SET})
+    finally:
+        other.close()
+    updated = storage.load_set_catalog()
+    assert updated.version > catalog.version
+    for name in catalog:
+        assert updated.sets[name] is catalog.sets[name]
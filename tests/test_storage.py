@@ -0,0 +1,74 @@
+"""Storage の版の管理と差分読み込み"""
+import pytest
+
+from sushi_app.storage import Storage
+
+SET = {"レシピ": {"マグロ": 1}, "販売価格": 500, "ステータス": "通常"}
+
+
+def test_each_write_gets_a_new_version(storage):
+    v0 = storage.data_version()
+    v1 = storage.save_inventory({"マグロ": 10})
+    v2 = storage.save_sets({"テスト": SET})
+    assert v0 < v1 < v2 == storage.data_version()
+
+
+def test_refresh_reads_changes_from_other_connection(storage, tmp_path):
+    other = Storage(tmp_path / "sushi.db")
+    try:
+        storage.load_sets()
+        other.save_sets({"テスト": SET})
+        other.save_inventory({"マグロ": 7})
+        other.save_report("order", "2024年01月05日", {"rows": []})
+        assert storage.refresh() == other.data_version()
+        assert "テスト" in storage.load_sets()
+        assert storage.load_inventory()["マグロ"] == 7
+        assert storage.load_report("order") == {"rows": []}
+    finally:
+        other.close()
+
+
+def test_inventory_keeps_latest_snapshot(storage):
+    storage.save_inventory({"マグロ": 10, "イカ": 3})
+    storage.save_inventory({"マグロ": 4})
+    assert storage.load_inventory() == {"マグロ": 4, "イカ": 3}
+
+
+def test_delete_sets(storage):
+    storage.save_sets({"テスト": SET})
+    storage.delete_sets(["テスト"])
+    assert "テスト" not in storage.load_sets()
+    # 削除したセットを登録し直せる
+    storage.save_sets({"テスト": SET})
+    assert storage.load_sets()["テスト"]["レシピ"] == {"マグロ": 1}
+
+
+def test_transaction_rolls_back(storage):
+    before = storage.data_version()
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.save_inventory({"マグロ": 99})
+            raise RuntimeError
+    assert storage.data_version() == before
+    assert storage.load_inventory().get("マグロ") != 99
+
+
+def test_unknown_report_kind(storage):
+    with pytest.raises(ValueError):
+        storage.save_report("weekly", "2024年01月05日", {})
+
+
+def test_nested_transaction_uses_one_version(storage):
+    with storage.transaction() as version:
+        assert storage.save_report("today", "2024年01月05日", {"total_money": 0}) == version
+        assert storage.save_production("2024-01-05", {"極上セット": 1}, {}) == version
+    assert storage.data_version() == version
+
+
+def test_snapshot_is_consistent(storage):
+    storage.save_inventory({"マグロ": 3})
+    snapshot = storage.snapshot()
+    storage.save_inventory({"マグロ": 4})
+    assert snapshot.version < storage.data_version()
+    assert snapshot.inventory["マグロ"] == 3
+    assert storage.snapshot().inventory["マグロ"] == 4